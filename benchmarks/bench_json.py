@@ -0,0 +1,87 @@
+# Market JSON read/write timings: the json module against json_io (orjson
+# when installed), pretty and compact, whole document and streamed.
+#
+#   python benchmarks/bench_json.py [--items 50000] [--repeat 3]
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dayz_core
+import json_io
+
+
+def synthetic_market(item_count, seed=1):
+    random.seed(seed)
+    market_data = dayz_core.build_market_data([f"Item_{i}" for i in range(item_count)], "Benchmark")
+    for item in market_data["Items"]:
+        item["MaxPriceThreshold"] = random.randint(10, 50000)
+        item["MinPriceThreshold"] = round(item["MaxPriceThreshold"] * random.random(), 2)
+        if random.random() < 0.2:
+            item["Variants"] = [f"{item['ClassName']}_Variant{v}" for v in range(3)]
+    return market_data
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    market_data = synthetic_market(args.items)
+    header = {key: value for key, value in market_data.items() if key != "Items"}
+    directory = tempfile.mkdtemp(prefix='dayztool_bench_')
+    path = os.path.join(directory, 'market.json')
+
+    def json_dump():
+        with open(path, 'w') as json_file:
+            json.dump(market_data, json_file, indent=4)
+
+    def json_load():
+        with open(path, 'r') as json_file:
+            json.load(json_file)
+
+    cases = [
+        ("json.dump indent=4", json_dump),
+        (f"json_io.dump pretty ({json_io.BACKEND})", lambda: json_io.dump(market_data, path, compact=False)),
+        (f"json_io.write_market pretty ({json_io.BACKEND})",
+         lambda: json_io.write_market(path, header, market_data["Items"], compact=False)),
+        (f"json_io.dump compact ({json_io.BACKEND})", lambda: json_io.dump(market_data, path, compact=True)),
+    ]
+
+    json_dump()
+    reference = open(path, 'rb').read()
+    print(f"{args.items} items, {len(reference) / 1048576:.1f} MB pretty, best of {args.repeat}")
+    baseline = None
+    for label, func in cases:
+        seconds = best_of(args.repeat, func)
+        baseline = baseline or seconds
+        if "compact" in label:
+            same = ""
+        else:
+            same = "identical" if open(path, 'rb').read() == reference else "differs"
+        print(f"  {label:45s} {seconds * 1000:8.1f} ms  {baseline / seconds:5.1f}x  {same}")
+
+    json_io.dump(market_data, path, compact=False)
+    print(f"  {'json.load':45s} {best_of(args.repeat, json_load) * 1000:8.1f} ms")
+    print(f"  {f'json_io.load ({json_io.BACKEND})':45s} {best_of(args.repeat, lambda: json_io.load(path)) * 1000:8.1f} ms")
+    os.remove(path)
+    os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
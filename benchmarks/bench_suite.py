@@ -0,0 +1,305 @@
+# Timings of the work behind every tab at several data sizes, on synthetic
+# data from synthetic.py, with the peak traced memory of each case.
+#
+#   python benchmarks/bench_suite.py                       # 1k/10k/100k types, 10/200 market files
+#   python benchmarks/bench_suite.py --types 500000 --market-files 2000
+#   python benchmarks/bench_suite.py --compare benchmarks/results/abc1234.json
+#   python benchmarks/bench_suite.py --diff old.json new.json
+#
+# Results are saved as JSON (benchmarks/results/<commit>.json by default) so
+# runs on different commits can be compared case by case. Times are the best
+# of --repeat runs; memory comes from one extra run under tracemalloc, which
+# is kept out of the timed runs because it slows Python down.
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+RESULTS_DIRECTORY = os.path.join(ROOT, 'benchmarks', 'results')
+
+import synthetic
+
+TYPES_RULES = "nominal *= 0.8 where category=weapons and usage=Military; min = nominal * 0.3"
+MARKET_RULES = "Max *= 0.9 where ClassName ~ \"^(AK|M4A1)_\"; round Max 5; Min = Max * 0.6"
+NOISE_SECONDS = 0.002  # Differences below this are never reported as slower or faster
+SEARCHES = ["m4a1", "ammo_ green", "helmet -tan", "saiga_*_1*", "re:^(ak|svd)_"]
+
+
+def git_commit():
+    # Short hash of HEAD, with "-dirty" when the tree has changes; None outside git
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if status.strip() else '')
+
+
+def measure(setup, run, repeat, memory):
+    # (best seconds, peak traced MB or None). setup() is not timed, its result goes to run().
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+    peak = None
+    if memory:
+        state = setup()
+        tracemalloc.start()
+        try:
+            run(state)
+            peak = tracemalloc.get_traced_memory()[1] / 1048576
+        finally:
+            tracemalloc.stop()
+    return min(times), peak
+
+
+def types_cases(types_path, work):
+    # (case, setup, run) for a types.xml
+    from dayz_core import SAMPLE_POSITIONS
+    from economy_budget import EconomyBudget
+    from events_merge import merge_event_files, spec_from_mapping
+    from market_batch import build_market_shards
+    from search_index import SearchIndex
+    from types_model import load_types_table, write_types_changes
+
+    def loaded():
+        return load_types_table(types_path)
+
+    def adjusted():
+        table = loaded()
+        table.apply(TYPES_RULES)
+        return table.changes()
+
+    def budgeted():
+        table = loaded()
+        budget = EconomyBudget(table)
+        table.apply(TYPES_RULES)
+        return budget
+
+    def search(table):
+        index = SearchIndex(table.text['name'])
+        for text in SEARCHES:
+            index.search(text)
+
+    def event_specs():
+        # One event per five weapons types, each spawning those five
+        table = loaded()
+        names = [name for name, category in zip(table.text['name'], table.text['category']) if category == 'weapons']
+        return [spec_from_mapping({'name': f"Static{names[start]}", 'nominal': 1, 'min': 1, 'max': 1,
+                                   'children': [f"{name}:0:1" for name in names[start:start + 5]]}, 'bench')
+                for start in range(0, len(names), 5)]
+
+    def events(specs):
+        # Into missing source files, so every run writes both files from scratch
+        source = os.path.join(work, 'no_mission')
+        merge_event_files(specs, os.path.join(source, 'events.xml'), os.path.join(source, 'cfgeventspawns.xml'),
+                          os.path.join(work, 'mission'), SAMPLE_POSITIONS, backup=False)
+
+    return [
+        ('types.load', lambda: None, lambda state: loaded()),
+        ('types.search', loaded, search),
+        ('types.bulk_adjust', loaded, lambda table: table.apply(TYPES_RULES)),
+        ('types.budget_check', budgeted, lambda budget: budget.check()),
+        ('types.save', adjusted, lambda changes: write_types_changes(types_path, os.path.join(work, 'types.xml'),
+                                                                     changes)),
+        ('types.market_create', lambda: None,
+         lambda state: build_market_shards([types_path], os.path.join(work, 'market'), workers=1)),
+        ('types.events', event_specs, events),
+    ]
+
+
+def market_cases(file_paths, work):
+    import json_io
+    from dayz_core import adjust_prices_in_file
+    from market_index import MarketIndex
+    from market_pricing import load_market_table
+    from search_index import SearchIndex
+
+    output = os.path.join(work, 'market_out')
+    os.makedirs(output, exist_ok=True)
+
+    def loaded():
+        return load_market_table(file_paths)[0]
+
+    def search(table):
+        # Index the editor rebuilds on every load, then the class name searches
+        MarketIndex(table.items).duplicate_report()
+        index = SearchIndex(table.text['ClassName'])
+        for text in SEARCHES:
+            index.search(text)
+
+    def adjust(table):
+        table.apply(MARKET_RULES)
+        table.write_back()
+
+    def save(table):
+        for name, market_data in table.documents:
+            json_io.dump(market_data, os.path.join(output, name))
+
+    def bulk_update(state):
+        # The Market Editor (Bulk) per-file job, run in this process
+        for file_path in file_paths:
+            adjust_prices_in_file(file_path, -10, output, force=True)
+
+    return [
+        ('market.load', lambda: None, lambda state: loaded()),
+        ('market.search', loaded, search),
+        ('market.bulk_adjust', loaded, adjust),
+        ('market.save', loaded, save),
+        ('market.bulk_update', lambda: None, bulk_update),
+    ]
+
+
+def run_suite(types_scales, market_scales, items_per_file, repeat, memory, data_directory, log=print):
+    results = []
+
+    def record(case, scale, setup, run):
+        seconds, peak = measure(setup, run, repeat, memory)
+        results.append({'case': case, 'scale': scale, 'seconds': round(seconds, 6),
+                        'peak_mb': None if peak is None else round(peak, 3)})
+        peak_text = "" if peak is None else f"  {peak:9.1f} MB"
+        log(f"  {case:22s} {scale:>8}  {seconds * 1000:10.1f} ms{peak_text}")
+
+    for count in types_scales:
+        work = tempfile.mkdtemp(prefix='dayztool_bench_')
+        try:
+            types_path = os.path.join(data_directory, f'types_{count}.xml')
+            if not os.path.exists(types_path):
+                synthetic.write_types_xml(types_path, count)
+            log(f"types.xml with {count} types ({os.path.getsize(types_path) / 1048576:.1f} MB)")
+            for case, setup, run in types_cases(types_path, work):
+                record(case, count, setup, run)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+    for file_count in market_scales:
+        work = tempfile.mkdtemp(prefix='dayztool_bench_')
+        try:
+            directory = os.path.join(data_directory, f'market_{file_count}x{items_per_file}')
+            if not os.path.isdir(directory):
+                synthetic.write_market_folder(directory, file_count, items_per_file)
+            file_paths = sorted(os.path.join(directory, name) for name in os.listdir(directory))
+            log(f"{file_count} market files of {items_per_file} items")
+            for case, setup, run in market_cases(file_paths, work):
+                record(case, file_count, setup, run)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+    return results
+
+
+def environment():
+    import json_io
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {
+        'commit': git_commit(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'json_backend': json_io.BACKEND,
+        'numpy': numpy_version,
+    }
+
+
+def compare(baseline, current, threshold):
+    # Print both runs side by side, returns the number of cases slower than threshold
+    old = {(result['case'], result['scale']): result for result in baseline['results']}
+    print(f"{baseline['meta'].get('commit')} -> {current['meta'].get('commit')}")
+    print(f"  {'case':22s} {'scale':>8}  {'before':>10}  {'after':>10}  {'ratio':>6}  memory")
+    regressions = 0
+    for result in current['results']:
+        before = old.get((result['case'], result['scale']))
+        if before is None:
+            continue
+        ratio = result['seconds'] / max(before['seconds'], 1e-9)
+        flag = ""
+        if abs(result['seconds'] - before['seconds']) < NOISE_SECONDS:
+            pass
+        elif ratio > threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        memory = ""
+        if before.get('peak_mb') is not None and result.get('peak_mb') is not None:
+            memory = f"{before['peak_mb']:.1f} -> {result['peak_mb']:.1f} MB"
+        print(f"  {result['case']:22s} {result['scale']:>8}  {before['seconds'] * 1000:8.1f}ms  "
+              f"{result['seconds'] * 1000:8.1f}ms  {ratio:5.2f}x  {memory}{flag}")
+    return regressions
+
+
+def load_results(file_path):
+    with open(file_path, 'r', encoding='utf-8') as results_file:
+        return json.load(results_file)
+
+
+def scales(text):
+    return [int(part) for part in text.split(',') if part.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the tool on synthetic economy data")
+    parser.add_argument('--types', type=scales, default=[1000, 10000, 100000],
+                        help="comma separated types.xml sizes (up to 500000)")
+    parser.add_argument('--market-files', type=scales, default=[10, 200],
+                        help="comma separated market folder sizes (up to 2000 files)")
+    parser.add_argument('--items', type=int, default=50, help="items per market file")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc run")
+    parser.add_argument('--data', help="keep the generated data in this folder and reuse it")
+    parser.add_argument('--output', help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="results file of an earlier run to compare with")
+    parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'), help="only compare two results files")
+    parser.add_argument('--threshold', type=float, default=1.15, help="ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.diff:
+        return 1 if compare(load_results(args.diff[0]), load_results(args.diff[1]), args.threshold) else 0
+
+    # Keep the parse cache of the market creation case away from the real one
+    cache_directory = tempfile.mkdtemp(prefix='dayztool_bench_cache_')
+    os.environ['DAYZTOOL_CACHE_DIR'] = cache_directory
+    data_directory = args.data or tempfile.mkdtemp(prefix='dayztool_bench_data_')
+    os.makedirs(data_directory, exist_ok=True)
+    try:
+        meta = environment()
+        print(f"Commit {meta['commit']}, Python {meta['python']}, JSON {meta['json_backend']}, "
+              f"numpy {meta['numpy'] or 'not installed'}, best of {args.repeat}")
+        results = run_suite(args.types, args.market_files, args.items, args.repeat, not args.no_memory,
+                            data_directory)
+    finally:
+        shutil.rmtree(cache_directory, ignore_errors=True)
+        if not args.data:
+            shutil.rmtree(data_directory, ignore_errors=True)
+
+    current = {'meta': meta, 'results': results}
+    output = args.output or os.path.join(RESULTS_DIRECTORY, f"{meta['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as results_file:
+        json.dump(current, results_file, indent=2)
+    print(f"Saved {output}")
+
+    if args.compare:
+        return 1 if compare(load_results(args.compare), current, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# Deterministic synthetic DayZ economy data for the benchmarks: types.xml
+# files shaped like vanilla and mod files (categories, usage, value and tag
+# flags, comments) and folders of Expansion market JSON files. The same
+# seed and size always give byte-identical files.
+#
+#   python benchmarks/synthetic.py types 100000 types.xml
+#   python benchmarks/synthetic.py market 200 Market/ [--items 50]
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dayz_core
+import json_io
+
+CATEGORIES = ['weapons', 'tools', 'clothes', 'food', 'containers', 'explosives', 'vehiclesparts', 'lootdispatch']
+USAGES = ['Military', 'Police', 'Medic', 'Firefighter', 'Industrial', 'Farm', 'Coast', 'Town', 'Village',
+          'Hunting', 'Office', 'School', 'Prison', 'Lunapark', 'SeasonalEvent', 'ContaminatedArea']
+VALUES = ['Tier1', 'Tier2', 'Tier3', 'Tier4', 'Unique']
+TAGS = ['floor', 'shelves', 'ground']
+PREFIXES = {
+    'weapons': ['AK', 'M4A1', 'SVD', 'Mosin', 'FAL', 'Glock', 'Izh18', 'Saiga', 'Mag', 'Ammo'],
+    'tools': ['Hatchet', 'Pliers', 'Shovel', 'Lockpick', 'Wrench', 'Crowbar'],
+    'clothes': ['TShirt', 'Jeans', 'Hoodie', 'Boots', 'Gorka', 'Ballistic', 'Helmet', 'Gloves'],
+    'food': ['Can', 'Bag', 'Bottle', 'Fruit', 'Meat', 'Pills'],
+    'containers': ['Backpack', 'Barrel', 'Crate', 'Tent', 'SeaChest'],
+    'explosives': ['Grenade', 'Claymore', 'Plastic', 'Flashbang'],
+    'vehiclesparts': ['Wheel', 'Door', 'Hood', 'Trunk', 'SparkPlug', 'Battery'],
+    'lootdispatch': ['Wreck', 'Static', 'Land'],
+}
+COLORS = ['Black', 'Green', 'Tan', 'Camo', 'Grey', 'White', 'Red', 'Blue']
+
+
+def type_names(count, seed=1):
+    # Unique class names like M4A1_Green_417
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        category = CATEGORIES[rng.randrange(len(CATEGORIES))]
+        prefix = rng.choice(PREFIXES[category])
+        names.append((f"{prefix}_{rng.choice(COLORS)}_{i}", category))
+    return names
+
+
+def type_block(rng, name, category):
+    lines = [f'    <type name="{name}">']
+    nominal = rng.choice([0, 0, 1, 2, 3, 5, 8, 10, 15, 20, 30, 50])
+    lines.append(f'        <nominal>{nominal}</nominal>')
+    lines.append(f'        <lifetime>{rng.choice([3600, 7200, 14400, 28800, 45000])}</lifetime>')
+    lines.append(f'        <restock>{rng.choice([0, 0, 600, 1800, 3600])}</restock>')
+    lines.append(f'        <min>{nominal * rng.randint(2, 8) // 10}</min>')
+    lines.append(f'        <quantmin>{rng.choice([-1, -1, 10, 30])}</quantmin>')
+    lines.append(f'        <quantmax>{rng.choice([-1, -1, 50, 80, 100])}</quantmax>')
+    lines.append('        <cost>100</cost>')
+    lines.append('        <flags count_in_cargo="0" count_in_hoarder="0" count_in_map="1" count_in_player="0"'
+                 ' crafted="0" deloot="0"/>')
+    lines.append(f'        <category name="{category}"/>')
+    for usage in rng.sample(USAGES, rng.randint(0, 3)):
+        lines.append(f'        <usage name="{usage}"/>')
+    for value in rng.sample(VALUES, rng.randint(0, 2)):
+        lines.append(f'        <value name="{value}"/>')
+    if rng.random() < 0.2:
+        lines.append(f'        <tag name="{rng.choice(TAGS)}"/>')
+    lines.append('    </type>')
+    return '\n'.join(lines) + '\n'
+
+
+def write_types_xml(file_path, count, seed=1):
+    # A types.xml with `count` types, written in chunks. Returns file_path.
+    rng = random.Random(seed)
+    with open(file_path, 'w', encoding='utf-8', newline='\n') as types_file:
+        types_file.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<types>\n')
+        chunk = []
+        for i, (name, category) in enumerate(type_names(count, seed)):
+            if i % 500 == 0:
+                chunk.append(f'    <!-- {category} block {i // 500} -->\n')
+            chunk.append(type_block(rng, name, category))
+            if len(chunk) >= 1000:
+                types_file.write(''.join(chunk))
+                chunk = []
+        types_file.write(''.join(chunk))
+        types_file.write('</types>\n')
+    return file_path
+
+
+def write_market_folder(directory, file_count, items_per_file=50, seed=1):
+    # `file_count` Expansion market files of `items_per_file` items each. Returns the file paths.
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    names = type_names(file_count * items_per_file, seed)
+    file_paths = []
+    for number in range(file_count):
+        chunk = names[number * items_per_file:(number + 1) * items_per_file]
+        market_data = dayz_core.build_market_data([name for name, category in chunk], f"Market {number}")
+        for item in market_data["Items"]:
+            item["MaxPriceThreshold"] = rng.randint(10, 50000)
+            item["MinPriceThreshold"] = item["MaxPriceThreshold"] * rng.randint(30, 90) // 100
+            if rng.random() < 0.2:
+                item["Variants"] = [f"{item['ClassName']}_{color}" for color in rng.sample(COLORS, 3)]
+        file_path = os.path.join(directory, f"Market_{number:04d}.json")
+        json_io.dump(market_data, file_path, compact=False)
+        file_paths.append(file_path)
+    return file_paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write synthetic DayZ economy data")
+    parser.add_argument('kind', choices=['types', 'market'])
+    parser.add_argument('count', type=int, help="types, or market files")
+    parser.add_argument('output', help="types.xml path, or market folder")
+    parser.add_argument('--items', type=int, default=50, help="items per market file")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    if args.kind == 'types':
+        write_types_xml(args.output, args.count, args.seed)
+    else:
+        write_market_folder(args.output, args.count, args.items, args.seed)
+
+
+if __name__ == "__main__":
+    main()
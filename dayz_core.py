@@ -0,0 +1,128 @@
+# Headless core of the tool: the transforms behind every tab, usable from the
+# GUI, from dayztool.py on the command line, or from worker processes.
+# Nothing in here may import tkinter. The rule-based modules (and with them
+# NumPy) are imported inside the functions that use them, so commands that
+# do not need them start fast.
+import os
+
+import incremental
+import json_io
+
+DEFAULT_PRICE_THRESHOLD = 930
+DEFAULT_INIT_STOCK_PERCENT = 75.0
+
+
+# Market prices
+
+def adjust_market_prices(market_data, percentage):
+    # Scale Max/Min prices of every item in place, returns the number of items
+    from market_pricing import apply_price_rules, price_adjust_rules
+    apply_price_rules(market_data, price_adjust_rules(percentage))
+    return len(market_data.get("Items", []))
+
+
+def apply_max_to_min(market_data):
+    from market_pricing import apply_price_rules
+    apply_price_rules(market_data, "Min = Max")
+
+
+def load_json(file_path):
+    return json_io.load(file_path)
+
+
+def save_json(data, file_path, compact=None):
+    # Pretty (indent=4) unless compact, see json_io
+    json_io.dump(data, file_path, compact)
+
+
+def adjust_prices_in_file(file_path, percentage, output_directory, entry=None, force=False):
+    # Safe to run in a worker process, lets errors propagate. entry is this file's
+    # manifest entry from the last run (see incremental): when neither the input
+    # nor the percentage changed the file is skipped. Returns (item count, state,
+    # new manifest entry).
+    output_path = os.path.join(output_directory, os.path.basename(file_path))
+    data, input_hash = incremental.read_input(file_path)
+    params = incremental.params_key('prices', percentage, json_io.compact_default())
+    if not force and incremental.is_current(entry, output_path, input_hash, params):
+        return entry.get('items', 0), incremental.SKIPPED, entry
+
+    json_data = json_io.loads(data)
+    item_count = adjust_market_prices(json_data, percentage)
+    state, entry = incremental.write_output(output_path, json_io.dumps(json_data), input_hash, params, entry,
+                                            items=item_count)
+    return item_count, state, entry
+
+
+def list_json_files(directory):
+    return [os.path.join(directory, filename) for filename in sorted(os.listdir(directory))
+            if filename.endswith('.json')]
+
+
+def reprice_directory(input_directory, rules, output_directory):
+    # Rules run once across every market file of the directory (safe to run in a worker process).
+    # Returns (item count, output states, [(file, error)]) and raises RuleError for bad rules.
+    from market_pricing import reprice_files
+    report, item_count, states, errors = reprice_files(list_json_files(input_directory), rules, output_directory)
+    return item_count, states, errors
+
+
+# Types
+
+def adjust_types_file(file_path, save_path, nominal_adjustment, min_adjustment):
+    # Add the deltas to every nominal/min, never going below 0
+    apply_types_rules(file_path, save_path, f"nominal += {nominal_adjustment}; min += {min_adjustment}")
+
+
+def apply_types_rules(file_path, save_path, rules, dry_run=False):
+    # Run rules over a types.xml and write the result, returns the per-rule report
+    from types_model import load_types_table, write_types_changes
+    table = load_types_table(file_path)
+    report = table.apply(rules, dry_run=dry_run)
+    if not dry_run:
+        write_types_changes(file_path, save_path, table.changes(), table.text['name'])
+    return report
+
+
+# Market creation
+
+def market_item(class_name, max_price=DEFAULT_PRICE_THRESHOLD, min_price=DEFAULT_PRICE_THRESHOLD):
+    return {
+        "ClassName": class_name,
+        "MaxPriceThreshold": max_price,
+        "MinPriceThreshold": min_price,
+        "SellPricePercent": -1,
+        "MaxStockThreshold": 100,
+        "MinStockThreshold": 100,
+        "QuantityPercent": -1,
+        "SpawnAttachments": [],
+        "Variants": []
+    }
+
+
+def build_market_data(class_names, display_name="Market Data", init_stock_percent=DEFAULT_INIT_STOCK_PERCENT,
+                      max_price=DEFAULT_PRICE_THRESHOLD, min_price=DEFAULT_PRICE_THRESHOLD):
+    return {
+        "m_Version": 12,
+        "DisplayName": display_name,
+        "Icon": "Deliver",
+        "Color": "FBFCFEFF",
+        "IsExchange": 0,
+        "InitStockPercent": init_stock_percent,
+        "Items": [market_item(name, max_price, min_price) for name in class_names]
+    }
+
+
+# Events
+
+EVENT_PREFIXES = {"Vehicle": "Vehicle", "Animal": "Animal", "Mission": "Static"}
+
+
+def event_name(event_type, suffix):
+    # Raises ValueError for unknown event types
+    if event_type not in EVENT_PREFIXES:
+        raise ValueError(f"Invalid event type: {event_type!r}")
+    return f"{EVENT_PREFIXES[event_type]}{suffix}"
+
+
+# Placeholder positions until real ones are gathered
+SAMPLE_POSITIONS = [(6719.09, 5988.08), (4971.89, 9055.77)]
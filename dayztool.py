@@ -0,0 +1,487 @@
+# Command line front end for dayz_core, for cron jobs and headless servers.
+#
+#   python dayztool.py prices --percent -50 --in Market/ --out out/
+#   python dayztool.py rules --rules 'Max *= 1.2 where ClassName ~ "^M4"; round Max 5' --in Market/ --out out/
+#   python dayztool.py types --in types.xml --out types_new.xml --nominal 5 --min 2
+#   python dayztool.py types --in types.xml --out types_new.xml --rules 'min = nominal * 0.3 where category=weapons'
+#   python dayztool.py budget --in types.xml --in mods/MyMod/types.xml --events events.xml --rules 'nominal *= 2'
+#   python dayztool.py market --in types.xml --out Market.json --display-name "RaG Items"
+#   python dayztool.py batch-market --in mods/ --out Market/ --pricing prices.csv --rules 'Max = 2500 where value=Tier4'
+#   python dayztool.py merge --in mods/ --out types_merged.xml --policy priority --priority MyMod=10
+#   python dayztool.py index mission/ --where AKM --unpriced
+#   python dayztool.py event --type Vehicle --name Truck --nominal 5 --min 3 --max 5 \
+#       --child Truck_01_Covered:1:1 --out-dir mission/
+#   python dayztool.py events-batch --spec events.csv --mission mission/
+#   python dayztool.py spawns --mission mission/ --event VehicleTruck --count 40 --area chernarus
+#   python dayztool.py spawns --mission mission/ --check
+#
+# Only argparse and dayz_core are imported, never tkinter, so startup stays fast.
+import argparse
+import os
+import sys
+import time
+
+import dayz_core
+
+
+def cmd_prices(args):
+    import incremental
+    if os.path.isdir(args.input):
+        file_paths = dayz_core.list_json_files(args.input)
+    else:
+        file_paths = [args.input]
+    os.makedirs(args.output, exist_ok=True)
+    manifest = incremental.Manifest(args.output)
+
+    start = time.perf_counter()
+    item_count = 0
+    states = []
+    errors = []
+
+    def finish(file_path, result):
+        nonlocal item_count
+        count, state, entry = result
+        item_count += count
+        states.append(state)
+        manifest.update(os.path.basename(file_path), entry)
+
+    def job_args(file_path):
+        return file_path, args.percent, args.output, manifest.get(os.path.basename(file_path)), args.force
+
+    if args.workers == 1 or len(file_paths) < 2:
+        for file_path in file_paths:
+            try:
+                finish(file_path, dayz_core.adjust_prices_in_file(*job_args(file_path)))
+            except Exception as e:
+                errors.append((file_path, e))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = {executor.submit(dayz_core.adjust_prices_in_file, *job_args(file_path)): file_path
+                       for file_path in file_paths}
+            for future, file_path in futures.items():
+                try:
+                    finish(file_path, future.result())
+                except Exception as e:
+                    errors.append((file_path, e))
+    manifest.save()
+
+    for file_path, error in errors:
+        print(f"Error processing file {file_path}: {error}", file=sys.stderr)
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    print(f"Updated {len(file_paths) - len(errors)} files ({item_count} items) in {elapsed:.2f}s, "
+          f"{len(errors)} failed; {incremental.format_states(states)}")
+    return 1 if errors else 0
+
+
+def cmd_rules(args):
+    from incremental import format_states
+    from market_pricing import reprice_files, format_report
+    rules = args.rules
+    if args.rules_file:
+        with open(args.rules_file, 'r') as rules_file:
+            rules = rules_file.read()
+    if not rules:
+        print("Error: give --rules or --rules-file", file=sys.stderr)
+        return 2
+
+    file_paths = dayz_core.list_json_files(args.input) if os.path.isdir(args.input) else [args.input]
+    if not args.dry_run:
+        os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    report, item_count, states, errors = reprice_files(file_paths, rules, args.output, dry_run=args.dry_run,
+                                                       force=args.force)
+    print(format_report(report))
+    for file_path, error in errors:
+        print(f"Error processing file {file_path}: {error}", file=sys.stderr)
+    print(f"{item_count} items in {len(file_paths)} files in {time.perf_counter() - start:.2f}s"
+          + ("" if args.dry_run else f"; {format_states(states)}"))
+    return 1 if errors else 0
+
+
+def cmd_types(args):
+    if args.budget is not None:
+        return types_within_budget(args)
+    if args.rules:
+        from types_model import format_preview
+        report = dayz_core.apply_types_rules(args.input, args.output, args.rules, dry_run=args.dry_run)
+        print(format_preview(report))
+        if args.dry_run:
+            return 0
+    else:
+        dayz_core.adjust_types_file(args.input, args.output, args.nominal, args.min)
+    print(f"Wrote {args.output}")
+    return 0
+
+
+def types_within_budget(args):
+    # Same edits, but nothing is written when they push the estimate over --budget
+    from economy_budget import default_budget, find_events_file, load_budget
+    from types_model import format_preview, write_types_changes
+    budget = load_budget([args.input], args.events or find_events_file(args.input))
+    rules = args.rules or f"nominal += {args.nominal}; min += {args.min}"
+    report = budget.table.apply(rules)
+    if args.rules:
+        print(format_preview(report))
+    check = budget.check(args.budget or default_budget())
+    print(check)
+    if check.over:
+        print(f"Not writing {args.output}: over the entity budget", file=sys.stderr)
+        return 1
+    if args.dry_run:
+        return 0
+    write_types_changes(args.input, args.output, budget.table.changes(), budget.table.text['name'])
+    print(f"Wrote {args.output}")
+    return 0
+
+
+def cmd_budget(args):
+    from economy_budget import GROUPS, default_budget, find_events_file, load_budget
+    start = time.perf_counter()
+    budget = load_budget(args.input, args.events or find_events_file(args.input[0]))
+    print(f"Loaded {budget.table.size} types in {time.perf_counter() - start:.2f}s")
+    print(budget.report(args.by or GROUPS, args.limit))
+    if not args.rules:
+        return 0
+    start = time.perf_counter()
+    budget.table.apply(args.rules)
+    check = budget.check(args.budget or default_budget(), args.limit)
+    print(f"\nWith the rules ({(time.perf_counter() - start) * 1000:.0f} ms):\n{check}")
+    return 1 if check.over else 0
+
+
+def cmd_market(args):
+    from parse_cache import load_types_cached
+    names = [record.name for record in load_types_cached(args.input)]
+    market_data = dayz_core.build_market_data(names, args.display_name, args.init_stock,
+                                              args.max_price, args.min_price)
+    dayz_core.save_json(market_data, args.output)
+    print(f"Wrote {len(names)} items to {args.output}")
+    return 0
+
+
+def cmd_batch_market(args):
+    from market_batch import build_market_shards, format_batch_result, load_pricing_table
+    from profile_index import find_types_files
+    rules = args.rules
+    if args.rules_file:
+        with open(args.rules_file, 'r') as rules_file:
+            rules = rules_file.read()
+    pricing = load_pricing_table(args.pricing) if args.pricing else None
+    file_paths = [types_path for path in args.input for types_path in find_types_files(path)]
+    result = build_market_shards(file_paths, args.output, rules, pricing, args.shard_by, args.prefix,
+                                 args.init_stock, args.workers)
+    for file_path, error in result.errors:
+        print(f"Error processing file {file_path}: {error}", file=sys.stderr)
+    print(format_batch_result(result))
+    return 1 if result.errors else 0
+
+
+def parse_priority(text):
+    # NAME=N, NAME being a types file, its file name or a folder (mod) name in its path
+    name, separator, priority = text.rpartition('=')
+    try:
+        return name, int(priority)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=N, got {text!r}")
+
+
+def cmd_merge(args):
+    from profile_index import find_types_files
+    from types_merge import merge_types_files
+    file_paths = [types_path for path in args.input for types_path in find_types_files(path)]
+    merge = merge_types_files(file_paths, args.output, args.policy, dict(args.priority), args.report)
+    for file_path, error in merge.errors:
+        print(f"Error reading {file_path}: {error}", file=sys.stderr)
+    print(f"Merged {merge.total} types from {len(file_paths)} files into {len(merge.winners)} "
+          f"({len(merge.conflicts)} names in conflict) in {merge.elapsed:.2f}s, wrote {args.output}")
+    if args.report:
+        print(f"Conflict report: {args.report}")
+    return 1 if merge.errors else 0
+
+
+def cmd_cache(args):
+    import parse_cache
+    if args.action == 'clear':
+        print(f"Removed {parse_cache.clear_cache()} cached files")
+    else:
+        print(parse_cache.format_cache_info(parse_cache.cache_info()))
+    return 0
+
+
+def cmd_index(args):
+    import profile_index
+    index, (indexed, unchanged, removed, errors, elapsed) = profile_index.index_profile(
+        args.mission, args.types, args.market, args.db)
+    try:
+        for file_path, error in errors:
+            print(f"Error indexing {file_path}: {error}", file=sys.stderr)
+        stats = index.stats()
+        print(f"Indexed {indexed} files ({unchanged} unchanged, {removed} removed) in {elapsed:.2f}s: "
+              f"{stats['types']} types, {stats['market']} market items in {stats['files']} files")
+
+        for name in args.where:
+            types, market = index.where(name)
+            print(f"{name}:")
+            for type_name, file_path, line, nominal, minimum, category in types:
+                print(f"  defined {file_path}:{line} nominal={nominal} min={minimum} category={category}")
+            for class_name, file_path, line, max_price, min_price in market:
+                print(f"  priced  {file_path}:{line} max={max_price} min={min_price}")
+            if not types and not market:
+                print("  not found")
+        if args.unpriced:
+            rows = index.unpriced()
+            print(f"{len(rows)} types with nominal > 0 and no market entry:")
+            for name, file_path, line, nominal in rows:
+                print(f"  {name} (nominal {nominal}) {file_path}:{line}")
+        if args.orphans:
+            rows = index.orphans()
+            print(f"{len(rows)} market items without a types entry:")
+            for name, file_path, line in rows:
+                print(f"  {name} {file_path}:{line}")
+    finally:
+        index.close()
+    return 1 if errors else 0
+
+
+def parse_child(text):
+    # TYPE:MIN:MAX
+    try:
+        child_type, child_min, child_max = text.rsplit(':', 2)
+        return {'type': child_type, 'min': int(child_min), 'max': int(child_max)}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected TYPE:MIN:MAX, got {text!r}")
+
+
+def cmd_event(args):
+    # Merged into the files already in out-dir, a new spawns entry gets the sample positions
+    from events_merge import merge_event_files, spec_from_mapping
+    name = dayz_core.event_name(args.type, args.name)
+    # Values not given keep what an existing event has (0 for a new one)
+    values = {'name': name, 'nominal': args.nominal, 'min': args.min, 'max': args.max}
+    if args.child:
+        values['children'] = args.child  # Without --child an existing event keeps its children
+    spec = spec_from_mapping(values, name)
+    os.makedirs(args.out_dir, exist_ok=True)
+    for result in merge_event_files([spec], os.path.join(args.out_dir, 'events.xml'),
+                                    os.path.join(args.out_dir, 'cfgeventspawns.xml'),
+                                    default_positions=dayz_core.SAMPLE_POSITIONS):
+        print(result)
+    return 0
+
+
+def cmd_events_batch(args):
+    from events_merge import merge_event_files, read_spec
+    events_path, spawns_path = args.events, args.spawns
+    if args.mission:
+        events_path = events_path or os.path.join(args.mission, 'db', 'events.xml')
+        spawns_path = spawns_path or os.path.join(args.mission, 'cfgeventspawns.xml')
+    if not events_path or not spawns_path:
+        print("Error: give --mission, or --events and --spawns", file=sys.stderr)
+        return 2
+    specs = read_spec(args.spec)  # SpecError is a ValueError, reported by main()
+    results = merge_event_files(specs, events_path, spawns_path, args.out_dir, backup=not args.no_backup)
+    print(f"{len(specs)} events in {args.spec}")
+    for result in results:
+        print(f"  {result} ({result.elapsed:.2f}s)")
+    return 0
+
+
+def cmd_spawns(args):
+    import spawn_positions
+    from events_merge import EventSpec, merge_spawns_file
+    events_path, spawns_path = args.events, args.spawns
+    if args.mission:
+        events_path = events_path or os.path.join(args.mission, 'db', 'events.xml')
+        spawns_path = spawns_path or os.path.join(args.mission, 'cfgeventspawns.xml')
+    if not spawns_path:
+        print("Error: give --mission or --spawns", file=sys.stderr)
+        return 2
+    if args.check:
+        conflicts = spawn_positions.find_conflicts(spawn_positions.read_spawns(spawns_path),
+                                                   spawn_positions.read_event_radii(events_path),
+                                                   args.spacing or 0.0)
+        print(spawn_positions.format_conflicts(conflicts, args.limit))
+        return 1 if conflicts else 0
+    if not args.event or not args.count:
+        print("Error: give --event and --count, or --check", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    candidates, area = None, None
+    if args.points:
+        candidates = spawn_positions.read_points(args.points)
+    elif args.polygon:
+        area = spawn_positions.Area.from_polygon(spawn_positions.read_points(args.polygon))
+    else:
+        area = spawn_positions.Area(spawn_positions.parse_bounds(args.area))
+    positions, placement, conflicts = spawn_positions.place_event(
+        spawns_path, args.event, args.count, args.spacing, area, candidates, events_path, args.seed, args.append,
+        args.allow_fewer)
+    print(f"{placement} in {time.perf_counter() - start:.2f}s")
+    print(spawn_positions.format_conflicts(conflicts, args.limit))
+
+    spec = EventSpec(args.event)
+    spec.positions = positions
+    save_path = os.path.join(args.out_dir, os.path.basename(spawns_path)) if args.out_dir else spawns_path
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    result = merge_spawns_file(spawns_path, save_path, [spec], backup=not args.no_backup)
+    print(result)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='dayztool', description="Relliks Really Useful DayZ Tool (headless)")
+    parser.add_argument('--compact', action='store_true',
+                        help="write market JSON without indentation (smaller and faster to write)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    prices = commands.add_parser('prices', help="adjust Expansion market prices by a percentage")
+    prices.add_argument('--percent', type=float, required=True)
+    prices.add_argument('--in', dest='input', required=True, help="market JSON file or directory")
+    prices.add_argument('--out', dest='output', required=True, help="output directory")
+    prices.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    prices.add_argument('--force', action='store_true', help="recompute files the last run left unchanged")
+    prices.set_defaults(func=cmd_prices)
+
+    rules = commands.add_parser('rules', help="apply price rules across market files in one pass")
+    rules.add_argument('--rules', help="rules separated by ';'")
+    rules.add_argument('--rules-file', help="file with one rule per line")
+    rules.add_argument('--in', dest='input', required=True, help="market JSON file or directory")
+    rules.add_argument('--out', dest='output', required=True, help="output directory")
+    rules.add_argument('--dry-run', action='store_true', help="only report what would change")
+    rules.add_argument('--force', action='store_true', help="recompute files the last run left unchanged")
+    rules.set_defaults(func=cmd_rules)
+
+    types = commands.add_parser('types', help="add to nominal and min of every type, or apply rules")
+    types.add_argument('--in', dest='input', required=True)
+    types.add_argument('--out', dest='output', required=True)
+    types.add_argument('--nominal', type=int, default=0)
+    types.add_argument('--min', type=int, default=0)
+    types.add_argument('--rules', help="e.g. 'nominal *= 0.8 where category=weapons and usage=Military'")
+    types.add_argument('--dry-run', action='store_true', help="with --rules, only report what would change")
+    types.add_argument('--budget', type=float,
+                       help="write nothing when the estimated world entities end up above this entity budget "
+                       "(0: DAYZTOOL_ENTITY_BUDGET, else the loaded estimate + 25%%)")
+    types.add_argument('--events', help="with --budget, events.xml to count (default: next to --in)")
+    types.set_defaults(func=cmd_types)
+
+    budget = commands.add_parser('budget', help="nominal/min totals and estimated world entities of types files")
+    budget.add_argument('--in', dest='input', action='append', required=True, help="types file (repeatable)")
+    budget.add_argument('--events', help="events.xml (default: next to the first --in)")
+    budget.add_argument('--by', action='append', choices=['category', 'usage', 'value', 'file'],
+                        help="group totals to show (repeatable, default all)")
+    budget.add_argument('--limit', type=int, default=10, help="rows per group (default 10)")
+    budget.add_argument('--rules', help="check these rules against the budget, e.g. 'nominal *= 1.5'")
+    budget.add_argument('--budget', type=float,
+                        help="entity budget for --rules (0 or not given: DAYZTOOL_ENTITY_BUDGET, "
+                        "else the loaded estimate + 25%%)")
+    budget.set_defaults(func=cmd_budget)
+
+    market = commands.add_parser('market', help="create a market JSON from a types.xml")
+    market.add_argument('--in', dest='input', required=True)
+    market.add_argument('--out', dest='output', required=True)
+    market.add_argument('--display-name', default="Market Data")
+    market.add_argument('--init-stock', type=float, default=dayz_core.DEFAULT_INIT_STOCK_PERCENT)
+    market.add_argument('--max-price', type=float, default=dayz_core.DEFAULT_PRICE_THRESHOLD)
+    market.add_argument('--min-price', type=float, default=dayz_core.DEFAULT_PRICE_THRESHOLD)
+    market.set_defaults(func=cmd_market)
+
+    batch = commands.add_parser('batch-market', help="create market files per category from many types files")
+    batch.add_argument('--in', dest='input', action='append', required=True,
+                       help="types file or folder searched for *types*.xml (repeatable)")
+    batch.add_argument('--out', dest='output', required=True, help="output directory")
+    batch.add_argument('--pricing', help="CSV with ClassName and price columns, or market JSON file/folder")
+    batch.add_argument('--rules', help="price rules separated by ';', may use types fields")
+    batch.add_argument('--rules-file', help="file with one rule per line")
+    batch.add_argument('--shard-by', choices=['category', 'prefix'], default='category')
+    batch.add_argument('--prefix', default='', help="prepended to every market file name")
+    batch.add_argument('--init-stock', type=float, default=dayz_core.DEFAULT_INIT_STOCK_PERCENT)
+    batch.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    batch.set_defaults(func=cmd_batch_market)
+
+    merge = commands.add_parser('merge', help="merge and dedupe the types.xml files of several mods")
+    merge.add_argument('--in', dest='input', action='append', required=True,
+                       help="types file or folder searched for *types*.xml (repeatable, in load order)")
+    merge.add_argument('--out', dest='output', required=True)
+    merge.add_argument('--policy', choices=['first', 'last', 'max-nominal', 'priority'], default='last')
+    merge.add_argument('--priority', type=parse_priority, action='append', default=[], metavar='NAME=N',
+                       help="with --policy priority: priority of a file or mod folder (default 0)")
+    merge.add_argument('--report', help="write the conflict report to this file")
+    merge.set_defaults(func=cmd_merge)
+
+    cache = commands.add_parser('cache', help="inspect or clear the types.xml parse cache")
+    cache.add_argument('action', choices=['info', 'clear'], nargs='?', default='info')
+    cache.set_defaults(func=cmd_cache)
+
+    index = commands.add_parser('index', help="index a mission folder's types and market files, then query it")
+    index.add_argument('mission', help="mission folder with cfgeconomycore.xml")
+    index.add_argument('--types', action='append', default=[], help="extra mod types file or folder (repeatable)")
+    index.add_argument('--market', action='append', default=None,
+                       help="Expansion Market folder (repeatable, default: found next to the mission)")
+    index.add_argument('--db', help="index file (default: in the cache folder)")
+    index.add_argument('--where', action='append', default=[], metavar='CLASSNAME',
+                       help="show where a class is defined and priced")
+    index.add_argument('--unpriced', action='store_true', help="list types with nominal > 0 and no market entry")
+    index.add_argument('--orphans', action='store_true', help="list market items without a types entry")
+    index.set_defaults(func=cmd_index)
+
+    event = commands.add_parser('event', help="add or update one event in events.xml and cfgeventspawns.xml")
+    event.add_argument('--type', required=True, choices=sorted(dayz_core.EVENT_PREFIXES))
+    event.add_argument('--name', required=True, help="event name suffix")
+    event.add_argument('--nominal', type=int)
+    event.add_argument('--min', type=int)
+    event.add_argument('--max', type=int)
+    event.add_argument('--child', type=parse_child, action='append', default=[], metavar='TYPE:MIN:MAX')
+    event.add_argument('--out-dir', required=True, help="folder with the events.xml and cfgeventspawns.xml to merge into")
+    event.set_defaults(func=cmd_event)
+
+    events_batch = commands.add_parser('events-batch',
+                                       help="merge a CSV/JSON spec of events into events.xml and cfgeventspawns.xml")
+    events_batch.add_argument('--spec', required=True, help="CSV or JSON, see events_merge.py for the columns")
+    events_batch.add_argument('--mission', help="mission folder (db/events.xml and cfgeventspawns.xml)")
+    events_batch.add_argument('--events', help="events.xml to merge into")
+    events_batch.add_argument('--spawns', help="cfgeventspawns.xml to merge into")
+    events_batch.add_argument('--out-dir', help="write the merged files here instead of in place")
+    events_batch.add_argument('--no-backup', action='store_true', help="do not keep .bak copies of replaced files")
+    events_batch.set_defaults(func=cmd_events_batch)
+
+    spawns = commands.add_parser('spawns', help="generate spaced spawn positions for an event in cfgeventspawns.xml")
+    spawns.add_argument('--mission', help="mission folder (db/events.xml and cfgeventspawns.xml)")
+    spawns.add_argument('--events', help="events.xml with the distanceradius of each event")
+    spawns.add_argument('--spawns', help="cfgeventspawns.xml to merge into")
+    spawns.add_argument('--event', help="full event name, e.g. VehicleTruck")
+    spawns.add_argument('--count', type=int, help="positions to place")
+    spawns.add_argument('--spacing', type=float, help="minimum distance (default: the event's distanceradius); "
+                        "with --check, the radius of events without one")
+    spawns.add_argument('--area', default='chernarus', help="map name or x0,z0,x1,z1 (default chernarus)")
+    spawns.add_argument('--polygon', help="text/CSV file of x z corners to place inside")
+    spawns.add_argument('--points', help="text/CSV file or cfgeventspawns.xml of candidate points to pick from")
+    spawns.add_argument('--seed', type=int, help="random seed, for repeatable positions")
+    spawns.add_argument('--append', action='store_true', help="keep the event's current positions and add to them")
+    spawns.add_argument('--allow-fewer', action='store_true',
+                        help="write the positions that fit when not all --count do (never none)")
+    spawns.add_argument('--check', action='store_true', help="only report overlapping positions of different events")
+    spawns.add_argument('--limit', type=int, default=50, help="conflicts to list (default 50)")
+    spawns.add_argument('--out-dir', help="write cfgeventspawns.xml here instead of in place")
+    spawns.add_argument('--no-backup', action='store_true', help="do not keep a .bak copy of the replaced file")
+    spawns.set_defaults(func=cmd_spawns)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.compact:
+        os.environ['DAYZTOOL_JSON_COMPACT'] = '1'  # Also seen by worker processes
+    try:
+        return args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+# Load budget of an economy: nominal/min totals of a TypesTable per
+# category, usage, value tier and file, plus the entities events.xml spawns,
+# and a before/after check of pending edits against an entity budget.
+#
+# The central economy keeps between min and nominal of every type in the
+# world, so the nominal total is the steady-state item count. Each active
+# event adds nominal instances, each one spawned entity (vehicle, animal,
+# ...) plus the average lootmin..lootmax of its children as cargo. This is
+# an estimate for comparing edits, not an exact server count.
+#
+# Group rows are exploded once per table (a type with two usages counts for
+# both, so group totals can add up to more than the file total); totals are
+# then one bincount per column, so a check over 100k types takes
+# milliseconds. Plain loops are used without NumPy.
+import os
+import xml.etree.ElementTree as ET
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+GROUPS = ('category', 'usage', 'value', 'file')
+NO_GROUP = '(none)'
+DEFAULT_HEADROOM = 0.25  # Without a budget, edits may grow the loaded total by this much
+BUDGET_ENVIRONMENT = 'DAYZTOOL_ENTITY_BUDGET'
+
+
+def default_budget():
+    # Entity budget from DAYZTOOL_ENTITY_BUDGET, None when unset
+    text = os.environ.get(BUDGET_ENVIRONMENT, '').strip()
+    return float(text) if text else None
+
+
+def _counts(column):
+    # Missing values count as 0, and so do negative ones (they are written as 0)
+    if np is not None:
+        return np.clip(np.nan_to_num(np.asarray(column, dtype=float), nan=0.0), 0, None)
+    return [value if value == value and value > 0 else 0.0 for value in column]
+
+
+def _total(values):
+    return float(values.sum()) if np is not None else float(sum(values))
+
+
+class GroupIndex:
+    # Row -> group codes of one text column, multi-valued columns exploded
+    def __init__(self, values):
+        codes = {}
+        rows, groups = [], []
+        for row, value in enumerate(values):
+            names = value if isinstance(value, tuple) else (value,)
+            names = [name for name in names if name] or [NO_GROUP]
+            for name in names:
+                rows.append(row)
+                groups.append(codes.setdefault(name, len(codes)))
+        self.names = list(codes)
+        if np is not None:
+            self.rows = np.array(rows, dtype=np.intp)
+            self.codes = np.array(groups, dtype=np.intp)
+        else:
+            self.rows, self.codes = rows, groups
+
+    def totals(self, counts):
+        # Sum of counts per group, in self.names order
+        if np is not None:
+            return np.bincount(self.codes, weights=counts[self.rows], minlength=len(self.names))
+        sums = [0.0] * len(self.names)
+        for row, code in zip(self.rows, self.codes):
+            sums[code] += counts[row]
+        return sums
+
+
+# events.xml
+
+class EventLoad:
+    __slots__ = ('name', 'nominal', 'active', 'loot')
+
+    def __init__(self, name, nominal, active, loot):
+        self.name = name
+        self.nominal = nominal
+        self.active = active
+        self.loot = loot  # Average cargo items per spawned child
+
+    @property
+    def entities(self):
+        return self.nominal * (1 + self.loot) if self.active else 0.0
+
+
+def _int(text, default=0):
+    try:
+        return int(float(text))
+    except (TypeError, ValueError):
+        return default
+
+
+def read_event_loads(file_path):
+    # [EventLoad] of an events.xml, [] when there is none
+    if not file_path or not os.path.exists(file_path):
+        return []
+    loads = []
+    for event in ET.parse(file_path).getroot().iter('event'):
+        children = event.findall('children/child')
+        loot = [(_int(child.get('lootmin')) + _int(child.get('lootmax'))) / 2 for child in children]
+        loads.append(EventLoad(event.get('name', ''), max(0, _int(event.findtext('nominal'))),
+                               _int(event.findtext('active'), 1) != 0, sum(loot) / len(loot) if loot else 0.0))
+    return loads
+
+
+def find_events_file(types_path):
+    # events.xml next to a types.xml (mission/db/), or None
+    if not types_path:
+        return None
+    events_path = os.path.join(os.path.dirname(os.path.abspath(types_path)), 'events.xml')
+    return events_path if os.path.exists(events_path) else None
+
+
+def event_prefix(name):
+    # Vehicle, Animal, Infected, Static, Item, ... from an event name
+    for position in range(1, len(name)):
+        if name[position].isupper() or name[position] == '_':
+            return name[:position]
+    return name
+
+
+# The analyzer
+
+class BudgetCheck:
+    def __init__(self, before, after, budget, changes):
+        self.before = before  # Estimated world entities of the loaded files
+        self.after = after  # ... with the pending edits
+        self.budget = budget
+        self.changes = changes  # [(group field, name, nominal before, nominal after)], largest growth first
+
+    @property
+    def over(self):
+        return self.after > self.budget and self.after > self.before
+
+    def __str__(self):
+        change = self.after - self.before
+        percent = f" ({change / self.before:+.1%})" if self.before else ""
+        lines = [f"Estimated world entities: {self.before:,.0f} -> {self.after:,.0f}{percent}, "
+                 f"budget {self.budget:,.0f}" + (" - OVER BUDGET" if self.over else "")]
+        for field, name, old, new in self.changes:
+            lines.append(f"  {field} {name}: {old:,.0f} -> {new:,.0f} ({new - old:+,.0f})")
+        return "\n".join(lines)
+
+
+class EconomyBudget:
+    def __init__(self, table, events=()):
+        self.table = table
+        self.events = list(events)
+        self.groups = {field: GroupIndex(table.text[field]) for field in GROUPS if field in table.text}
+
+    def counts(self, field, baseline=False):
+        columns = self.table.baseline if baseline else self.table.numeric
+        return _counts(columns[field])
+
+    def event_entities(self):
+        return sum(event.entities for event in self.events)
+
+    def estimate(self, baseline=False):
+        # Steady-state world entities: every nominal plus what the events spawn
+        return _total(self.counts('nominal', baseline)) + self.event_entities()
+
+    def group_totals(self, field, baseline=False):
+        # [(group, nominal, min)] of one group field, largest nominal first
+        group = self.groups[field]
+        nominal = group.totals(self.counts('nominal', baseline))
+        minimum = group.totals(self.counts('min', baseline))
+        rows = [(name, float(nominal[code]), float(minimum[code])) for code, name in enumerate(group.names)]
+        return sorted(rows, key=lambda row: (-row[1], row[0]))
+
+    def check(self, budget=None, limit=5):
+        # Pending edits against budget (default: the loaded estimate plus DEFAULT_HEADROOM)
+        before, after = self.estimate(baseline=True), self.estimate()
+        if budget is None:
+            budget = before * (1 + DEFAULT_HEADROOM)
+        changes = []
+        for field, group in self.groups.items():
+            if field == 'file' and len(group.names) < 2:
+                continue
+            old = group.totals(self.counts('nominal', baseline=True))
+            new = group.totals(self.counts('nominal'))
+            changes.extend((field, name, float(old[code]), float(new[code])) for code, name in enumerate(group.names)
+                           if new[code] != old[code])
+        changes.sort(key=lambda change: change[2] - change[3])
+        return BudgetCheck(before, after, budget, changes[:limit])
+
+    def report(self, fields=GROUPS, limit=None):
+        nominal, minimum = _total(self.counts('nominal')), _total(self.counts('min'))
+        events = self.event_entities()
+        lines = [f"{self.table.size} types: nominal {nominal:,.0f}, min {minimum:,.0f}",
+                 f"Events: {sum(1 for event in self.events if event.active)} active, about {events:,.0f} entities",
+                 f"Estimated world entities: {nominal + events:,.0f}"]
+        for field in fields:
+            if field not in self.groups or (field == 'file' and len(self.groups[field].names) < 2):
+                continue
+            rows = self.group_totals(field)
+            lines.append(f"\nBy {field}" + (" (types with several count in each)" if field in ('usage', 'value') else ""))
+            for name, group_nominal, group_min in rows[:limit]:
+                share = group_nominal / nominal if nominal else 0.0
+                lines.append(f"  {name:30s} nominal {group_nominal:10,.0f} ({share:6.1%})  min {group_min:10,.0f}")
+            if limit is not None and len(rows) > limit:
+                lines.append(f"  ... and {len(rows) - limit} more")
+        if self.events:
+            by_prefix = {}
+            for event in self.events:
+                by_prefix[event_prefix(event.name)] = by_prefix.get(event_prefix(event.name), 0.0) + event.entities
+            lines.append("\nBy event type")
+            for prefix, entities in sorted(by_prefix.items(), key=lambda item: -item[1]):
+                lines.append(f"  {prefix:30s} about {entities:10,.0f} entities")
+        return "\n".join(lines)
+
+
+def load_budget(file_paths, events_path=None):
+    # EconomyBudget of one or more types files (the file column holds the file names)
+    from parse_cache import load_types_cached
+    from types_model import TypesTable
+    records, sources = [], []
+    for file_path in file_paths:
+        loaded = load_types_cached(file_path)
+        records.extend(loaded)
+        sources.extend([os.path.basename(file_path)] * len(loaded))
+    return EconomyBudget(TypesTable(records, sources), read_event_loads(events_path))
@@ -1,7 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
-import xml.etree.ElementTree as ET
+from workers import shared
+from events_merge import merge_event_files, read_spec, spec_from_mapping, SpecError
+import spawn_positions
+import dayz_core
+import perf
 
 class EventCreator:
     def __init__(self, master):
@@ -15,6 +19,11 @@ class EventCreator:
         self.min_value = tk.IntVar()
         self.max_value = tk.IntVar()
         self.children = []
+        self.spawn_count = tk.IntVar(value=0)  # 0: a new event gets the sample positions
+        self.spawn_spacing = tk.StringVar()  # Blank: the event's distanceradius
+        self.spawn_area = tk.StringVar(value="Chernarus")
+        self.points_path = None
+        self.workers = shared(self.frame)  # File I/O runs off the Tk thread
 
         self.create_widgets()
 
@@ -59,6 +68,22 @@ class EventCreator:
         ttk.Entry(self.frame, textvariable=self.save_directory).grid(row=7, column=1)
         ttk.Button(self.frame, text="Browse", command=self.browse_directory).grid(row=7, column=2)
 
+        # Many events at once from a CSV/JSON spec, merged into the files of the save directory
+        ttk.Button(self.frame, text="Batch from Spec...", command=self.batch_from_spec).grid(row=8, column=1, sticky='ew')
+
+        # Generated spawn positions, kept apart from every position in the save directory's cfgeventspawns.xml
+        self.spawn_frame = ttk.LabelFrame(self.frame, text="Spawn Positions")
+        self.spawn_frame.grid(row=9, column=0, columnspan=3, pady=10, sticky='ew')
+        ttk.Label(self.spawn_frame, text="Count:").grid(row=0, column=0)
+        ttk.Entry(self.spawn_frame, textvariable=self.spawn_count).grid(row=0, column=1)
+        ttk.Label(self.spawn_frame, text="Min Spacing:").grid(row=1, column=0)
+        ttk.Entry(self.spawn_frame, textvariable=self.spawn_spacing).grid(row=1, column=1)
+        ttk.Label(self.spawn_frame, text="Area:").grid(row=2, column=0)
+        self.spawn_area_combobox = ttk.Combobox(self.spawn_frame, textvariable=self.spawn_area, state='readonly',
+                                                values=[name.capitalize() for name in spawn_positions.MAPS])
+        self.spawn_area_combobox.grid(row=2, column=1)
+        ttk.Button(self.spawn_frame, text="Import Points...", command=self.import_points).grid(row=2, column=2)
+
     def create_child_widgets(self):
         # Child Type
         ttk.Label(self.child_frame, text="Child Type:").grid(row=0, column=0)
@@ -71,6 +96,17 @@ class EventCreator:
         ttk.Label(self.child_frame, text="Max:").grid(row=2, column=0)
         ttk.Entry(self.child_frame, textvariable=self.child_max).grid(row=2, column=1)
 
+    def import_points(self):
+        # Candidate points instead of a whole map, e.g. road positions exported from an editor
+        file_path = filedialog.askopenfilename(filetypes=[("Point lists", "*.csv *.txt *.xml"), ("All files", "*.*")])
+        if not file_path:
+            return
+        self.points_path = file_path
+        values = list(self.spawn_area_combobox['values'])
+        label = f"Points: {os.path.basename(file_path)}"
+        self.spawn_area_combobox['values'] = [value for value in values if not value.startswith("Points: ")] + [label]
+        self.spawn_area.set(label)
+
     def add_child(self):
         child_info = {
             'type': self.child_type.get(),
@@ -92,69 +128,84 @@ class EventCreator:
             return
 
         # Construct the event name based on the event type
-        if event_type == "Vehicle":
-            event_name = f"Vehicle{event_suffix}"
-        elif event_type == "Animal":
-            event_name = f"Animal{event_suffix}"
-        elif event_type == "Mission":
-            event_name = f"Static{event_suffix}"
-        else:
+        try:
+            event_name = dayz_core.event_name(event_type, event_suffix)
+        except ValueError:
             messagebox.showerror("Error", "Invalid event type selected.")
             return
 
-        events_elem = ET.Element("events")
-        event_elem = ET.SubElement(events_elem, "event", name=event_name)
-
-        for field, value in [('nominal', self.nominal.get()), 
-                             ('min', self.min_value.get()), 
-                             ('max', self.max_value.get()), 
-                             ('lifetime', '300'), 
-                             ('restock', '0'), 
-                             ('saferadius', '500'), 
-                             ('distanceradius', '500'), 
-                             ('cleanupradius', '200'), 
-                             ('active', '1')]:
-            ET.SubElement(event_elem, field).text = str(value)
-
-        flags_elem = ET.SubElement(event_elem, "flags", deletable="0", init_random="0", remove_damaged="1")
-        ET.SubElement(event_elem, "position").text = "fixed"
-        ET.SubElement(event_elem, "limit").text = "mixed"
-
-        children_elem = ET.SubElement(event_elem, "children")
-        for child in self.children:
-            ET.SubElement(children_elem, "child", 
-                          lootmax="0", 
-                          lootmin="0", 
-                          max=str(child['max']), 
-                          min=str(child['min']), 
-                          type=child['type'])
-
-        # Create events.xml
-        self.save_xml(events_elem, "events.xml")
-
-        # Create cfgeventspawns.xml
-        self.create_event_spawns_xml(event_name)
-
-    def create_event_spawns_xml(self, event_name):
-        cfgeventspawns_elem = ET.Element("eventposdef")
-        event_elem = ET.SubElement(cfgeventspawns_elem, "event", name=event_name)
-
-        # Here you would gather positions, for now, we will use sample positions.
-        sample_positions = [(6719.09, 5988.08), (4971.89, 9055.77)]
-        for x, z in sample_positions:
-            ET.SubElement(event_elem, "pos", x=str(x), z=str(z), a="0")
-
-        self.save_xml(cfgeventspawns_elem, "cfgeventspawns.xml")
-
-    def save_xml(self, elem, filename):
+        operation = perf.start("generate_xml", event_name)
+        values = {'name': event_name, 'nominal': self.nominal.get(), 'min': self.min_value.get(),
+                  'max': self.max_value.get()}
+        if self.children:
+            values['children'] = self.children
+        try:
+            with operation.phase("transform", len(self.children)):
+                spec = spec_from_mapping(values, event_name)
+            count = self.spawn_count.get()
+            spacing = float(self.spawn_spacing.get()) if self.spawn_spacing.get().strip() else None
+        except (SpecError, tk.TclError, ValueError) as e:
+            operation.finish(f"error: {e}")
+            messagebox.showerror("Error", str(e))
+            return
+
+        # Merged into the events.xml and cfgeventspawns.xml already in the save directory.
+        # Without a spawn count a new event gets sample positions and an existing one keeps its own.
+        prepare = None
+        if count > 0:
+            area_name = self.spawn_area.get()
+            points_path = self.points_path if area_name.startswith("Points: ") else None
+
+            def place_positions(directory):
+                with operation.phase("place positions", count):
+                    candidates = spawn_positions.read_points(points_path) if points_path else None
+                    area = None if points_path else spawn_positions.Area(spawn_positions.MAPS[area_name.lower()])
+                    spec.positions, placement, conflicts = spawn_positions.place_event(
+                        os.path.join(directory, "cfgeventspawns.xml"), event_name, count, spacing, area, candidates,
+                        os.path.join(directory, "events.xml"))
+                return [str(placement), spawn_positions.format_conflicts(conflicts, 10)]
+
+            prepare = place_positions
+
+        self.merge_events([spec], operation, dayz_core.SAMPLE_POSITIONS, prepare)
+
+    def batch_from_spec(self):
+        spec_path = filedialog.askopenfilename(filetypes=[("Event specs", "*.csv *.json"), ("All files", "*.*")])
+        if not spec_path:
+            return
+
+        operation = perf.start("batch_events", os.path.basename(spec_path))
+        try:
+            with operation.phase("parse") as phase:
+                specs = read_spec(spec_path)
+                phase.items = len(specs)
+        except (OSError, ValueError) as e:
+            operation.finish(f"error: {e}")
+            messagebox.showerror("Error", f"Error reading {os.path.basename(spec_path)}: {e}")
+            return
+        self.merge_events(specs, operation)
+
+    def merge_events(self, specs, operation, default_positions=None, prepare=None):
+        # prepare(directory), when given, runs first in the worker and returns extra lines for the summary
         directory = self.save_directory.get()
-        if not os.path.exists(directory):
-            os.makedirs(directory)
 
-        filepath = os.path.join(directory, filename)
-        tree = ET.ElementTree(elem)
-        tree.write(filepath, encoding='utf-8', xml_declaration=True)
-        messagebox.showinfo("Success", f"{filename} saved successfully!")
+        def merge(task):
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            notes = prepare(directory) if prepare else []
+            with operation.phase("serialize", len(specs)):
+                results = merge_event_files(specs, os.path.join(directory, "events.xml"),
+                                            os.path.join(directory, "cfgeventspawns.xml"),
+                                            default_positions=default_positions)
+            return [str(result) for result in results] + notes
+
+        def merged(lines):
+            operation.finish()
+            messagebox.showinfo("Success", "\n".join(lines))
+
+        self.workers.submit("Merging events.xml and cfgeventspawns.xml", merge, on_done=merged,
+                            on_error=lambda e: messagebox.showerror("Error", f"Error saving XML: {e}"),
+                            operation=operation)
 
     def browse_directory(self):
         directory = filedialog.askdirectory()
@@ -0,0 +1,379 @@
+# Merge event definitions into a mission's existing events.xml and
+# cfgeventspawns.xml instead of overwriting them.
+#
+# A spec (CSV or JSON) lists events with any of their fields, children and
+# spawn positions. Both files are read once and written once: a name index
+# of the spec decides, for every <event> of the file, whether its raw bytes
+# are copied as they are or the element is updated (only the fields the spec
+# gives, children and positions are replaced when given), and events the
+# file does not have yet are added before its closing tag. Comments,
+# formatting and untouched events stay byte for byte, an event name is never
+# written twice, and the result replaces the file atomically. A run that
+# changes nothing leaves the file and its .bak alone.
+#
+# CSV columns: name (or event_type + suffix, see dayz_core.event_name),
+# nominal, min, max, lifetime, restock, saferadius, distanceradius,
+# cleanupradius, active, position, limit, deletable, init_random,
+# remove_damaged, children ("Type:min:max[:lootmin:lootmax];..."),
+# positions ("x:z[:a];..."). Empty cells are left out. JSON: a list of
+# objects (or {"events": [...]}) with the same keys, where children may also
+# be {"type", "min", "max", ...} objects and positions [x, z, a] lists or
+# {"x", "z", "a"} objects.
+import csv
+import json
+import math
+import os
+import re
+import shutil
+import time
+import xml.etree.ElementTree as ET
+
+import dayz_core
+from incremental import atomic_open
+
+_EVENT = re.compile(rb'<!--.*?-->|<event\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</event\s*>)', re.S)
+_NAME = re.compile(rb'\bname\s*=\s*(["\'])(.*?)\1', re.S)
+
+# Child elements of an <event> in the order vanilla files use, with the defaults of new events
+EVENT_FIELDS = {
+    'nominal': '0', 'min': '0', 'max': '0', 'lifetime': '300', 'restock': '0', 'saferadius': '500',
+    'distanceradius': '500', 'cleanupradius': '200', 'flags': None, 'position': 'fixed', 'limit': 'mixed',
+    'active': '1', 'children': None,
+}
+TEXT_FIELDS = {'position', 'limit'}
+FLAGS = {'deletable': '0', 'init_random': '0', 'remove_damaged': '1'}
+CHILD_DEFAULTS = {'lootmax': '0', 'lootmin': '0', 'max': '1', 'min': '1'}
+
+EVENTS_ROOT = 'events'
+SPAWNS_ROOT = 'eventposdef'
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+
+class SpecError(ValueError):
+    pass
+
+
+class EventSpec:
+    __slots__ = ('name', 'fields', 'flags', 'children', 'positions')
+
+    def __init__(self, name):
+        self.name = name
+        self.fields = {}  # Field -> text
+        self.flags = {}  # Flag attribute -> text
+        self.children = None  # [{'type', 'min', 'max', 'lootmin', 'lootmax'}], None keeps the file's
+        self.positions = None  # [(x, z, a)], None keeps the file's
+
+    def update(self, other):
+        # A later spec entry with the same name adds to (and overrides) this one
+        self.fields.update(other.fields)
+        self.flags.update(other.flags)
+        if other.children is not None:
+            self.children = other.children
+        if other.positions is not None:
+            self.positions = other.positions
+
+
+# Reading specs
+
+def _number(text, what, integer=True):
+    # Checked, but floats are written the way the spec gave them, so 100 stays 100
+    try:
+        if integer:
+            return str(int(text))
+        if math.isfinite(float(text)):
+            return str(text).strip()
+    except (TypeError, ValueError):
+        pass
+    raise SpecError(f"{what}: expected a {'whole ' if integer else ''}number, got {text!r}")
+
+
+def _parse_child(child, where):
+    if isinstance(child, dict):
+        values = {key.lower(): value for key, value in child.items()}
+    else:
+        parts = str(child).strip().split(':')
+        if len(parts) not in (3, 5) or not parts[0]:
+            raise SpecError(f"{where}: expected Type:min:max[:lootmin:lootmax], got {child!r}")
+        values = dict(zip(('type', 'min', 'max', 'lootmin', 'lootmax'), parts))
+    if not values.get('type'):
+        raise SpecError(f"{where}: child without a type")
+    parsed = {'type': str(values['type'])}
+    for key, default in CHILD_DEFAULTS.items():
+        parsed[key] = _number(values[key], f"{where} child {parsed['type']} {key}") if key in values else default
+    return parsed
+
+
+def _parse_position(position, where):
+    if isinstance(position, dict):
+        values = [position.get('x'), position.get('z'), position.get('a', 0)]
+    elif isinstance(position, (list, tuple)):
+        values = list(position) + [0] * (3 - len(position))
+    else:
+        values = str(position).strip().split(':')
+        values += ['0'] * (3 - len(values))
+    if len(values) != 3 or values[0] is None or values[1] is None:
+        raise SpecError(f"{where}: expected x:z[:a], got {position!r}")
+    x, z, a = values
+    return _number(x, f"{where} x", False), _number(z, f"{where} z", False), _number(a, f"{where} a", False)
+
+
+def _split_list(value):
+    if isinstance(value, str):
+        return [part for part in re.split(r'[;|]', value) if part.strip()]
+    return list(value)
+
+
+def spec_from_mapping(values, where):
+    values = {str(key).strip().lower(): value for key, value in values.items()
+              if key is not None and value is not None and value != ''}
+    name = values.get('name')
+    if not name and values.get('event_type'):
+        try:
+            name = dayz_core.event_name(values['event_type'], values.get('suffix', ''))
+        except ValueError as e:
+            raise SpecError(f"{where}: {e}")
+    if not name:
+        raise SpecError(f"{where}: no event name (give name, or event_type and suffix)")
+    spec = EventSpec(str(name).strip())
+    where = f"{where} ({spec.name})"
+    for field in EVENT_FIELDS:
+        if field in values and field not in ('flags', 'children'):
+            text = str(values[field]).strip()
+            spec.fields[field] = text if field in TEXT_FIELDS else _number(text, f"{where} {field}")
+    for flag in FLAGS:
+        if flag in values:
+            spec.flags[flag] = _number(values[flag], f"{where} {flag}")
+    if 'children' in values:
+        spec.children = [_parse_child(child, where) for child in _split_list(values['children'])]
+    if 'positions' in values:
+        spec.positions = [_parse_position(position, where) for position in _split_list(values['positions'])]
+    return spec
+
+
+def read_spec(file_path):
+    # EventSpecs in first-seen order, entries repeating a name are folded into the first
+    if file_path.lower().endswith('.json'):
+        with open(file_path, 'r', encoding='utf-8-sig') as spec_file:
+            data = json.load(spec_file)
+        rows = data.get('events', []) if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise SpecError(f"{file_path}: expected a list of event objects")
+        entries = [spec_from_mapping(row, f"event {number}") for number, row in enumerate(rows, 1)]
+    else:
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as spec_file:
+            entries = [spec_from_mapping(row, f"line {number}") for number, row in enumerate(csv.DictReader(spec_file), 2)]
+
+    specs = {}
+    for entry in entries:
+        if entry.name in specs:
+            specs[entry.name].update(entry)
+        else:
+            specs[entry.name] = entry
+    return list(specs.values())
+
+
+# Building elements
+
+def _serialize(elem):
+    ET.indent(elem, space='    ', level=1)
+    return ET.tostring(elem, encoding='unicode').replace(' />', '/>').encode('utf-8')
+
+
+def _set_field(event, field, text):
+    # Existing element, or a new one at its place in EVENT_FIELDS order
+    elem = event.find(field)
+    if elem is None:
+        order = list(EVENT_FIELDS)
+        position = len(event)
+        if field in order:
+            later = set(order[order.index(field) + 1:])
+            position = next((i for i, child in enumerate(event) if child.tag in later), len(event))
+        elem = ET.Element(field)
+        event.insert(position, elem)
+    if text is not None:
+        elem.text = text
+    return elem
+
+
+def apply_event_spec(event, spec):
+    for field, text in spec.fields.items():
+        _set_field(event, field, text)
+    if spec.flags:
+        flags = _set_field(event, 'flags', None)
+        for flag, text in spec.flags.items():
+            flags.set(flag, text)
+    if spec.children is not None:
+        children = _set_field(event, 'children', None)
+        children.clear()
+        for child in spec.children:
+            ET.SubElement(children, 'child', lootmax=child['lootmax'], lootmin=child['lootmin'],
+                          max=child['max'], min=child['min'], type=child['type'])
+
+
+def new_event(spec):
+    event = ET.Element('event', name=spec.name)
+    for field, default in EVENT_FIELDS.items():
+        if field == 'flags':
+            ET.SubElement(event, 'flags', **FLAGS)
+        elif field != 'children':
+            ET.SubElement(event, field).text = default
+    apply_event_spec(event, spec)
+    if event.find('children') is None:
+        ET.SubElement(event, 'children')
+    return _serialize(event)
+
+
+def updated_event(blob, spec):
+    event = ET.fromstring(blob)
+    apply_event_spec(event, spec)
+    return _serialize(event)
+
+
+def apply_spawn_spec(event, positions):
+    # Replace the <pos> children, anything else (zones) is kept after them
+    for pos in event.findall('pos'):
+        event.remove(pos)
+    for position, (x, z, a) in enumerate(positions):
+        pos = ET.Element('pos', x=x, z=z, a=a)
+        event.insert(position, pos)
+
+
+def new_spawns(spec, positions):
+    event = ET.Element('event', name=spec.name)
+    apply_spawn_spec(event, positions)
+    return _serialize(event)
+
+
+def updated_spawns(blob, positions):
+    event = ET.fromstring(blob)
+    apply_spawn_spec(event, positions)
+    return _serialize(event)
+
+
+# Merging
+
+class MergeResult:
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.kept = 0
+        self.updated = 0
+        self.added = 0
+        self.duplicates = 0  # Later copies of a merged name, dropped
+        self.written = False  # False when the file already held the result
+        self.elapsed = 0.0
+
+    def __str__(self):
+        duplicates = f", {self.duplicates} duplicates removed" if self.duplicates else ""
+        return (f"{os.path.basename(self.file_path)}: {self.updated} updated, {self.added} added, "
+                f"{self.kept} kept{duplicates}" + ("" if self.written else ", file unchanged"))
+
+
+def merge_file(source_path, save_path, root, specs, update, create, backup=True):
+    # One pass over source_path (missing files start empty), written to
+    # save_path unless it already holds the result. update(blob, spec) and create(spec) return the new
+    # element bytes, create may return None to add nothing.
+    start = time.perf_counter()
+    result = MergeResult(save_path)
+    try:
+        with open(source_path, 'rb') as source:
+            data = source.read()
+    except FileNotFoundError:
+        data = b''
+    if not data.strip():
+        data = XML_DECLARATION + b'<%s>\n</%s>\n' % (root.encode(), root.encode())
+
+    closing = list(re.finditer(rb'</%s\s*>' % re.escape(root.encode()), data))
+    if not closing:
+        raise ValueError(f"{source_path}: no closing </{root}> tag")
+    end = closing[-1].start()
+
+    index = {spec.name: spec for spec in specs}  # Name -> spec, entries are removed once merged
+    merged = set()
+    target = []  # Output chunks; the source is in memory already
+    position = 0
+    for match in _EVENT.finditer(data, 0, end):
+        attrs = match.group('attrs')
+        name = _NAME.search(attrs) if attrs is not None else None
+        if name is None:
+            continue  # Comment or unnamed, copied with the text around it
+        name = name.group(2).decode('utf-8', 'replace')
+        if name in merged:
+            # A second copy of a merged event: drop it with the whitespace before it
+            target.append(data[position:match.start()].rstrip(b' \t'))
+            position = match.end()
+            if data[position:position + 1] == b'\n':
+                position += 1
+            result.duplicates += 1
+            continue
+        spec = index.pop(name, None)
+        if spec is None:
+            result.kept += 1
+            continue
+        merged.add(name)
+        blob = update(match.group(0), spec)
+        if blob == match.group(0):
+            result.kept += 1  # Already as the spec wants it
+            continue
+        target.append(data[position:match.start()])
+        target.append(blob)
+        position = match.end()
+        result.updated += 1
+
+    # Events the file did not have go before the closing tag, each on its own line
+    head = data[position:end]
+    body = head.rstrip(b' \t')
+    target.append(body)
+    blobs = [blob for blob in map(create, index.values()) if blob is not None]
+    if blobs and not data[:position + len(body)].endswith(b'\n'):
+        target.append(b'\n')
+    for blob in blobs:
+        target.append(b'    ' + blob + b'\n')
+    result.added = len(blobs)
+    target.append(head[len(body):])
+    target.append(data[end:])
+    output = b''.join(target)
+    # Nothing to do when the target already holds exactly this, so a repeated
+    # run neither rewrites the file nor replaces the .bak of the real change
+    unchanged = False
+    if os.path.exists(save_path):
+        with open(save_path, 'rb') as current:
+            unchanged = current.read() == output
+    result.written = not unchanged
+    if not unchanged:
+        with atomic_open(save_path) as output_file:
+            output_file.write(output)
+            if backup and os.path.exists(save_path):
+                shutil.copy2(save_path, save_path + '.bak')
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def merge_events_file(source_path, save_path, specs, backup=True):
+    return merge_file(source_path, save_path, EVENTS_ROOT, specs, updated_event, new_event, backup)
+
+
+def merge_spawns_file(source_path, save_path, specs, default_positions=None, backup=True):
+    # Events without positions in the spec keep the file's; new ones get
+    # default_positions, or no entry when there are none
+    def update(blob, spec):
+        return blob if spec.positions is None else updated_spawns(blob, spec.positions)
+
+    def create(spec):
+        positions = spec.positions if spec.positions is not None else default_positions
+        if not positions:
+            return None
+        return new_spawns(spec, [tuple(str(value) for value in position) + ('0',) * (3 - len(position))
+                                 for position in positions])
+
+    return merge_file(source_path, save_path, SPAWNS_ROOT, specs, update, create, backup)
+
+
+def merge_event_files(specs, events_path, spawns_path, output_directory=None, default_positions=None, backup=True):
+    # Merge into both files (in place, or into output_directory). Returns the two MergeResults.
+    events_out, spawns_out = events_path, spawns_path
+    if output_directory:
+        os.makedirs(output_directory, exist_ok=True)
+        events_out = os.path.join(output_directory, os.path.basename(events_path))
+        spawns_out = os.path.join(output_directory, os.path.basename(spawns_path))
+    return (merge_events_file(events_path, events_out, specs, backup),
+            merge_spawns_file(spawns_path, spawns_out, specs, default_positions, backup))
@@ -0,0 +1,130 @@
+# Atomic and incremental writing of output files.
+#
+# Every output goes to a temporary file next to its target and is renamed
+# over it, so a crash never leaves a half-written market file behind. Bulk
+# runs keep a manifest in the output directory with, per output file, the
+# hash of the input it came from, a key of the parameters used (percentage,
+# rules, ...) and the hash, size and mtime of what was written. A re-run skips
+# inputs whose entry still matches, and an output whose new content equals
+# what is on disk is left untouched.
+import contextlib
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = '.dayztool_manifest'  # No .json suffix, so it is never taken for a market file
+MANIFEST_VERSION = 1
+
+# What happened to an output file
+WRITTEN = 'written'
+UNCHANGED = 'unchanged'  # Recomputed, same bytes as on disk
+SKIPPED = 'skipped'  # Input and parameters unchanged, not recomputed
+
+
+def content_hash(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def params_key(*params):
+    # Hash of anything with a stable repr()
+    return content_hash(repr(params).encode('utf-8'))
+
+
+@contextlib.contextmanager
+def atomic_open(file_path, mode='wb'):
+    # open() for writing that only replaces file_path once the block succeeded
+    temp_path = file_path + '.tmp'
+    try:
+        with open(temp_path, mode) as target:
+            yield target
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temp_path)
+        raise
+
+
+def atomic_write(file_path, data):
+    with atomic_open(file_path) as target:
+        target.write(data)
+
+
+def read_input(file_path):
+    # (bytes, hash) of an input file
+    with open(file_path, 'rb') as source:
+        data = source.read()
+    return data, content_hash(data)
+
+
+def _stat_matches(entry, file_path):
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    return entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns
+
+
+def same_content(file_path, data, data_hash, entry=None):
+    # Whether file_path already holds data. A matching manifest entry saves reading it.
+    if entry and entry.get('output') == data_hash and _stat_matches(entry, file_path):
+        return True
+    try:
+        if os.path.getsize(file_path) != len(data):
+            return False
+        with open(file_path, 'rb') as existing:
+            return existing.read() == data
+    except OSError:
+        return False
+
+
+def write_output(file_path, data, input_hash, params, entry=None, **extra):
+    # Write data unless file_path already holds it. Returns (state, new manifest
+    # entry); extra values (e.g. the item count) are kept in the entry.
+    data_hash = content_hash(data)
+    if same_content(file_path, data, data_hash, entry):
+        state = UNCHANGED
+    else:
+        atomic_write(file_path, data)
+        state = WRITTEN
+    stat = os.stat(file_path)
+    new_entry = dict(extra, input=input_hash, params=params, output=data_hash,
+                     size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    return state, new_entry
+
+
+def is_current(entry, file_path, input_hash, params):
+    # The output of this input and these parameters is already on disk, untouched
+    return (entry is not None and entry.get('input') == input_hash and entry.get('params') == params
+            and _stat_matches(entry, file_path))
+
+
+class Manifest:
+    def __init__(self, output_directory):
+        self.file_path = os.path.join(output_directory, MANIFEST_NAME)
+        self.entries = {}  # Output file name -> entry
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as manifest_file:
+                data = json.load(manifest_file)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('files', {})
+        except (OSError, ValueError, AttributeError):
+            pass  # Missing or damaged, everything is rebuilt
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def update(self, name, entry):
+        if entry is not None:
+            self.entries[name] = entry
+
+    def save(self):
+        data = {'version': MANIFEST_VERSION, 'files': self.entries}
+        atomic_write(self.file_path, json.dumps(data, indent=1, sort_keys=True).encode('utf-8'))
+
+
+def format_states(states):
+    # "3 written, 10 unchanged, 40 skipped" from a list of states
+    counts = [(state, states.count(state)) for state in (WRITTEN, UNCHANGED, SKIPPED)]
+    return ", ".join(f"{count} {state}" for state, count in counts if count) or "nothing written"
@@ -0,0 +1,142 @@
+# JSON reading and writing for market files, using orjson when it is
+# installed and the json module otherwise.
+#
+# Pretty output matches json.dump(data, file, indent=4) byte for byte, which
+# is the layout Expansion market files have always been written in: orjson
+# only indents by two, so its output is re-indented line by line (strings
+# never contain raw newlines) and non-ASCII characters are escaped the way
+# ensure_ascii does, and the few floats orjson formats differently from
+# repr() are rewritten. Compact output (no whitespace) is smaller and faster;
+# it is used when compact=True is passed or DAYZTOOL_JSON_COMPACT=1 is set.
+import json
+import os
+import re
+
+from incremental import atomic_open
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+_NON_ASCII = re.compile(r'[^\x00-\x7e]')
+# Floats orjson writes differently from repr(): 1e16 (1e+16) and 0.00001 (1e-05)
+_EXPONENT = re.compile(rb'e-?[0-9]')  # Starts with a literal, so the search is fast
+_STRING_OR_ODD_FLOAT = re.compile(rb'"(?:[^"\\]|\\.)*"|(?<![\w.])-?(?:\d+(?:\.\d+)?e-?\d+|0\.0000\d*)')
+_DIGITS = b'0123456789'
+
+
+def compact_default():
+    return os.environ.get('DAYZTOOL_JSON_COMPACT', '') not in ('', '0')
+
+
+def _escape(match):
+    code = ord(match.group(0))
+    if code < 0x10000:
+        return '\\u%04x' % code
+    code -= 0x10000
+    return '\\u%04x\\u%04x' % (0xd800 | (code >> 10), 0xdc00 | (code & 0x3ff))
+
+
+def _ascii(data):
+    # orjson writes UTF-8, json escapes everything outside printable ASCII
+    if data.isascii() and b'\x7f' not in data:
+        return data
+    return _NON_ASCII.sub(_escape, data.decode('utf-8')).encode('ascii')
+
+
+def _double_indent(data):
+    # Two spaces per level -> four. Step k adds two spaces to every line at
+    # depth k or deeper, so each step is one bytes.replace.
+    step = 1
+    while True:
+        pattern = b'\n' + b' ' * (4 * step - 2)
+        if pattern not in data:
+            return data
+        data = data.replace(pattern, pattern + b'  ')
+        step += 1
+
+
+def _python_float(match):
+    token = match.group(0)
+    return token if token[:1] == b'"' else repr(float(token)).encode('ascii')
+
+
+def _has_odd_float(data):
+    # Cheap pre-check, may also fire on text inside strings
+    for match in _EXPONENT.finditer(data):
+        if match.start() and data[match.start() - 1] in _DIGITS:
+            return True
+    position = data.find(b'0.0000')
+    while position != -1:
+        if not position or data[position - 1] not in b'0123456789.':
+            return True
+        position = data.find(b'0.0000', position + 1)
+    return False
+
+
+def _python_floats(data):
+    if not _has_odd_float(data):
+        return data
+    return _STRING_OR_ODD_FLOAT.sub(_python_float, data)
+
+
+def dumps(data, compact=None):
+    # Bytes, pretty (indent=4) unless compact
+    compact = compact_default() if compact is None else compact
+    if orjson is not None:
+        if compact:
+            return _ascii(_python_floats(orjson.dumps(data)))
+        two = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        return _ascii(_python_floats(_double_indent(two)))
+    if compact:
+        return json.dumps(data, separators=(',', ':')).encode('ascii')
+    return json.dumps(data, indent=4).encode('ascii')
+
+
+def loads(data):
+    if orjson is not None:
+        if data[:3] == b'\xef\xbb\xbf':
+            data = data[3:]  # orjson rejects a byte order mark
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(file_path):
+    with open(file_path, 'rb') as json_file:
+        return loads(json_file.read())
+
+
+def dump(data, file_path, compact=None):
+    # Written to a temporary file first, see incremental.atomic_open
+    with atomic_open(file_path) as json_file:
+        json_file.write(dumps(data, compact))
+
+
+def write_market(file_path, header, items, compact=None):
+    # Write a market document (header fields, then "Items") one item at a
+    # time, never building the whole text. Same bytes as dump(dict(header,
+    # Items=items)); returns the number of items written.
+    compact = compact_default() if compact is None else compact
+    field_end, item_start, first_item, close, empty_close = (
+        (b',', b',', b'', b']}', b']}') if compact else
+        (b',\n', b',\n        ', b'\n        ', b'\n    ]\n}', b']\n}'))
+    key_separator = b':' if compact else b': '
+    with atomic_open(file_path) as json_file:
+        json_file.write(b'{' if compact else b'{\n')
+        for key, value in header.items():
+            json_file.write(b'' if compact else b'    ')
+            json_file.write(dumps(key, compact) + key_separator + dumps(value, compact).replace(b'\n', b'\n    '))
+            json_file.write(field_end)
+        json_file.write(b'' if compact else b'    ')
+        json_file.write(b'"Items"' + key_separator + b'[')
+        count = 0
+        for item in items:
+            json_file.write(item_start if count else first_item)
+            text = dumps(item, compact)
+            json_file.write(text if compact else text.replace(b'\n', b'\n        '))
+            count += 1
+        json_file.write(close if count else empty_close)
+    return count
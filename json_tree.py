@@ -0,0 +1,129 @@
+import json
+import tkinter as tk
+from tkinter import ttk
+
+
+class LazyJsonTree:
+    # Treeview preview of a JSON document that only builds the nodes the user
+    # expands. Containers get a placeholder child until they are opened, and
+    # long lists are split into pages of PAGE_SIZE entries. Every node keeps
+    # the path to its value instead of a copy, so refresh() re-reads the
+    # document and only re-renders the nodes that are currently open.
+    PAGE_SIZE = 100
+
+    def __init__(self, master, height=15, width=400):
+        self.frame = tk.Frame(master)
+        self.data = None
+        self.label = None
+        self.nodes = {}  # iid -> (path, page) where page is (start, end) or None
+        self.pending = set()  # iids whose children have not been built yet
+
+        self.tree = ttk.Treeview(self.frame, columns=('value',), height=height)
+        self.tree.heading('#0', text='Key')
+        self.tree.heading('value', text='Value')
+        self.tree.column('#0', width=width // 2)
+        self.tree.column('value', width=width // 2)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.scrollbar = tk.Scrollbar(self.frame, command=self.tree.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.config(yscrollcommand=self.scrollbar.set)
+
+        self.tree.bind('<<TreeviewOpen>>', self.on_open)
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def set_data(self, data, label='root'):
+        # Show a new document (or subtree). Showing the same object again only refreshes it
+        if data is self.data and label == self.label:
+            self.refresh()
+            return
+        self.data = data
+        self.label = label
+        self.render([((), None)])
+
+    def clear(self):
+        self.data = None
+        self.label = None
+        self.render([])
+
+    def refresh(self):
+        # Re-read the document, keeping the same nodes expanded
+        open_nodes = [self.nodes[iid] for iid in self.nodes if self.tree.tk.getboolean(self.tree.item(iid, 'open'))]
+        self.render(open_nodes)
+
+    def render(self, open_nodes):
+        self.tree.delete(*self.tree.get_children())
+        self.nodes = {}
+        self.pending = set()
+        if self.data is None:
+            return
+
+        root = self.add_node('', self.label, (), self.data)
+        by_key = {((), None): root}
+
+        # Parents have shorter paths than their children (and a list opens
+        # before its pages), so opening in this order recreates every node
+        for path, page in sorted(open_nodes, key=lambda node: (len(node[0]), node[1] is not None)):
+            iid = by_key.get((path, page))
+            if iid is None:
+                continue  # The node no longer exists in the document
+            for child in self.expand(iid):
+                by_key[self.nodes[child]] = child
+            self.tree.item(iid, open=True)
+
+    def resolve(self, path):
+        value = self.data
+        for key in path:
+            value = value[key]
+        return value
+
+    def add_node(self, parent, text, path, value, page=None):
+        if isinstance(value, dict):
+            summary = f"{{{len(value)} keys}}"
+        elif isinstance(value, list):
+            summary = f"[{len(value)} items]" if page is None else ''
+        else:
+            summary = json.dumps(value)
+
+        iid = self.tree.insert(parent, tk.END, text=text, values=(summary,))
+        self.nodes[iid] = (path, page)
+        if isinstance(value, (dict, list)) and (value or page is not None):
+            self.tree.insert(iid, tk.END, text='...')  # Placeholder so the node can be opened
+            self.pending.add(iid)
+        return iid
+
+    def expand(self, iid):
+        # Build the direct children of a node once, returns their iids
+        if iid not in self.pending:
+            return self.tree.get_children(iid)
+        self.pending.discard(iid)
+        self.tree.delete(*self.tree.get_children(iid))
+
+        path, page = self.nodes[iid]
+        try:
+            value = self.resolve(path)
+        except (KeyError, IndexError, TypeError):
+            return ()
+
+        children = []
+        if isinstance(value, dict):
+            for key, child in value.items():
+                children.append(self.add_node(iid, str(key), path + (key,), child))
+        elif page is None and len(value) > self.PAGE_SIZE:
+            for start in range(0, len(value), self.PAGE_SIZE):
+                end = min(start + self.PAGE_SIZE, len(value))
+                children.append(self.add_node(iid, f"[{start} .. {end - 1}]", path, value, page=(start, end)))
+        else:
+            start, end = page if page is not None else (0, len(value))
+            for index in range(start, min(end, len(value))):
+                child = value[index]
+                text = f"[{index}]"
+                if isinstance(child, dict) and "ClassName" in child:
+                    text = f"[{index}] {child['ClassName']}"
+                children.append(self.add_node(iid, text, path + (index,), child))
+        return children
+
+    def on_open(self, event):
+        self.expand(self.tree.focus())
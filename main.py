@@ -1,34 +1,102 @@
+import time
+START_TIME = time.perf_counter()  # Taken before any other import so the startup report covers them
+
+import importlib
+import multiprocessing
+import os
+import sys
 import tkinter as tk
 from tkinter import ttk
-from types_editor import TypesEditor
-from market_editor import MarketEditor
-from market_creator import MarketCreator
-from market_bulk_update import MarketEditorBulk
-from event_creator import EventCreator  # Import the new EventCreator
+
+import perf
+import workers
+
+# (tab label, module, class, attribute on the app). Modules are only
+# imported, and their widgets only built, when the tab is first selected.
+TABS = [
+    ("Types Editor", "types_editor", "TypesEditor", "types_editor"),
+    ("Expansion - Market Editor", "market_editor", "MarketEditor", "market_editor"),
+    ("Market Editor (Bulk)", "market_bulk_update", "MarketEditorBulk", "market_creator_bulk"),
+    ("Market Creator", "market_creator", "MarketCreator", "market_creator"),
+    ("Event Creator", "event_creator", "EventCreator", "event_creator"),
+    ("Performance", "performance_tab", "PerformancePanel", "performance_tab"),
+]
+
+# Time from process start until the window is idle. Override with
+# DAYZTOOL_STARTUP_BUDGET_MS, print the breakdown with --startup-report
+# or DAYZTOOL_STARTUP_REPORT=1.
+STARTUP_BUDGET_MS = float(os.environ.get("DAYZTOOL_STARTUP_BUDGET_MS", 1000))
+
 
 class TypesEditorApp:
     def __init__(self, master):
         self.master = master
         self.master.title("Relliks Really Useful DayZ Tool")
-         
+        self.timings = []  # (label, import ms, build ms, modules imported)
+
+        # Background work of every tab is shown (and can be cancelled) here
+        self.status_bar = workers.StatusBar(master, workers.shared(master))
+        self.status_bar.frame.pack(side='bottom', fill='x')
+        perf.recorder.listeners.append(self.status_bar.show_operation)  # Time of the last operation when idle
+
         # Create notebook for tabs
         self.notebook = ttk.Notebook(master)
         self.notebook.pack(fill='both', expand=True)
 
-        # Initialize Tabs
-        self.types_editor = TypesEditor(self.notebook)
-        self.market_editor = MarketEditor(self.notebook)
-        self.market_creator_bulk = MarketEditorBulk(self.notebook)
-        self.market_creator = MarketCreator(self.notebook)
-        self.event_creator = EventCreator(self.notebook)  # Create an instance of EventCreator
+        # Empty placeholders, each tab is built on first selection
+        self.placeholders = []
+        for label, module_name, class_name, attribute in TABS:
+            placeholder = ttk.Frame(self.notebook)
+            self.notebook.add(placeholder, text=label)
+            self.placeholders.append(placeholder)
+            setattr(self, attribute, None)
+
+        self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.load_tab(0)
+
+    def on_tab_changed(self, event):
+        self.load_tab(self.notebook.index(self.notebook.select()))
+
+    def load_tab(self, index):
+        label, module_name, class_name, attribute = TABS[index]
+        if getattr(self, attribute) is not None:
+            return
+
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        imported = time.perf_counter()
+        tab = getattr(module, class_name)(self.placeholders[index])
+        tab.frame.pack(fill='both', expand=True)
+        built = time.perf_counter()
+
+        setattr(self, attribute, tab)
+        self.timings.append((label, (imported - start) * 1000, (built - imported) * 1000,
+                             len(sys.modules) - modules_before))
+
+    def startup_report(self):
+        total_ms = (time.perf_counter() - START_TIME) * 1000
+        lines = [f"Startup: {total_ms:.0f} ms to first idle (budget {STARTUP_BUDGET_MS:.0f} ms)"]
+        for label, import_ms, build_ms, module_count in self.timings:
+            lines.append(f"  {label}: import {import_ms:.1f} ms ({module_count} modules), build {build_ms:.1f} ms")
+        return total_ms, "\n".join(lines)
+
+
+def check_startup(app):
+    total_ms, report = app.startup_report()
+    if "--startup-report" in sys.argv or os.environ.get("DAYZTOOL_STARTUP_REPORT"):
+        print(report)
+        print("  Run with python -X importtime main.py for a per-module breakdown.")
+    if total_ms > STARTUP_BUDGET_MS:
+        print(f"Warning: startup took {total_ms:.0f} ms, over the {STARTUP_BUDGET_MS:.0f} ms budget", file=sys.stderr)
 
-        self.notebook.add(self.types_editor.frame, text="Types Editor")
-        self.notebook.add(self.market_editor.frame, text="Expansion - Market Editor")
-        self.notebook.add(self.market_creator_bulk.frame, text="Market Editor (Bulk)")
-        self.notebook.add(self.market_creator.frame, text="Market Creator")
-        self.notebook.add(self.event_creator.frame, text="Event Creator")  # Add the new tab
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Bulk updates use worker processes, also inside the packaged exe
+    perf.configure_from_environment(sys.argv)
     root = tk.Tk()
     app = TypesEditorApp(root)
+    root.after_idle(check_startup, app)
     root.mainloop()
+    for path in perf.save_on_exit():
+        print(f"Performance report written to {path}")
@@ -0,0 +1,214 @@
+# Batch market generation: a folder of mod types files becomes a set of
+# Expansion market files, one per category (or class name prefix).
+#
+# Every types file is parsed and priced in a worker process. Prices start
+# from the defaults, are overridden by an optional pricing table (a CSV with
+# a ClassName column, or existing market files) and then by an optional rule
+# set, which runs once over whole columns and can use the types fields:
+#
+#   Max = 2500 where category=weapons and value=Tier4
+#   MinPriceThreshold = Max * 0.5; MaxStock = nominal * 2
+#
+# Min would name both the types min and MinPriceThreshold here, so it is
+# refused: rules use MinPriceThreshold for the price and types_min for the
+# economy min.
+#
+# Class names are deduplicated across files (the first file wins), so the
+# items of every shard are collected before anything is written; each shard
+# is then written item by item, without building the JSON text of a whole
+# document.
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from json_io import write_market
+from market_pricing import PRICE_FIELDS
+from parse_cache import load_types_cached
+from rules import RuleError, parse_rules, to_column
+from types_model import TypesTable
+
+PRICE_DEFAULTS = {
+    "MaxPriceThreshold": 930,
+    "MinPriceThreshold": 930,
+    "SellPricePercent": -1,
+    "MaxStockThreshold": 100,
+    "MinStockThreshold": 100,
+    "QuantityPercent": -1,
+}
+SHARD_MODES = ('category', 'prefix')
+
+
+class MarketDraft(TypesTable):
+    # A types table with the market price columns next to the economy ones
+    aliases = dict(TypesTable.aliases, types_min='min', **PRICE_FIELDS)
+    ambiguous = {'min': "MinPriceThreshold for the price or types_min for the economy min"}
+
+    def __init__(self, records, pricing=None):
+        super().__init__(records)
+        pricing = pricing or {}
+        entries = [pricing.get(record.name.lower()) for record in records]
+        for field, default in PRICE_DEFAULTS.items():
+            self.numeric[field] = to_column([entry[field] if entry and field in entry else default
+                                             for entry in entries])
+
+    def resolve(self, name):
+        if name.lower() in self.ambiguous:
+            raise RuleError(f"{name!r} is ambiguous in market rules, use {self.ambiguous[name.lower()]}")
+        return super().resolve(name)
+
+
+def load_pricing_table(path):
+    # {lowercase class name: {market field: value}} from a CSV file (ClassName
+    # plus any of Max/Min/Sell/MaxStock/MinStock/Quantity or the full field
+    # names) or from a market JSON file or folder
+    if os.path.isdir(path) or path.lower().endswith('.json'):
+        from dayz_core import list_json_files, load_json
+        pricing = {}
+        for file_path in (list_json_files(path) if os.path.isdir(path) else [path]):
+            for item in load_json(file_path).get("Items", []):
+                pricing.setdefault(str(item.get("ClassName", "")).lower(),
+                                   {field: item[field] for field in PRICE_DEFAULTS if field in item})
+        return pricing
+
+    pricing = {}
+    with open(path, 'r', newline='') as csv_file:
+        reader = csv.DictReader(csv_file)
+        columns = {}
+        for column in reader.fieldnames or []:
+            field = PRICE_FIELDS.get(column.strip(), column.strip())
+            if field in PRICE_DEFAULTS:
+                columns[column] = field
+        if 'ClassName' not in (reader.fieldnames or []):
+            raise ValueError(f"{path}: pricing table needs a ClassName column")
+        for row in reader:
+            prices = {}
+            for column, field in columns.items():
+                if row.get(column, '').strip():
+                    prices[field] = float(row[column])
+            pricing[row['ClassName'].strip().lower()] = prices
+    return pricing
+
+
+def shard_key(record, shard_by):
+    if shard_by == 'prefix':
+        # Ammo_762x39 -> Ammo; names without a prefix share one shard
+        prefix = record.name.split('_', 1)[0] if '_' in record.name else ''
+        return prefix or 'misc'
+    return record.category or 'uncategorized'
+
+
+def market_value(value, default):
+    if value != value:
+        return default  # A rule left the field without a value
+    return int(value) if value.is_integer() else value
+
+
+def price_types_file(file_path, rules=None, pricing=None, shard_by='category'):
+    # Worker: parse and price one types file. Returns a list of
+    # (shard, class name, prices in PRICE_DEFAULTS order).
+    records = load_types_cached(file_path)
+    draft = MarketDraft(records, pricing)
+    if rules:
+        draft.apply(parse_rules(rules))
+    columns = [(draft.numeric[field], default) for field, default in PRICE_DEFAULTS.items()]
+    return [(shard_key(record, shard_by), record.name,
+             tuple(market_value(float(column[row]), default) for column, default in columns))
+            for row, record in enumerate(records)]
+
+
+def shard_file_name(shard, prefix=''):
+    return prefix + re.sub(r'[^A-Za-z0-9_-]+', '_', shard) + '.json'
+
+
+def market_header(display_name, init_stock_percent):
+    return {
+        "m_Version": 12,
+        "DisplayName": display_name,
+        "Icon": "Deliver",
+        "Color": "FBFCFEFF",
+        "IsExchange": 0,
+        "InitStockPercent": init_stock_percent,
+    }
+
+
+class BatchResult:
+    def __init__(self):
+        self.shards = {}  # File name -> item count
+        self.items = 0
+        self.duplicates = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+
+def build_market_shards(file_paths, output_directory, rules=None, pricing=None, shard_by='category', prefix='',
+                        init_stock_percent=75.0, workers=None, progress=None):
+    # Parse and price the types files in parallel, then write one market file
+    # per shard. rules is rule text, pricing a table from load_pricing_table.
+    if shard_by not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode {shard_by!r}, expected one of {', '.join(SHARD_MODES)}")
+    if rules:
+        MarketDraft([]).apply(rules)  # Raise RuleError (syntax or fields) here rather than once per worker
+    start = time.perf_counter()
+    result = BatchResult()
+    shards = {}  # Lowercase shard -> (shard name, [items])
+    seen = set()
+
+    def collect(priced):
+        for shard, name, values in priced:
+            key = name.lower()
+            if key in seen:
+                result.duplicates += 1
+                continue
+            seen.add(key)
+            item = {"ClassName": name}
+            item.update(zip(PRICE_DEFAULTS, values))
+            item["SpawnAttachments"] = []
+            item["Variants"] = []
+            shards.setdefault(shard.lower(), (shard, []))[1].append(item)
+
+    # Results are collected in input order so "first file wins" does not depend on timing
+    if workers == 1 or len(file_paths) < 2:
+        outcomes = []
+        for file_path in file_paths:
+            try:
+                outcomes.append((file_path, price_types_file(file_path, rules, pricing, shard_by), None))
+            except Exception as e:
+                outcomes.append((file_path, None, e))
+            if progress:
+                progress(len(outcomes), len(file_paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [(file_path, executor.submit(price_types_file, file_path, rules, pricing, shard_by))
+                       for file_path in file_paths]
+            outcomes = []
+            for file_path, future in futures:
+                try:
+                    outcomes.append((file_path, future.result(), None))
+                except Exception as e:
+                    outcomes.append((file_path, None, e))
+                if progress:
+                    progress(len(outcomes), len(file_paths))
+
+    for file_path, priced, error in outcomes:
+        if error is not None:
+            result.errors.append((file_path, str(error)))
+        else:
+            collect(priced)
+
+    os.makedirs(output_directory, exist_ok=True)
+    for shard, items in sorted(shards.values(), key=lambda shard_items: shard_items[0].lower()):
+        file_name = shard_file_name(shard, prefix)
+        header = market_header(shard, init_stock_percent)
+        result.shards[file_name] = write_market(os.path.join(output_directory, file_name), header, items)
+        result.items += len(items)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def format_batch_result(result):
+    lines = [f"{name}: {count} items" for name, count in sorted(result.shards.items())]
+    lines.append(f"{result.items} items in {len(result.shards)} market files, "
+                 f"{result.duplicates} duplicates skipped, {len(result.errors)} failed, {result.elapsed:.2f}s")
+    return "\n".join(lines)
@@ -1,13 +1,25 @@
 import tkinter as tk
-from tkinter import filedialog, simpledialog, messagebox
-import json
+from tkinter import ttk, filedialog, simpledialog, messagebox
+from concurrent.futures import ProcessPoolExecutor
 import os
+import queue
+import time
+from dayz_core import adjust_prices_in_file, list_json_files, reprice_directory
+from incremental import Manifest, format_states
+from rules import parse_rules, RuleError
+import perf
+
 
 class MarketEditorBulk:
     def __init__(self, master):
         self.frame = tk.Frame(master)
         self.frame.pack(fill='both', expand=True)
 
+        self.executor = None
+        self.futures = {}  # future -> file path
+        self.results = queue.Queue()  # Finished futures, filled from the pool's callback thread
+        self.manifest = None  # Output hashes of a per-file run, saved when it finishes
+
         self.create_ui()
 
     def create_ui(self):
@@ -15,6 +27,22 @@ class MarketEditorBulk:
         self.bulk_update_button = tk.Button(self.frame, text="Bulk Update Prices", command=self.bulk_update_prices)
         self.bulk_update_button.pack(pady=20)
 
+        self.rules_button = tk.Button(self.frame, text="Apply Price Rules to Directory", command=self.bulk_apply_rules)
+        self.rules_button.pack(pady=5)
+
+        self.progress_bar = ttk.Progressbar(self.frame, length=300, maximum=100)
+        self.progress_bar.pack(pady=5)
+
+        self.status_label = tk.Label(self.frame, text="")
+        self.status_label.pack(pady=5)
+
+        self.cancel_button = tk.Button(self.frame, text="Cancel", command=self.cancel_update, state=tk.DISABLED)
+        self.cancel_button.pack(pady=5)
+
+        # Per-file errors of the last run
+        self.error_text = tk.Text(self.frame, height=10, width=80)
+        self.error_text.pack(pady=10, fill='both', expand=True)
+
     def bulk_update_prices(self):
         input_directory = filedialog.askdirectory(title="Select Directory Containing JSON Files")
         if not input_directory:
@@ -28,35 +56,145 @@ class MarketEditorBulk:
         if not output_directory:
             return
 
-        success_count = 0
-        error_count = 0
+        file_paths = list_json_files(input_directory)
+        if not file_paths:
+            messagebox.showinfo("Bulk Update", "No JSON files found in the selected directory.")
+            return
 
-        for filename in os.listdir(input_directory):
-            if filename.endswith('.json'):
-                file_path = os.path.join(input_directory, filename)
-                if self.adjust_prices_in_file(file_path, percentage, output_directory):
-                    success_count += 1
-                else:
-                    error_count += 1
+        # Every file is independent, so spread them over all cores (the workers only import dayz_core).
+        # Files whose input and percentage match the last run into this directory are skipped.
+        self.manifest = Manifest(output_directory)
+        self.start_jobs([(adjust_prices_in_file,
+                          (file_path, percentage, output_directory, self.manifest.get(os.path.basename(file_path))),
+                          file_path)
+                         for file_path in file_paths], self.on_file_done,
+                        perf.start("bulk_update_prices", f"{len(file_paths)} files, {percentage:+g}%"))
 
-        messagebox.showinfo("Bulk Update Complete", f"Successfully updated {success_count} files. Failed to update {error_count} files.")
+    def bulk_apply_rules(self):
+        input_directory = filedialog.askdirectory(title="Select Directory Containing JSON Files")
+        if not input_directory:
+            return
 
-    def adjust_prices_in_file(self, file_path, percentage, output_directory):
+        rules = simpledialog.askstring("Apply Price Rules",
+                                       "Rules separated by ';', e.g.\n"
+                                       "Max *= 1.2 where ClassName ~ \"^M4\"; clamp Max 10 5000; round Max 5; Min = Max * 0.6")
+        if not rules:
+            return
         try:
-            with open(file_path, 'r') as json_file:
-                json_data = json.load(json_file)
-
-            # Adjust prices
-            for item in json_data.get("Items", []):
-                item["MaxPriceThreshold"] = round(item["MaxPriceThreshold"] * (1 + percentage / 100.0))
-                item["MinPriceThreshold"] = round(item["MinPriceThreshold"] * (1 + percentage / 100.0))
-
-            # Define new file path in the output directory
-            new_file_path = os.path.join(output_directory, os.path.basename(file_path))
-            with open(new_file_path, 'w') as json_file:
-                json.dump(json_data, json_file, indent=4)
-
-            return True
-        except Exception as e:
-            print(f"Error processing file {file_path}: {e}")
-            return False
+            parse_rules(rules)  # Report typos before any work starts
+        except RuleError as e:
+            messagebox.showerror("Error", f"Invalid rule: {e}")
+            return
+
+        output_directory = filedialog.askdirectory(title="Select Directory to Save Updated JSON Files")
+        if not output_directory:
+            return
+
+        # The rules run once over the columns of every file together, so this is a single job
+        self.start_jobs([(reprice_directory, (input_directory, rules, output_directory), input_directory)],
+                        self.on_directory_done, perf.start("bulk_apply_rules", os.path.basename(input_directory)))
+
+    def start_jobs(self, jobs, on_done, operation):
+        # jobs: (function, args, file or directory shown in errors); on_done(source, result) runs on the Tk thread.
+        # The worker processes are timed as one phase of operation.
+        self.on_done = on_done
+        self.operation = operation
+        self.success_count = 0
+        self.error_count = 0
+        self.cancelled_count = 0
+        self.item_count = 0
+        self.states = []  # incremental.WRITTEN, UNCHANGED or SKIPPED per output file
+        self.total_count = len(jobs)
+        self.remaining = len(jobs)
+        self.start_time = time.perf_counter()
+        self.error_text.delete(1.0, tk.END)
+        self.progress_bar['value'] = 0
+        self.bulk_update_button.config(state=tk.DISABLED)
+        self.rules_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+
+        self.executor = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(jobs)))
+        self.futures = {}
+        for func, args, source in jobs:
+            future = self.executor.submit(func, *args)
+            self.futures[future] = source
+            future.add_done_callback(self.results.put)
+
+        self.frame.after(100, self.poll_progress)
+
+    def poll_progress(self):
+        # Drain finished futures on the Tk thread
+        while True:
+            try:
+                future = self.results.get_nowait()
+            except queue.Empty:
+                break
+
+            self.remaining -= 1
+            source = self.futures[future]
+            if future.cancelled():
+                self.cancelled_count += 1
+            elif future.exception() is not None:
+                self.add_error(source, future.exception())
+            else:
+                self.on_done(source, future.result())
+
+        done = self.total_count - self.remaining
+        self.progress_bar['value'] = 100.0 * done / self.total_count
+        self.status_label.config(text=f"{self.success_count} files updated, {self.error_count} failed")
+
+        if self.remaining:
+            self.frame.after(100, self.poll_progress)
+        else:
+            self.finish_update()
+
+    def add_error(self, source, error):
+        self.error_count += 1
+        self.error_text.insert(tk.END, f"{os.path.basename(source)}: {error}\n")
+
+    def on_file_done(self, file_path, result):
+        item_count, state, entry = result
+        self.success_count += 1
+        self.item_count += item_count
+        self.states.append(state)
+        self.manifest.update(os.path.basename(file_path), entry)
+
+    def on_directory_done(self, directory, result):
+        item_count, states, errors = result
+        self.success_count += len(states)
+        self.item_count += item_count
+        self.states.extend(states)
+        for file_path, error in errors:
+            self.add_error(file_path, error)
+
+    def cancel_update(self):
+        # Files already being processed finish, everything still queued is dropped
+        for future in self.futures:
+            future.cancel()
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def finish_update(self):
+        self.executor.shutdown(wait=False)
+        self.executor = None
+        if self.manifest is not None:
+            try:
+                self.manifest.save()
+            except OSError as e:
+                self.add_error(self.manifest.file_path, e)
+            self.manifest = None
+        self.bulk_update_button.config(state=tk.NORMAL)
+        self.rules_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+
+        elapsed = max(time.perf_counter() - self.start_time, 1e-6)
+        self.operation.add_phase("process files", elapsed, self.item_count)
+        self.operation.finish('cancelled' if self.cancelled_count else
+                              f"{self.error_count} failed" if self.error_count else 'ok')
+        summary = (f"Successfully updated {self.success_count} files. Failed to update {self.error_count} files."
+                   f"\n{self.item_count} items in {elapsed:.2f}s "
+                   f"({self.success_count / elapsed:.1f} files/s, {self.item_count / elapsed:.0f} items/s)"
+                   f"\nOutput files: {format_states(self.states)}")
+        if self.cancelled_count:
+            summary += f"\nCancelled before processing {self.cancelled_count} files."
+        self.status_label.config(text=summary.replace("\n", " "))
+        messagebox.showinfo("Bulk Update Complete", summary)
@@ -1,19 +1,33 @@
+import os
+import re
 import tkinter as tk
-from tkinter import filedialog, messagebox, Listbox, Scrollbar
-import json
-import xml.etree.ElementTree as ET
+from tkinter import ttk, filedialog, messagebox
+from parse_cache import load_types_cached
+from virtual_list import VirtualListbox
+from selection_model import SelectionModel, read_name_list
+from market_batch import build_market_shards, format_batch_result
+from profile_index import find_types_files
+from rules import RuleError
+from workers import shared
+import dayz_core
+import perf
 
 class MarketCreator:
     def __init__(self, master):
         self.frame = tk.Frame(master)
         self.create_ui()
-        self.items = []  # To store items from the XML
+        self.selection = SelectionModel()  # Which loaded items go into the market, with undo
+        self.load_task = None  # Background load in progress
+        self.workers = shared(self.frame)  # File I/O runs off the Tk thread
 
     def create_ui(self):
         # Button to load XML
         self.load_button = tk.Button(self.frame, text="Load XML File", command=self.load_xml)
         self.load_button.pack(pady=10)
 
+        self.progress_bar = ttk.Progressbar(self.frame, length=300, maximum=100)
+        self.progress_bar.pack(pady=5)
+
         # Entry fields for item properties
         self.display_name_entry = tk.Entry(self.frame, width=50)
         self.display_name_entry.pack(pady=5)
@@ -36,101 +50,203 @@ class MarketCreator:
         self.create_button = tk.Button(self.frame, text="Create Market JSON", command=self.create_market_json)
         self.create_button.pack(pady=10)
 
+        # Batch mode: every types file of a folder to one market file per category
+        self.batch_rules_entry = tk.Entry(self.frame, width=50)
+        self.batch_rules_entry.pack(pady=5)
+        self.batch_rules_entry.insert(0, "Price rules, e.g. Max = 2500 where value=Tier4")
+        self.batch_button = tk.Button(self.frame, text="Batch Create from Folder...", command=self.batch_create)
+        self.batch_button.pack(pady=5)
+
         # Listbox to display loaded items
-        self.item_listbox = Listbox(self.frame, height=10, width=50, selectmode=tk.MULTIPLE)  # Changed to MULTIPLE
+        self.item_listbox = VirtualListbox(self.frame, height=10, width=50, selectmode=tk.MULTIPLE)
         self.item_listbox.pack(pady=10)
 
-        # Scrollbar for the listbox
-        self.scrollbar = Scrollbar(self.frame, command=self.item_listbox.yview)
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.item_listbox.config(yscrollcommand=self.scrollbar.set)
+        self.count_label = tk.Label(self.frame, text="")
+        self.count_label.pack()
 
         # Button to remove selected items
         self.remove_button = tk.Button(self.frame, text="Remove Selected", command=self.remove_selected)
         self.remove_button.pack(pady=5)
 
+        # Bulk include/exclude by glob, regex or category, or by a list of class names
+        match_frame = tk.Frame(self.frame)
+        match_frame.pack(pady=5)
+        self.match_mode = ttk.Combobox(match_frame, values=['glob', 'regex', 'category'], state='readonly', width=10)
+        self.match_mode.set('glob')
+        self.match_mode.pack(side=tk.LEFT)
+        self.match_entry = tk.Entry(match_frame, width=30)
+        self.match_entry.pack(side=tk.LEFT, padx=5)
+        tk.Button(match_frame, text="Include", command=lambda: self.match_items(True)).pack(side=tk.LEFT)
+        tk.Button(match_frame, text="Exclude", command=lambda: self.match_items(False)).pack(side=tk.LEFT)
+
+        list_frame = tk.Frame(self.frame)
+        list_frame.pack(pady=5)
+        tk.Button(list_frame, text="Include List...", command=lambda: self.import_list(True)).pack(side=tk.LEFT)
+        tk.Button(list_frame, text="Exclude List...", command=lambda: self.import_list(False)).pack(side=tk.LEFT)
+        tk.Button(list_frame, text="Undo", command=self.undo).pack(side=tk.LEFT, padx=(10, 0))
+        tk.Button(list_frame, text="Redo", command=self.redo).pack(side=tk.LEFT)
+
     def load_xml(self):
         # Load XML file
         xml_file_path = filedialog.askopenfilename(filetypes=[("XML files", "*.xml")])
         if not xml_file_path:
             return
 
-        try:
-            tree = ET.parse(xml_file_path)
-            root = tree.getroot()
+        if self.load_task is not None:
+            self.load_task.cancel()  # A newer pick replaces a load still running
+        operation = perf.start("load_xml", os.path.basename(xml_file_path))
+        self.load_task = self.workers.submit(
+            f"Loading {os.path.basename(xml_file_path)}", lambda task: self.read_items(xml_file_path, task, operation),
+            on_done=lambda selection: self.show_items(selection, operation), on_progress=self.show_progress,
+            on_error=lambda e: messagebox.showerror("Error", f"Error loading XML file: {e}"), operation=operation)
 
-            self.items.clear()  # Clear previous items
-            self.item_listbox.delete(0, tk.END)  # Clear the listbox
+    @staticmethod
+    def read_items(xml_file_path, task, operation):
+        # Worker thread; unchanged files come from the parse cache
+        with operation.phase("parse") as phase:
+            records = load_types_cached(xml_file_path, progress=task.progress)
+            phase.items = len(records)
+        with operation.phase("transform", len(records)):
+            return SelectionModel([record.name for record in records], [record.category for record in records])
 
-            # Look for type elements and get the name attribute
-            for item in root.findall('type'):  # Directly search for type elements
-                class_name = item.get('name')  # Get the name attribute
-                if class_name:  # Only append if class_name is not None
-                    self.items.append(class_name)
-                    self.item_listbox.insert(tk.END, class_name)  # Add to listbox
+    def show_items(self, selection, operation):
+        # Replaces previous items
+        self.load_task = None
+        with operation.phase("widget update", len(selection)):
+            self.selection = selection
+            self.item_listbox.set_items(self.selection.names)  # Replaces the listbox contents in one go
+            self.refresh_items()
+        operation.finish()
 
-            messagebox.showinfo("Success", f"Loaded {len(self.items)} items from XML.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error loading XML file: {e}")
+        messagebox.showinfo("Success", f"Loaded {len(self.selection)} items from XML.")
+
+    def show_progress(self, read_bytes, total_bytes):
+        self.progress_bar['value'] = 100.0 * read_bytes / total_bytes if total_bytes else 100
+
+    def refresh_items(self):
+        # The listbox holds every loaded item and shows the included ones
+        self.item_listbox.selected = set()
+        self.item_listbox.set_view(self.selection.included_indices())
+        self.count_label.config(text=f"{self.selection.count()} of {len(self.selection)} items included")
 
     def remove_selected(self):
-        # Remove selected items from the listbox and internal items list
-        selected_indices = self.item_listbox.curselection()
+        # Exclude the selected items; they stay loaded, so Undo or Include brings them back
+        selected_indices = self.item_listbox.selected
         if not selected_indices:
             messagebox.showwarning("Warning", "No items selected to remove.")
             return
 
-        # Store selected items to remove
-        items_to_remove = [self.item_listbox.get(i) for i in selected_indices]
+        removed_count = self.selection.exclude(selected_indices, "Remove Selected")
+        self.refresh_items()
 
-        for item in items_to_remove:
-            self.items.remove(item)  # Remove from internal list
-            self.item_listbox.delete(self.item_listbox.get(0, tk.END).index(item))  # Remove from listbox
+        messagebox.showinfo("Success", f"Removed {removed_count} items from the list.")
 
-        messagebox.showinfo("Success", f"Removed {len(items_to_remove)} items from the list.")
+    def match_items(self, include):
+        pattern = self.match_entry.get().strip()
+        if not pattern:
+            return
+        try:
+            indices = self.selection.match(self.match_mode.get(), pattern)
+        except re.error as e:
+            messagebox.showerror("Invalid Pattern", str(e))
+            return
+        label = f"{'Include' if include else 'Exclude'} {self.match_mode.get()} {pattern}"
+        changed = self.selection.set_state(indices, 1 if include else 0, label)
+        self.refresh_items()
+        self.count_label.config(text=f"{self.count_label.cget('text')} ({len(indices)} matched, {changed} changed)")
 
-    def create_market_json(self):
-        # Base market data structure
-        market_data = {
-            "m_Version": 12,
-            "DisplayName": self.display_name_entry.get(),
-            "Icon": "Deliver",  # Default value
-            "Color": "FBFCFEFF",  # Default value
-            "IsExchange": 0,  # Default value
-            "InitStockPercent": float(self.initial_stock_percent_entry.get() or 75.0),  # Default to 75 if not provided
-            "Items": []
-        }
+    def import_list(self, include):
+        # A text file with one class name per line, or a market JSON
+        file_path = filedialog.askopenfilename(filetypes=[("Name lists", "*.txt *.json"), ("All files", "*.*")])
+        if not file_path:
+            return
+        try:
+            names = read_name_list(file_path)
+        except Exception as e:
+            messagebox.showerror("Error", f"Error reading list: {e}")
+            return
+        indices = self.selection.match_names(names)
+        label = f"{'Include' if include else 'Exclude'} list {os.path.basename(file_path)}"
+        changed = self.selection.set_state(indices, 1 if include else 0, label)
+        self.refresh_items()
+        messagebox.showinfo("Success", f"{len(indices)} of {len(names)} listed names found, {changed} items changed.")
 
+    def undo(self):
+        if self.selection.undo() is not None:
+            self.refresh_items()
+
+    def redo(self):
+        if self.selection.redo() is not None:
+            self.refresh_items()
+
+    def batch_create(self):
+        input_directory = filedialog.askdirectory(title="Select Folder with Mod Types Files")
+        if not input_directory:
+            return
+        output_directory = filedialog.askdirectory(title="Select Folder to Save Market Files")
+        if not output_directory:
+            return
+
+        rules = self.batch_rules_entry.get().strip()
+        if rules.startswith("Price rules"):
+            rules = ""  # Still the placeholder
+        try:
+            init_stock_percent = float(self.initial_stock_percent_entry.get())
+        except ValueError:
+            init_stock_percent = dayz_core.DEFAULT_INIT_STOCK_PERCENT
+
+        file_paths = find_types_files(input_directory)
+        if not file_paths:
+            messagebox.showinfo("Batch Create", "No types files found in the selected folder.")
+            return
+        def show_result(result):
+            errors = "".join(f"\n{file_path}: {error}" for file_path, error in result.errors)
+            messagebox.showinfo("Batch Create", format_batch_result(result).splitlines()[-1] + errors)
+
+        def show_error(e):
+            if isinstance(e, RuleError):
+                messagebox.showerror("Invalid Rules", str(e))
+            else:
+                messagebox.showerror("Error", f"Error creating market files: {e}")
+
+        self.workers.submit("Creating market files",
+                            lambda task: build_market_shards(file_paths, output_directory, rules or None,
+                                                             init_stock_percent=init_stock_percent,
+                                                             progress=task.progress),
+                            on_done=show_result, on_error=show_error, on_progress=self.show_progress)
+
+    def create_market_json(self):
         # Get user-defined price thresholds
         max_price_threshold = float(self.max_price_threshold_entry.get() or 930)  # Default to 930 if not provided
         min_price_threshold = float(self.min_price_threshold_entry.get() or 930)  # Default to 930 if not provided
-
-        # Iterate over loaded items to create the Items list in the JSON
-        for item in self.items:
-            market_data["Items"].append({
-                "ClassName": item,
-                "MaxPriceThreshold": max_price_threshold,
-                "MinPriceThreshold": min_price_threshold,
-                "SellPricePercent": -1,  # Default value
-                "MaxStockThreshold": 100,  # Default value
-                "MinStockThreshold": 100,  # Default value
-                "QuantityPercent": -1,  # Default value
-                "SpawnAttachments": [],  # Default value
-                "Variants": []  # This can be populated based on additional logic if needed
-            })
+        init_stock_percent = float(self.initial_stock_percent_entry.get() or 75.0)  # Default to 75 if not provided
 
         # Save to JSON file
         file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
         if not file_path:
             return
 
-        try:
-            with open(file_path, 'w') as json_file:
-                json.dump(market_data, json_file, indent=4)
+        operation = perf.start("create_market_json", os.path.basename(file_path))
+        with operation.phase("transform") as phase:
+            market_data = dayz_core.build_market_data(
+                self.selection.included_names(),
+                display_name=self.display_name_entry.get(),
+                init_stock_percent=init_stock_percent,
+                max_price=max_price_threshold,
+                min_price=min_price_threshold)
+            phase.items = len(market_data["Items"])
+
+        def save(task):
+            with operation.phase("serialize", len(market_data["Items"])):
+                dayz_core.save_json(market_data, file_path)
+
+        def saved(result):
+            operation.finish()
             messagebox.showinfo("Success", "Market JSON Created Successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error saving JSON file: {e}")
+
+        self.workers.submit("Saving market JSON", save, on_done=saved,
+                            on_error=lambda e: messagebox.showerror("Error", f"Error saving JSON file: {e}"),
+                            operation=operation)
 
 # Example usage
 if __name__ == "__main__":
@@ -1,11 +1,24 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog
-import json
+import os
+from market_index import MarketIndex
+from json_tree import LazyJsonTree
+from dayz_core import adjust_market_prices, apply_max_to_min, load_json
+from incremental import atomic_write
+import json_io
+from market_history import EditHistory
+from market_pricing import apply_price_rules, format_report
+from rules import RuleError
+from workers import shared
+import perf
 
 class MarketEditor:
     def __init__(self, master):
         self.frame = tk.Frame(master)
         self.json_data = None
+        self.item_index = MarketIndex()  # ClassName -> row and row -> item
+        self.history = EditHistory()  # Changed price values of each edit, for undo/redo
+        self.workers = shared(self.frame)  # File I/O runs off the Tk thread
         self.create_ui()
 
     def create_ui(self):
@@ -22,10 +35,11 @@ class MarketEditor:
         self.bulk_edit_button = tk.Button(self.frame, text="Bulk Edit", command=self.bulk_edit)
         self.bulk_edit_button.pack(pady=5)
 
-        self.output_text_market = tk.Text(self.frame, height=15, width=50)
-        self.output_text_market.pack(pady=10)
+        # Lazily expanded preview, only the nodes that are opened get rendered
+        self.preview_tree = LazyJsonTree(self.frame, height=15)
+        self.preview_tree.pack(pady=10, fill=tk.BOTH, expand=True)
 
-        self.items_listbox = tk.Listbox(self.items_frame, width=50, height=10)
+        self.items_listbox = tk.Listbox(self.items_frame, width=50, height=10, exportselection=False)
         self.items_listbox.pack(side=tk.LEFT, fill=tk.BOTH)
 
         self.scrollbar = tk.Scrollbar(self.items_frame)
@@ -44,40 +58,106 @@ class MarketEditor:
         self.apply_max_to_min_button = tk.Button(self.frame, text="Apply Max to Min", command=self.apply_max_to_min)
         self.apply_max_to_min_button.pack(pady=5)
 
-        
+        self.price_rules_button = tk.Button(self.frame, text="Apply Price Rules", command=self.apply_rules)
+        self.price_rules_button.pack(pady=5)
+
+        # Undo/redo, double-click a history entry to go back (or forward) to it
+        self.history_frame = tk.Frame(self.frame)
+        self.history_frame.pack(pady=5, fill=tk.X)
+        tk.Button(self.history_frame, text="Undo", command=self.undo).pack(side=tk.LEFT, padx=5)
+        tk.Button(self.history_frame, text="Redo", command=self.redo).pack(side=tk.LEFT, padx=5)
+        self.history_listbox = tk.Listbox(self.history_frame, height=4, exportselection=False)
+        self.history_listbox.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.history_listbox.bind('<Double-Button-1>', self.goto_history)
 
     def load_json(self):
         file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
         if not file_path:
             return
 
-        try:
-            with open(file_path, 'r') as json_file:
-                self.json_data = json.load(json_file)
+        operation = perf.start("load_json", os.path.basename(file_path))
+
+        def read(task):
+            with operation.phase("parse") as phase:
+                json_data = load_json(file_path)
+                phase.items = len(json_data.get("Items", []))
+            return json_data
+
+        self.workers.submit(f"Loading {os.path.basename(file_path)}", read,
+                            on_done=lambda json_data: self.show_json(json_data, operation),
+                            on_error=lambda e: messagebox.showerror("Error", f"Error loading JSON file: {e}"),
+                            operation=operation)
+
+    def show_json(self, json_data, operation):
+        with operation.phase("widget update", len(json_data.get("Items", []))):
+            self.json_data = json_data
+            self.history.clear()
             self.populate_items_list()
-            messagebox.showinfo("Success", "JSON File Loaded Successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error loading JSON file: {e}")
+            self.refresh_history()
+        operation.finish()
+        messagebox.showinfo("Success", "JSON File Loaded Successfully!")
+
+        duplicates = self.item_index.duplicate_report()
+        if duplicates:
+            messagebox.showwarning("Duplicate ClassNames", f"These ClassNames appear more than once:\n{duplicates}")
 
     def populate_items_list(self):
+        # Rebuild the index and the listbox, only needed when the item list itself changes
+        self.item_index.rebuild(self.json_data.get("Items", []))
         self.items_listbox.delete(0, tk.END)  # Clear previous items
-        if "Items" in self.json_data:
-            for item in self.json_data["Items"]:
-                self.items_listbox.insert(tk.END, item["ClassName"])
+        if len(self.item_index):
+            self.items_listbox.insert(tk.END, *[item["ClassName"] for item in self.item_index.items])
         self.update_output_preview()  # Show the full JSON data on load
 
+    def refresh_row(self, row):
+        # Redraw a single listbox row after its item changed
+        selected = row in self.items_listbox.curselection()
+        self.items_listbox.delete(row)
+        self.items_listbox.insert(row, self.item_index.row(row)["ClassName"])
+        if selected:
+            self.items_listbox.selection_set(row)
+        self.update_output_preview()
+
     def update_output_preview(self):
         if self.json_data:
-            self.output_text_market.delete(1.0, tk.END)  # Clear the text area
             if self.items_listbox.curselection():  # If an item is selected
-                selected_index = self.items_listbox.curselection()[0]
-                item_name = self.items_listbox.get(selected_index)
-                for item in self.json_data["Items"]:
-                    if item["ClassName"] == item_name:
-                        self.output_text_market.insert(tk.END, json.dumps(item, indent=4))
-                        return
-            else:  # No item selected, show the entire JSON
-                self.output_text_market.insert(tk.END, json.dumps(self.json_data, indent=4))
+                item = self.item_index.row(self.items_listbox.curselection()[0])
+                self.preview_tree.set_data(item, label=item["ClassName"])
+            else:  # No item selected, show the entire JSON (refreshes in place if already shown)
+                self.preview_tree.set_data(self.json_data, label="Market")
+
+    def record(self, label, operation, rows=None):
+        # Run an edit of the loaded items, keeping what it changed for undo
+        result = self.history.record(label, self.item_index.items, operation, rows)
+        self.refresh_history()
+        return result
+
+    def refresh_history(self):
+        # Entry 0 is the oldest state undo can reach, entry n is after the n-th edit
+        self.history_listbox.delete(0, tk.END)
+        self.history_listbox.insert(tk.END, self.history.base_label(), *self.history.labels())
+        self.history_listbox.selection_set(self.history.position)
+        self.history_listbox.see(self.history.position)
+
+    def undo(self):
+        if self.json_data is None or self.history.undo(self.item_index.items) is None:
+            return
+        self.refresh_history()
+        self.update_output_preview()
+
+    def redo(self):
+        if self.json_data is None or self.history.redo(self.item_index.items) is None:
+            return
+        self.refresh_history()
+        self.update_output_preview()
+
+    def goto_history(self, event):
+        selected = self.history_listbox.curselection()
+        if self.json_data is None or not selected:
+            return
+        self.history.goto(self.item_index.items, selected[0])
+        self.refresh_history()
+        self.update_output_preview()
 
     def on_item_select(self, event):
         self.update_output_preview()  # Update preview when an item is selected
@@ -88,64 +168,80 @@ class MarketEditor:
             messagebox.showwarning("Warning", "Please select an item to edit.")
             return
 
-        item_name = self.items_listbox.get(selected_index)
-        for item in self.json_data["Items"]:
-            if item["ClassName"] == item_name:
-                new_max_price = simpledialog.askfloat("Edit Max Price", "Enter new Max Price:", initialvalue=item["MaxPriceThreshold"])
-                new_min_price = simpledialog.askfloat("Edit Min Price", "Enter new Min Price:", initialvalue=item["MinPriceThreshold"])
+        row = selected_index[0]
+        item = self.item_index.row(row)
+        new_max_price = simpledialog.askfloat("Edit Max Price", "Enter new Max Price:", initialvalue=item["MaxPriceThreshold"])
+        new_min_price = simpledialog.askfloat("Edit Min Price", "Enter new Min Price:", initialvalue=item["MinPriceThreshold"])
+
+        def edit():
+            if new_max_price is not None:
+                item["MaxPriceThreshold"] = new_max_price
 
-                if new_max_price is not None:
-                    item["MaxPriceThreshold"] = new_max_price
+            if new_min_price is not None:
+                item["MinPriceThreshold"] = new_min_price
 
-                if new_min_price is not None:
-                    item["MinPriceThreshold"] = new_min_price
+        self.record(f"Edit {item['ClassName']}", edit, rows=[row])
 
-                messagebox.showinfo("Success", "Item edited successfully!")
-                self.populate_items_list()  # Refresh the list
-                return
+        messagebox.showinfo("Success", "Item edited successfully!")
+        self.refresh_row(row)  # Only the edited row changes
 
     def bulk_edit(self):
         percentage = simpledialog.askfloat("Bulk Edit", "Enter percentage to adjust prices:")
         if percentage is None:
             return
 
-        for item in self.json_data["Items"]:
-            item["MaxPriceThreshold"] = round(item["MaxPriceThreshold"] * (1 + percentage / 100.0))
-            item["MinPriceThreshold"] = round(item["MinPriceThreshold"] * (1 + percentage / 100.0))
+        self.record(f"Prices {percentage:+g}%", lambda: adjust_market_prices(self.json_data, percentage))
 
         messagebox.showinfo("Success", "Prices adjusted!")
-        self.populate_items_list()  # Refresh the list
+        self.update_output_preview()  # ClassNames are unchanged, only the preview needs a refresh
 
     def adjust_prices(self):
         percentage = simpledialog.askfloat("Adjust Prices", "Enter percentage to adjust prices:")
         if percentage is None:
             return
 
-        for item in self.json_data["Items"]:
-            item["MaxPriceThreshold"] = round(item["MaxPriceThreshold"] * (1 + percentage / 100.0))
-            item["MinPriceThreshold"] = round(item["MinPriceThreshold"] * (1 + percentage / 100.0))
+        self.record(f"Prices {percentage:+g}%", lambda: adjust_market_prices(self.json_data, percentage))
 
         messagebox.showinfo("Success", "Prices adjusted!")
 
         # Ask user where to save the new JSON file
         save_file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
         if save_file_path:
-            try:
-                with open(save_file_path, 'w') as json_file:
-                    json.dump(self.json_data, json_file, indent=4)
-                messagebox.showinfo("Success", "Changes saved successfully!")
-            except Exception as e:
-                messagebox.showerror("Error", f"Error saving JSON file: {e}")
+            # Serialized here, so edits made while the worker writes cannot end up in the file
+            data = json_io.dumps(self.json_data)
+            self.workers.submit(f"Saving {os.path.basename(save_file_path)}",
+                                lambda task: atomic_write(save_file_path, data),
+                                on_done=lambda result: messagebox.showinfo("Success", "Changes saved successfully!"),
+                                on_error=lambda e: messagebox.showerror("Error", f"Error saving JSON file: {e}"))
 
-        self.populate_items_list()  # Refresh the list
+        self.update_output_preview()  # ClassNames are unchanged, only the preview needs a refresh
 
     def apply_max_to_min(self):
-        for item in self.json_data["Items"]:
-            item["MinPriceThreshold"] = item["MaxPriceThreshold"]
+        self.record("Max to Min", lambda: apply_max_to_min(self.json_data))
 
         messagebox.showinfo("Success", "Max prices applied to min prices!")
         self.update_output_preview()  # Update preview after applying max to min
 
+    def apply_rules(self):
+        if self.json_data is None:
+            messagebox.showwarning("Warning", "Please load a JSON file first.")
+            return
+
+        rules = simpledialog.askstring("Apply Price Rules",
+                                       "Rules separated by ';', e.g.\n"
+                                       "Max *= 1.2 where ClassName ~ \"^M4\"; clamp Max 10 5000; round Max 5; Min = Max * 0.6")
+        if not rules:
+            return
+
+        try:
+            report = self.record(f"Rules: {rules}", lambda: apply_price_rules(self.json_data, rules))
+        except RuleError as e:
+            messagebox.showerror("Error", f"Invalid rule: {e}")
+            return
+
+        messagebox.showinfo("Success", f"Price rules applied!\n{format_report(report)}")
+        self.update_output_preview()
+
 # Example usage:
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,124 @@
+# Undo/redo for edits to the items of a loaded market document.
+#
+# Each step stores only what changed, column by column: for every field the
+# changed rows with their old and new values. A step is found by comparing
+# the price columns before and after an operation, so any operation on the
+# item dicts can be recorded without deep copies, and memory grows with the
+# number of changed values rather than the document size. Undo writes the old
+# values back (exactly, so -50% then +100% followed by two undos restores the
+# original prices), redo the new ones, and goto() walks to any step.
+from market_pricing import PRICE_FIELDS
+
+FIELDS = tuple(PRICE_FIELDS.values())
+MISSING = object()  # The item had no such key
+MAX_STEPS = 200
+
+
+class Step:
+    __slots__ = ('label', 'columns')
+
+    def __init__(self, label, columns):
+        self.label = label
+        self.columns = columns  # [(field, rows, old values, new values)]
+
+    def size(self):
+        return sum(len(rows) for field, rows, old, new in self.columns)
+
+    def apply(self, items, undo):
+        for field, rows, old, new in self.columns:
+            for row, value in zip(rows, old if undo else new):
+                if value is MISSING:
+                    items[row].pop(field, None)
+                else:
+                    items[row][field] = value
+
+
+def snapshot(items, rows=None):
+    # Price columns of the given rows (all rows by default), taken before an edit
+    rows = range(len(items)) if rows is None else list(rows)
+    return rows, [[items[row].get(field, MISSING) for row in rows] for field in FIELDS]
+
+
+class EditHistory:
+    def __init__(self, max_steps=MAX_STEPS):
+        self.steps = []
+        self.position = 0  # Steps before this index are applied
+        self.max_steps = max_steps
+        self.trimmed = 0  # Oldest steps dropped past max_steps, the loaded state is gone once this is > 0
+
+    def clear(self):
+        self.steps = []
+        self.position = 0
+        self.trimmed = 0
+
+    def commit(self, label, items, before):
+        # Record the difference between a snapshot and the items now, returns
+        # the number of changed values (nothing is recorded when it is 0)
+        rows, old_columns = before
+        columns = []
+        for field, old_column in zip(FIELDS, old_columns):
+            changed_rows, old_values, new_values = [], [], []
+            for row, old in zip(rows, old_column):
+                new = items[row].get(field, MISSING)
+                if new is not old and new != old:
+                    changed_rows.append(row)
+                    old_values.append(old)
+                    new_values.append(new)
+            if changed_rows:
+                columns.append((field, changed_rows, old_values, new_values))
+        if not columns:
+            return 0
+
+        # A new edit after some undos drops the undone steps
+        del self.steps[self.position:]
+        self.steps.append(Step(label, columns))
+        if len(self.steps) > self.max_steps:
+            del self.steps[0]
+            self.trimmed += 1
+        self.position = len(self.steps)
+        return self.steps[-1].size()
+
+    def record(self, label, items, operation, rows=None):
+        # Run operation() and record what it changed in the given rows
+        before = snapshot(items, rows)
+        result = operation()
+        self.commit(label, items, before)
+        return result
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.steps)
+
+    def undo(self, items):
+        # Returns the label of the undone step, None if there is none
+        if not self.can_undo():
+            return None
+        self.position -= 1
+        self.steps[self.position].apply(items, undo=True)
+        return self.steps[self.position].label
+
+    def redo(self, items):
+        if not self.can_redo():
+            return None
+        self.steps[self.position].apply(items, undo=False)
+        self.position += 1
+        return self.steps[self.position - 1].label
+
+    def goto(self, items, position):
+        # Undo or redo until `position` steps are applied
+        position = max(0, min(position, len(self.steps)))
+        while self.position > position:
+            self.undo(items)
+        while self.position < position:
+            self.redo(items)
+
+    def base_label(self):
+        # Entry 0: the loaded file, until the oldest steps are dropped
+        if not self.trimmed:
+            return "Loaded file"
+        return f"Oldest kept state ({self.trimmed} earlier edits dropped)"
+
+    def labels(self):
+        return [f"{step.label} ({step.size()} values)" for step in self.steps]
@@ -0,0 +1,37 @@
+class MarketIndex:
+    # Row lookup and duplicate ClassNames of the "Items" list of an Expansion
+    # market file. Rows are the list positions (what the editor listbox
+    # shows), names are compared case-insensitively like the game does. The
+    # item dicts are shared with the document, so price edits never need a
+    # rebuild; only replacing the list (a reload) or renaming/adding/removing
+    # items does.
+    def __init__(self, items=None):
+        self.rebuild(items or [])
+
+    def rebuild(self, items):
+        self.items = items
+        self.by_name = {}  # lowercase name -> first row with it
+        self.duplicates = {}  # lowercase name -> rows sharing it
+
+        for row, item in enumerate(items):
+            key = str(item.get("ClassName", "")).lower()
+            if key in self.by_name:
+                self.duplicates.setdefault(key, [self.by_name[key]]).append(row)
+                continue
+            self.by_name[key] = row
+
+    def __len__(self):
+        return len(self.items)
+
+    def row(self, row):
+        return self.items[row]
+
+    def duplicate_report(self, limit=20):
+        # Human readable summary of repeated ClassNames, or '' when there are none
+        if not self.duplicates:
+            return ''
+        lines = [f"{self.items[rows[0]].get('ClassName')} (rows {', '.join(str(r + 1) for r in rows)})"
+                 for rows in list(self.duplicates.values())[:limit]]
+        if len(self.duplicates) > limit:
+            lines.append(f"... and {len(self.duplicates) - limit} more")
+        return "\n".join(lines)
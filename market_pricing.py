@@ -0,0 +1,139 @@
+# Columnar view of Expansion market items for the rule language in rules.py.
+# Any number of market files are loaded into one table, rules run once over
+# whole columns, and only the values that actually changed are written back
+# into the item dicts.
+import os
+
+import incremental
+import json_io
+from rules import ColumnTable, parse_rules, to_column, changed_positions
+
+# Short names usable in rules -> market item keys
+PRICE_FIELDS = {
+    "Max": "MaxPriceThreshold",
+    "Min": "MinPriceThreshold",
+    "MaxStock": "MaxStockThreshold",
+    "MinStock": "MinStockThreshold",
+    "Sell": "SellPricePercent",
+    "Quantity": "QuantityPercent",
+}
+
+
+class MarketTable(ColumnTable):
+    aliases = PRICE_FIELDS
+
+    def __init__(self, documents):
+        # documents: list of (file name, market data) pairs
+        super().__init__()
+        self.documents = documents
+        self.items = []
+        self.item_document = []  # Row -> position in self.documents
+        for position, (name, market_data) in enumerate(documents):
+            items = market_data.get("Items", [])
+            self.items.extend(items)
+            self.item_document.extend([position] * len(items))
+
+        self.size = len(self.items)
+        self.numeric = {field: to_column([item.get(field) for item in self.items]) for field in PRICE_FIELDS.values()}
+        self.original = {field: self.copy_column(column) for field, column in self.numeric.items()}
+        self.text = {
+            "ClassName": [str(item.get("ClassName", "")) for item in self.items],
+            "File": [documents[position][0] for position in self.item_document],
+        }
+
+    @staticmethod
+    def copy_column(column):
+        return column.copy() if hasattr(column, 'copy') else list(column)
+
+    def write_back(self):
+        # Copy changed values into the item dicts, returns the positions of the documents that changed
+        changed_documents = set()
+        for field, column in self.numeric.items():
+            for row in changed_positions(self.original[field], column):
+                value = float(column[row])
+                if value != value:
+                    continue  # Never write NaN, the field was missing and still has no value
+                item = self.items[row]
+                previous = item.get(field)
+                if field in self.rounded or (isinstance(previous, int) and value.is_integer()):
+                    value = int(value)
+                item[field] = value
+                changed_documents.add(self.item_document[row])
+            self.original[field] = self.copy_column(column)
+        return changed_documents
+
+
+def price_adjust_rules(percentage):
+    # The classic "adjust by percentage" operation as rules
+    factor = 1 + percentage / 100.0
+    return f"Max *= {factor!r}; Min *= {factor!r}; round Max; round Min"
+
+
+def apply_price_rules(market_data, rules, dry_run=False):
+    # Apply rules to one loaded market document in place, returns the per-rule report
+    table = MarketTable([("", market_data)])
+    report = table.apply(rules, dry_run=dry_run)
+    if not dry_run:
+        table.write_back()
+    return report
+
+
+def load_market_table(file_paths):
+    # Returns the table and a list of (path, error) for files that could not be read
+    documents = []
+    errors = []
+    for file_path in file_paths:
+        try:
+            documents.append((os.path.basename(file_path), json_io.load(file_path)))
+        except (OSError, ValueError) as e:
+            errors.append((file_path, str(e)))
+    return MarketTable(documents), errors
+
+
+def reprice_files(file_paths, rules, output_directory, dry_run=False, force=False):
+    # Evaluate the rules across all files in one pass and write every file to
+    # output_directory. Rules only look at their own item, so files whose input
+    # and rules match the manifest of the last run are skipped (unless force)
+    # and outputs with unchanged bytes are not rewritten.
+    # Returns (report, item count, states of the outputs, errors).
+    rules = parse_rules(rules) if isinstance(rules, str) else rules
+    if dry_run:
+        table, errors = load_market_table(file_paths)
+        return table.apply(rules, dry_run=True), table.size, [], errors
+
+    manifest = incremental.Manifest(output_directory)
+    params = incremental.params_key('rules', [rule.text for rule in rules], json_io.compact_default())
+    documents, input_hashes, states, errors = [], {}, [], []
+    item_count = 0
+    for file_path in file_paths:
+        name = os.path.basename(file_path)
+        try:
+            data, input_hash = incremental.read_input(file_path)
+            entry = manifest.get(name)
+            if not force and incremental.is_current(entry, os.path.join(output_directory, name), input_hash, params):
+                states.append(incremental.SKIPPED)
+                item_count += entry.get('items', 0)
+                continue
+            documents.append((name, json_io.loads(data)))
+            input_hashes[name] = input_hash
+        except (OSError, ValueError) as e:
+            errors.append((file_path, str(e)))
+
+    table = MarketTable(documents)
+    report = table.apply(rules)
+    table.write_back()
+    for name, market_data in table.documents:
+        try:
+            state, entry = incremental.write_output(os.path.join(output_directory, name), json_io.dumps(market_data),
+                                                    input_hashes[name], params, manifest.get(name),
+                                                    items=len(market_data.get("Items", [])))
+            manifest.update(name, entry)
+            states.append(state)
+        except OSError as e:
+            errors.append((name, str(e)))
+    manifest.save()
+    return report, item_count + table.size, states, errors
+
+
+def format_report(report):
+    return "\n".join(f"{rule.text}: {matched} matched, {changed} changed" for rule, matched, changed in report)
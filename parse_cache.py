@@ -0,0 +1,169 @@
+# Persistent cache of parsed types.xml records, so reopening an unchanged
+# file skips the XML parse entirely.
+#
+# Entries live in one SQLite file and are keyed by the content hash of the
+# types file; path, size and mtime are stored alongside so an untouched file
+# is found without reading it. A file that was touched or copied is hashed
+# and still hits if its content is unchanged. Records are stored as a zlib
+# compressed marshal blob. When the cache grows past its size cap the least
+# recently used entries are evicted.
+#
+# DAYZTOOL_CACHE_DIR and DAYZTOOL_CACHE_MAX_MB override the location and cap.
+import hashlib
+import marshal
+import os
+import sqlite3
+import time
+import zlib
+
+from types_loader import TypeRecord, load_types
+
+CACHE_FORMAT = 1  # Bump whenever TypeRecord changes
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+FIELDS = TypeRecord.__slots__
+
+
+def cache_directory():
+    if os.environ.get('DAYZTOOL_CACHE_DIR'):
+        return os.environ['DAYZTOOL_CACHE_DIR']
+    base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'dayztool')
+
+
+def cache_path():
+    return os.path.join(cache_directory(), 'types_cache.sqlite')
+
+
+def max_bytes():
+    if os.environ.get('DAYZTOOL_CACHE_MAX_MB'):
+        return int(float(os.environ['DAYZTOOL_CACHE_MAX_MB']) * 1024 * 1024)
+    return DEFAULT_MAX_BYTES
+
+
+def connect():
+    os.makedirs(cache_directory(), exist_ok=True)
+    connection = sqlite3.connect(cache_path(), timeout=10)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS entries (
+            hash TEXT PRIMARY KEY,
+            format INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            record_count INTEGER NOT NULL,
+            bytes INTEGER NOT NULL,
+            last_used REAL NOT NULL,
+            blob BLOB NOT NULL
+        )""")
+    connection.execute("CREATE INDEX IF NOT EXISTS entries_path ON entries (path, size, mtime_ns)")
+    return connection
+
+
+def file_hash(file_path):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def encode(records):
+    return zlib.compress(marshal.dumps([tuple(getattr(record, field) for field in FIELDS) for record in records]), 1)
+
+
+def decode(blob):
+    return [TypeRecord(*values) for values in marshal.loads(zlib.decompress(blob))]
+
+
+def load_types_cached(file_path, progress=None):
+    # Same result as types_loader.load_types, from the cache when possible.
+    # Any cache problem (locked, read-only, corrupt) falls back to parsing.
+    key_path = os.path.normcase(os.path.abspath(file_path))
+    stat = os.stat(file_path)
+    try:
+        connection = connect()
+    except (OSError, sqlite3.Error):
+        return load_types(file_path, progress)
+
+    try:
+        with connection:
+            row = connection.execute(
+                "SELECT hash, blob FROM entries WHERE path = ? AND size = ? AND mtime_ns = ? AND format = ?",
+                (key_path, stat.st_size, stat.st_mtime_ns, CACHE_FORMAT)).fetchone()
+            content_hash = row[0] if row else file_hash(file_path)
+            if row is None:
+                row = connection.execute("SELECT hash, blob FROM entries WHERE hash = ? AND format = ?",
+                                         (content_hash, CACHE_FORMAT)).fetchone()
+
+            if row is not None:
+                records = decode(row[1])
+                connection.execute("UPDATE entries SET path = ?, size = ?, mtime_ns = ?, last_used = ? WHERE hash = ?",
+                                   (key_path, stat.st_size, stat.st_mtime_ns, time.time(), content_hash))
+                if progress:
+                    progress(stat.st_size, stat.st_size)
+                return records
+
+            records = load_types(file_path, progress)
+            blob = encode(records)
+            connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                               (content_hash, CACHE_FORMAT, key_path, stat.st_size, stat.st_mtime_ns,
+                                len(records), len(blob), time.time(), blob))
+            evict(connection)
+            return records
+    except (sqlite3.Error, ValueError, EOFError, zlib.error):
+        return load_types(file_path, progress)
+    finally:
+        connection.close()
+
+
+def evict(connection, limit=None):
+    # Drop least recently used entries until the cache fits its cap
+    limit = max_bytes() if limit is None else limit
+    total = connection.execute("SELECT COALESCE(SUM(bytes), 0) FROM entries").fetchone()[0]
+    if total <= limit:
+        return 0
+    removed = 0
+    for content_hash, size in connection.execute("SELECT hash, bytes FROM entries ORDER BY last_used").fetchall():
+        if total <= limit:
+            break
+        connection.execute("DELETE FROM entries WHERE hash = ?", (content_hash,))
+        total -= size
+        removed += 1
+    return removed
+
+
+def cache_info():
+    # Summary plus one dict per entry, most recently used first
+    if not os.path.exists(cache_path()):
+        return {'path': cache_path(), 'entries': [], 'bytes': 0, 'max_bytes': max_bytes()}
+    connection = connect()
+    try:
+        entries = [dict(zip(('path', 'records', 'bytes', 'last_used'), row)) for row in connection.execute(
+            "SELECT path, record_count, bytes, last_used FROM entries ORDER BY last_used DESC")]
+    finally:
+        connection.close()
+    return {'path': cache_path(), 'entries': entries, 'bytes': sum(entry['bytes'] for entry in entries),
+            'max_bytes': max_bytes()}
+
+
+def format_cache_info(info):
+    lines = [f"{info['path']}: {len(info['entries'])} entries, "
+             f"{info['bytes'] / 1048576:.1f} of {info['max_bytes'] / 1048576:.0f} MB"]
+    for entry in info['entries']:
+        used = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['last_used']))
+        lines.append(f"  {entry['path']} ({entry['records']} types, {entry['bytes'] / 1024:.0f} KB, used {used})")
+    return "\n".join(lines)
+
+
+def clear_cache():
+    # Returns the number of entries removed
+    if not os.path.exists(cache_path()):
+        return 0
+    connection = connect()
+    try:
+        with connection:
+            removed = connection.execute("DELETE FROM entries").rowcount
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+    return removed
@@ -0,0 +1,270 @@
+# Timings of user operations (loading a types file, a search, a bulk price
+# update, ...) split into phases such as parse, transform, serialize and
+# widget update, for the status bar, the Performance tab and bug reports.
+#
+#   operation = perf.start("load_xml", os.path.basename(path))
+#   with operation.phase("parse") as phase:      # any thread
+#       records = load_types(path)
+#       phase.items = len(records)
+#   operation.finish()                             # Tk thread
+#
+# or, for work that is done before the callback returns:
+#
+#   with perf.operation("search_types") as operation:
+#       ...
+#
+# Phases cost two perf_counter() calls unless memory tracking (tracemalloc,
+# slow) or profiling (cProfile, slower) was switched on. Peak memory is per
+# phase but shared by all threads, so overlapping phases see each other's
+# allocations. No tkinter in here.
+import contextlib
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+MAX_OPERATIONS = 200
+SHARED_PROFILER = sys.version_info >= (3, 12)  # See Recorder.__init__
+
+
+class Phase:
+    __slots__ = ('name', 'seconds', 'items', 'peak_mb')
+
+    def __init__(self, name, seconds=0.0, items=None, peak_mb=None):
+        self.name = name
+        self.seconds = seconds
+        self.items = items
+        self.peak_mb = peak_mb
+
+    def as_dict(self):
+        return {'name': self.name, 'seconds': round(self.seconds, 6), 'items': self.items, 'peak_mb': self.peak_mb}
+
+
+class Operation:
+    def __init__(self, recorder, name, detail=''):
+        self.recorder = recorder
+        self.name = name
+        self.detail = detail
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.seconds = None  # Set by finish()
+        self.status = 'running'
+        self.phases = []  # Appended from any thread, list.append is atomic
+
+    @property
+    def items(self):
+        counts = [phase.items for phase in self.phases if phase.items is not None]
+        return max(counts) if counts else None
+
+    @contextlib.contextmanager
+    def phase(self, name, items=None):
+        phase = Phase(name, items=items)
+        profile = self.recorder.start_profile()
+        memory = tracemalloc.is_tracing()
+        if memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield phase
+        finally:
+            phase.seconds = time.perf_counter() - start
+            if memory and tracemalloc.is_tracing():
+                phase.peak_mb = round(tracemalloc.get_traced_memory()[1] / 1048576, 3)
+            self.recorder.stop_profile(profile)
+            self.phases.append(phase)
+
+    def add_phase(self, name, seconds, items=None):
+        # A phase timed elsewhere, e.g. work done in other processes
+        self.phases.append(Phase(name, seconds, items))
+
+    def finish(self, status='ok'):
+        # Call once, on the thread that shows results (listeners may touch widgets)
+        if self.seconds is not None:
+            return
+        self.seconds = time.perf_counter() - self.start
+        self.status = status
+        self.recorder.finished(self)
+
+    def started_text(self):
+        return time.strftime('%H:%M:%S', time.localtime(self.started))
+
+    def summary(self):
+        items = f", {self.items} items" if self.items is not None else ""
+        phases = ", ".join(f"{phase.name} {format_seconds(phase.seconds)}" for phase in self.phases)
+        status = "" if self.status == 'ok' else f" [{self.status}]"
+        return f"{self.name} {format_seconds(self.seconds or 0)}{items}{status}" + (f" ({phases})" if phases else "")
+
+    def as_dict(self):
+        return {'name': self.name, 'detail': self.detail, 'status': self.status,
+                'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+                'seconds': None if self.seconds is None else round(self.seconds, 6), 'items': self.items,
+                'phases': [phase.as_dict() for phase in self.phases]}
+
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+class Recorder:
+    def __init__(self, max_operations=MAX_OPERATIONS):
+        self.operations = deque(maxlen=max_operations)  # Finished, oldest first
+        self.listeners = []  # Called with each finished Operation
+        self.profiling = False
+        self.profile_stats = None  # pstats.Stats of everything profiled so far
+        self.profile_lock = threading.Lock()
+        # Since Python 3.12 cProfile uses sys.monitoring, which allows one
+        # active profiler per interpreter, so one profiler is shared by all
+        # threads and enabled while any phase runs. Before 3.12 a profiler
+        # only sees (and can only be disabled from) the thread that enabled
+        # it, so each thread gets its own.
+        self.profile = None
+        self.profile_users = 0
+        self.local = threading.local()
+
+    def start(self, name, detail=''):
+        return Operation(self, name, detail)
+
+    @contextlib.contextmanager
+    def operation(self, name, detail=''):
+        operation = self.start(name, detail)
+        try:
+            yield operation
+        except BaseException as e:
+            operation.finish(f"error: {e}")
+            raise
+        operation.finish()
+
+    def finished(self, operation):
+        self.operations.append(operation)
+        for listener in list(self.listeners):
+            listener(operation)
+
+    def clear(self):
+        self.operations.clear()
+        with self.profile_lock:
+            self.profile_stats = None
+
+    # Memory and profiling, both off by default
+
+    @property
+    def track_memory(self):
+        return tracemalloc.is_tracing()
+
+    @track_memory.setter
+    def track_memory(self, enabled):
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def start_profile(self):
+        # Token for stop_profile(), None when nothing was started
+        if not self.profiling:
+            return None
+        if not SHARED_PROFILER:
+            if getattr(self.local, 'profile', None) is not None:
+                return None
+            profile = cProfile.Profile()
+            self.local.profile = profile
+            profile.enable()
+            return profile
+        with self.profile_lock:
+            if self.profile_users == 0:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    return None  # Another profiler or a debugger is active
+                self.profile = profile
+            self.profile_users += 1
+            return self.profile
+
+    def stop_profile(self, profile):
+        if profile is None:
+            return
+        with self.profile_lock:
+            if SHARED_PROFILER:
+                self.profile_users -= 1
+                if self.profile_users:
+                    return
+                self.profile = None
+            else:
+                self.local.profile = None
+            profile.disable()
+            if self.profile_stats is None:
+                self.profile_stats = pstats.Stats(profile)
+            else:
+                self.profile_stats.add(profile)
+
+    def profile_text(self, limit=40):
+        # Top functions by cumulative time, '' when nothing was profiled
+        with self.profile_lock:
+            if self.profile_stats is None:
+                return ''
+            stream = io.StringIO()
+            self.profile_stats.stream = stream
+            self.profile_stats.sort_stats('cumulative').print_stats(limit)
+            return stream.getvalue()
+
+    def dump_profile(self, file_path):
+        # pstats file (python -m pstats, snakeviz, ...) plus a text summary next to it.
+        # Returns the paths written, none when nothing was profiled.
+        with self.profile_lock:
+            if self.profile_stats is None:
+                return []
+            self.profile_stats.dump_stats(file_path)
+        text_path = os.path.splitext(file_path)[0] + '_profile.txt'
+        with open(text_path, 'w', encoding='utf-8') as text_file:
+            text_file.write(self.profile_text())
+        return [file_path, text_path]
+
+    def report(self):
+        # Everything recorded, with the environment, for attaching to a bug report
+        try:
+            import numpy
+            numpy_version = numpy.__version__
+        except ImportError:
+            numpy_version = None
+        import json_io
+        return {
+            'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                            'executable': sys.executable, 'cpu_count': os.cpu_count(),
+                            'json_backend': json_io.BACKEND, 'numpy': numpy_version,
+                            'memory_tracked': self.track_memory, 'profiling': self.profiling},
+            'operations': [operation.as_dict() for operation in self.operations],
+        }
+
+    def save_report(self, file_path):
+        # JSON report, plus the profile dump next to it when profiling was on. Returns the paths written.
+        with open(file_path, 'w', encoding='utf-8') as report_file:
+            json.dump(self.report(), report_file, indent=2)
+        return [file_path] + self.dump_profile(os.path.splitext(file_path)[0] + '.prof')
+
+
+recorder = Recorder()
+start = recorder.start
+operation = recorder.operation
+
+
+def configure_from_environment(argv=()):
+    # --profile / DAYZTOOL_PROFILE=1 profile every phase from startup (the
+    # report is saved on exit, see save_on_exit), DAYZTOOL_PERF_MEMORY=1 tracks
+    # peak memory per phase
+    if '--profile' in argv or os.environ.get('DAYZTOOL_PROFILE', '') not in ('', '0'):
+        recorder.profiling = True
+    if os.environ.get('DAYZTOOL_PERF_MEMORY', '') not in ('', '0'):
+        recorder.track_memory = True
+
+
+def save_on_exit(file_path='dayztool_performance.json'):
+    # After a --profile run: the report and profile dump in the working directory
+    if recorder.profiling and recorder.operations:
+        return recorder.save_report(os.path.abspath(file_path))
+    return []
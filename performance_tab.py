@@ -0,0 +1,81 @@
+import os
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+import perf
+from perf import format_seconds
+
+
+class PerformancePanel:
+    # Every recorded operation with its phases, newest first, plus switches
+    # for memory tracking and profiling and a report to attach to bug reports
+    def __init__(self, master):
+        self.frame = tk.Frame(master)
+        self.recorder = perf.recorder
+        self.track_memory = tk.BooleanVar(value=self.recorder.track_memory)
+        self.profiling = tk.BooleanVar(value=self.recorder.profiling)
+        self.create_ui()
+
+        for operation in self.recorder.operations:
+            self.add_operation(operation)
+        self.recorder.listeners.append(self.add_operation)
+
+    def create_ui(self):
+        options = tk.Frame(self.frame)
+        options.pack(fill=tk.X, pady=5)
+        tk.Checkbutton(options, text="Track peak memory (slower)", variable=self.track_memory,
+                       command=self.set_options).pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(options, text="Profile with cProfile (much slower)", variable=self.profiling,
+                       command=self.set_options).pack(side=tk.LEFT, padx=5)
+        tk.Button(options, text="Save Report...", command=self.save_report).pack(side=tk.RIGHT, padx=5)
+        tk.Button(options, text="Clear", command=self.clear).pack(side=tk.RIGHT, padx=5)
+
+        tree_frame = tk.Frame(self.frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        columns = ('time', 'items', 'memory', 'status')
+        self.tree = ttk.Treeview(tree_frame, columns=columns, height=20)
+        self.tree.heading('#0', text="Operation / phase")
+        self.tree.heading('time', text="Time")
+        self.tree.heading('items', text="Items")
+        self.tree.heading('memory', text="Peak MB")
+        self.tree.heading('status', text="Status")
+        self.tree.column('#0', width=320)
+        for column in columns:
+            self.tree.column(column, width=90, anchor='e' if column != 'status' else 'w')
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar = tk.Scrollbar(tree_frame, command=self.tree.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.config(yscrollcommand=scrollbar.set)
+
+    def add_operation(self, operation):
+        # perf.Recorder listener, runs on the Tk thread
+        label = f"{operation.started_text()}  {operation.name}" + (f" - {operation.detail}" if operation.detail else "")
+        node = self.tree.insert('', 0, text=label, values=(
+            format_seconds(operation.seconds), '' if operation.items is None else operation.items, '',
+            operation.status))
+        for phase in operation.phases:
+            self.tree.insert(node, tk.END, text=phase.name, values=(
+                format_seconds(phase.seconds), '' if phase.items is None else phase.items,
+                '' if phase.peak_mb is None else f"{phase.peak_mb:.1f}", ''))
+        children = self.tree.get_children('')
+        if len(children) > perf.MAX_OPERATIONS:
+            self.tree.delete(*children[perf.MAX_OPERATIONS:])
+
+    def set_options(self):
+        self.recorder.track_memory = self.track_memory.get()
+        self.recorder.profiling = self.profiling.get()
+
+    def clear(self):
+        self.recorder.clear()
+        self.tree.delete(*self.tree.get_children(''))
+
+    def save_report(self):
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", initialfile="dayztool_performance.json",
+                                                 filetypes=[("JSON files", "*.json")])
+        if not file_path:
+            return
+        try:
+            written = self.recorder.save_report(file_path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Error saving report: {e}")
+            return
+        messagebox.showinfo("Success", "Saved " + ", ".join(os.path.basename(path) for path in written))
@@ -0,0 +1,297 @@
+# SQLite index of every type and market item of a server profile.
+#
+# A mission folder is scanned for the types files cfgeconomycore.xml points
+# at (plus db/types.xml), any extra mod types files or folders, and the
+# Expansion market folder. Every class name is stored with its economy or
+# price values and the file and line it came from. Re-indexing only touches
+# files whose size or mtime changed, so it is cheap to run before every query.
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import xml.etree.ElementTree as ET
+import xml.parsers.expat
+
+TYPE_INT_FIELDS = ('nominal', 'min', 'lifetime', 'restock', 'quantmin', 'quantmax')
+MARKET_FIELDS = ('MaxPriceThreshold', 'MinPriceThreshold', 'SellPricePercent', 'MaxStockThreshold', 'MinStockThreshold')
+CLASS_NAME_RE = re.compile(r'"ClassName"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    entries INTEGER NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS types (
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    line INTEGER,
+    nominal INTEGER, min INTEGER, lifetime INTEGER, restock INTEGER, quantmin INTEGER, quantmax INTEGER,
+    category TEXT
+);
+CREATE TABLE IF NOT EXISTS market (
+    class_name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    line INTEGER,
+    max_price REAL, min_price REAL, sell_percent REAL, max_stock REAL, min_stock REAL
+);
+CREATE INDEX IF NOT EXISTS types_name ON types (name_lower);
+CREATE INDEX IF NOT EXISTS types_file ON types (file_id);
+CREATE INDEX IF NOT EXISTS market_name ON market (name_lower);
+CREATE INDEX IF NOT EXISTS market_file ON market (file_id);
+"""
+
+
+# Discovery
+
+def economy_types_files(mission_dir):
+    # types files listed in cfgeconomycore.xml, plus the vanilla db/types.xml.
+    # Raises ValueError when cfgeconomycore.xml is not valid XML.
+    paths = [os.path.join(mission_dir, 'db', 'types.xml')]
+    core_path = os.path.join(mission_dir, 'cfgeconomycore.xml')
+    if os.path.exists(core_path):
+        try:
+            root = ET.parse(core_path).getroot()
+        except ET.ParseError as e:
+            raise ValueError(f"{core_path}: {e}")
+        for ce in root.iter('ce'):
+            folder = ce.get('folder', '')
+            for file_elem in ce.iter('file'):
+                if file_elem.get('type') == 'types' and file_elem.get('name'):
+                    paths.append(os.path.join(mission_dir, folder, file_elem.get('name')))
+    return [path for path in paths if os.path.isfile(path)]
+
+
+def find_types_files(path):
+    # A types file, or every *types*.xml below a folder (mod folders)
+    if os.path.isfile(path):
+        return [path]
+    found = []
+    for directory, _, filenames in os.walk(path):
+        found.extend(os.path.join(directory, filename) for filename in filenames
+                     if filename.lower().endswith('.xml') and 'types' in filename.lower())
+    return sorted(found)
+
+
+def find_market_files(path):
+    found = []
+    for directory, _, filenames in os.walk(path):
+        found.extend(os.path.join(directory, filename) for filename in filenames if filename.lower().endswith('.json'))
+    return sorted(found)
+
+
+def default_market_dirs(mission_dir):
+    # Expansion keeps the market in the server profile, usually next to the mission folders
+    candidates = [os.path.join(mission_dir, 'ExpansionMod', 'Market'),
+                  os.path.join(mission_dir, '..', '..', 'profiles', 'ExpansionMod', 'Market'),
+                  os.path.join(mission_dir, '..', 'profiles', 'ExpansionMod', 'Market')]
+    return [os.path.normpath(path) for path in candidates if os.path.isdir(path)][:1]
+
+
+def discover(mission_dir, extra_types=(), market_dirs=None):
+    # {absolute path: 'types' | 'market'}
+    files = {}
+    for path in economy_types_files(mission_dir):
+        files[os.path.abspath(path)] = 'types'
+    for path in extra_types:
+        for types_path in find_types_files(path):
+            files[os.path.abspath(types_path)] = 'types'
+    for directory in (default_market_dirs(mission_dir) if market_dirs is None else market_dirs):
+        for market_path in find_market_files(directory):
+            files[os.path.abspath(market_path)] = 'market'
+    return files
+
+
+# Scanning
+
+def scan_types(file_path):
+    # (name, line, nominal, min, lifetime, restock, quantmin, quantmax, category) per <type>, using expat
+    # directly because it knows the line of every start tag
+    rows = []
+    state = {'type': None, 'field': None, 'text': []}
+    parser = xml.parsers.expat.ParserCreate()
+
+    def start(tag, attrs):
+        if tag == 'type' and state['type'] is None:
+            state['type'] = {'name': attrs.get('name'), 'line': parser.CurrentLineNumber}
+        elif state['type'] is not None:
+            if tag in TYPE_INT_FIELDS:
+                state['field'] = tag
+                state['text'] = []
+            elif tag == 'category':
+                state['type']['category'] = attrs.get('name')
+
+    def end(tag):
+        current = state['type']
+        if current is None:
+            return
+        if tag == state['field']:
+            try:
+                current[tag] = int(''.join(state['text']).strip())
+            except ValueError:
+                pass
+            state['field'] = None
+        elif tag == 'type':
+            if current['name']:
+                rows.append((current['name'], current['line']) +
+                            tuple(current.get(field) for field in TYPE_INT_FIELDS) + (current.get('category'),))
+            state['type'] = None
+
+    def text(data):
+        if state['field'] is not None:
+            state['text'].append(data)
+
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text
+    with open(file_path, 'rb') as file:
+        parser.ParseFile(file)
+    return rows
+
+
+def scan_market(file_path):
+    # (class name, line, prices/stock...) per market item. Lines come from a
+    # scan of the raw text for "ClassName" keys, which appear once per item.
+    with open(file_path, 'r', encoding='utf-8-sig') as json_file:
+        text = json_file.read()
+    data = json.loads(text)
+    items = data.get("Items", []) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError("not a market file (expected an object with a list of items)")
+
+    lines = []
+    line = 1
+    position = 0
+    for match in CLASS_NAME_RE.finditer(text):
+        line += text.count('\n', position, match.start())
+        position = match.start()
+        lines.append(line)
+    if len(lines) != len(items):
+        lines = [None] * len(items)
+
+    return [(str(item.get("ClassName", "")), item_line) + tuple(item.get(field) for field in MARKET_FIELDS)
+            for item, item_line in zip(items, lines)]
+
+
+# Index
+
+def default_db_path(mission_dir):
+    from parse_cache import cache_directory
+    key = hashlib.blake2b(os.path.normcase(os.path.abspath(mission_dir)).encode('utf-8'), digest_size=8).hexdigest()
+    return os.path.join(cache_directory(), f'profile_{key}.sqlite')
+
+
+class ProfileIndex:
+    def __init__(self, db_path):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(db_path, timeout=10)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, files, progress=None):
+        # Bring the index in line with {path: kind}; returns (indexed, unchanged, removed, errors)
+        connection = self.connection
+        known = {path: (file_id, size, mtime_ns, kind) for file_id, path, size, mtime_ns, kind in
+                 connection.execute("SELECT id, path, size, mtime_ns, kind FROM files")}
+        indexed = unchanged = 0
+        errors = []
+
+        with connection:
+            for path in set(known) - set(files):
+                self.drop_file(known[path][0])
+            removed = len(set(known) - set(files))
+
+            for position, (path, kind) in enumerate(sorted(files.items())):
+                if progress:
+                    progress(position, len(files))
+                stat = os.stat(path)
+                previous = known.get(path)
+                if previous and previous[1:] == (stat.st_size, stat.st_mtime_ns, kind):
+                    unchanged += 1
+                    continue
+                if previous:
+                    self.drop_file(previous[0])
+
+                error = None
+                try:
+                    rows = scan_types(path) if kind == 'types' else scan_market(path)
+                except (OSError, ValueError, xml.parsers.expat.ExpatError) as e:
+                    rows = []
+                    error = str(e)
+                    errors.append((path, error))
+
+                file_id = connection.execute(
+                    "INSERT INTO files (path, kind, size, mtime_ns, entries, error) VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, kind, stat.st_size, stat.st_mtime_ns, len(rows), error)).lastrowid
+                if kind == 'types':
+                    connection.executemany(
+                        "INSERT INTO types VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        ((row[0], row[0].lower(), file_id) + row[1:] for row in rows))
+                else:
+                    connection.executemany(
+                        "INSERT INTO market VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        ((row[0], row[0].lower(), file_id) + row[1:] for row in rows))
+                indexed += 1
+        if progress:
+            progress(len(files), len(files))
+        return indexed, unchanged, removed, errors
+
+    def drop_file(self, file_id):
+        self.connection.execute("DELETE FROM types WHERE file_id = ?", (file_id,))
+        self.connection.execute("DELETE FROM market WHERE file_id = ?", (file_id,))
+        self.connection.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    # Queries
+
+    def where(self, class_name):
+        # Where a class is defined (types) and priced (market), case-insensitive
+        key = class_name.lower()
+        types = self.connection.execute(
+            "SELECT t.name, f.path, t.line, t.nominal, t.min, t.category FROM types t JOIN files f ON f.id = t.file_id "
+            "WHERE t.name_lower = ? ORDER BY f.path, t.line", (key,)).fetchall()
+        market = self.connection.execute(
+            "SELECT m.class_name, f.path, m.line, m.max_price, m.min_price FROM market m JOIN files f ON f.id = m.file_id "
+            "WHERE m.name_lower = ? ORDER BY f.path, m.line", (key,)).fetchall()
+        return types, market
+
+    def unpriced(self):
+        # Types that spawn (nominal > 0) but are not sold anywhere
+        return self.connection.execute(
+            "SELECT t.name, f.path, t.line, t.nominal FROM types t JOIN files f ON f.id = t.file_id "
+            "WHERE t.nominal > 0 AND NOT EXISTS (SELECT 1 FROM market m WHERE m.name_lower = t.name_lower) "
+            "ORDER BY t.name_lower").fetchall()
+
+    def orphans(self):
+        # Market items without any types entry
+        return self.connection.execute(
+            "SELECT m.class_name, f.path, m.line FROM market m JOIN files f ON f.id = m.file_id "
+            "WHERE NOT EXISTS (SELECT 1 FROM types t WHERE t.name_lower = m.name_lower) "
+            "ORDER BY m.name_lower").fetchall()
+
+    def stats(self):
+        count = lambda sql: self.connection.execute(sql).fetchone()[0]
+        return {'files': count("SELECT COUNT(*) FROM files"),
+                'types': count("SELECT COUNT(*) FROM types"),
+                'market': count("SELECT COUNT(*) FROM market")}
+
+
+def index_profile(mission_dir, extra_types=(), market_dirs=None, db_path=None, progress=None):
+    # Open (or create) the index of a mission folder and bring it up to date.
+    # Returns the ProfileIndex and the update summary.
+    start = time.perf_counter()
+    files = discover(mission_dir, extra_types, market_dirs)
+    index = ProfileIndex(db_path or default_db_path(mission_dir))
+    summary = index.update(files, progress)
+    return index, summary + (time.perf_counter() - start,)
@@ -0,0 +1,440 @@
+# Small rule language evaluated column-at-a-time over a table of items.
+#
+#   Max *= 1.2 where ClassName ~ "^M4"
+#   Min = Max * 0.6
+#   clamp Max 10 5000
+#   round Max 5 where Max > 100 and not ClassName ~ "Ammo"
+#
+# Statements are separated by newlines or ';', '#' starts a comment.
+# Assignments use =, +=, -=, *= or /= with +, -, *, / and parentheses on the
+# right. Conditions compare with ~ and !~ (regex), =, !=, <, <=, > and >=,
+# combined with and, or, not. Comparing a multi-valued field (a tuple per
+# row, like usage tags) with = or ~ matches when any of its values does.
+#
+# Columns are NumPy arrays when NumPy is installed and plain lists otherwise;
+# either way every statement is one pass over whole columns.
+import operator
+import re
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class RuleError(ValueError):
+    pass
+
+
+TOKEN_RE = re.compile(r'''
+    \s*(?:
+        (?P<number>\d+(?:\.\d*)?|\.\d+)
+      | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op>\+=|-=|\*=|/=|<=|>=|!=|!~|==|[-+*/()=<>~])
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+    )''', re.VERBOSE)
+
+KEYWORDS = {'where', 'and', 'or', 'not', 'clamp', 'round'}
+ASSIGN_OPS = {'=': None, '+=': operator.add, '-=': operator.sub, '*=': operator.mul, '/=': operator.truediv}
+ARITH_OPS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv}
+COMPARE_OPS = {'=': operator.eq, '==': operator.eq, '!=': operator.ne, '<': operator.lt, '<=': operator.le,
+               '>': operator.gt, '>=': operator.ge}
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise RuleError(f"Unexpected input at {text[position:]!r}")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'number':
+            value = float(value)
+        elif kind == 'string':
+            value = re.sub(r'\\(.)', r'\1', value[1:-1])
+        elif kind == 'name' and value.lower() in KEYWORDS:
+            kind, value = 'keyword', value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.position = 0
+
+    def peek(self, kind=None, value=None):
+        if self.position >= len(self.tokens):
+            return None
+        token = self.tokens[self.position]
+        if (kind is None or token[0] == kind) and (value is None or token[1] == value):
+            return token
+        return None
+
+    def take(self, kind=None, value=None):
+        token = self.peek(kind, value)
+        if token is None:
+            found = self.tokens[self.position][1] if self.position < len(self.tokens) else 'end of rule'
+            raise RuleError(f"Expected {value or kind} but found {found!r} in {self.text!r}")
+        self.position += 1
+        return token[1]
+
+    def parse_statement(self):
+        if self.peek('keyword', 'clamp'):
+            self.take()
+            field = self.take('name')
+            low, high = self.parse_signed_number(), self.parse_signed_number()
+            if low > high:
+                raise RuleError(f"clamp needs the lower bound first in {self.text!r}")
+            rule = Rule('clamp', field, (low, high))
+        elif self.peek('keyword', 'round'):
+            self.take()
+            field = self.take('name')
+            step = 1.0
+            if self.peek('number') or self.peek('op', '-'):
+                step = self.parse_signed_number()
+            if step <= 0:
+                raise RuleError(f"round step must be positive in {self.text!r}")
+            rule = Rule('round', field, step)
+        else:
+            field = self.take('name')
+            op = self.take('op')
+            if op not in ASSIGN_OPS:
+                raise RuleError(f"Expected an assignment after {field!r} in {self.text!r}")
+            rule = Rule(op, field, self.parse_sum())
+
+        if self.peek('keyword', 'where'):
+            self.take()
+            rule.condition = self.parse_or()
+        if self.position != len(self.tokens):
+            raise RuleError(f"Unexpected {self.tokens[self.position][1]!r} in {self.text!r}")
+        return rule
+
+    def parse_signed_number(self):
+        if self.peek('op', '-'):
+            self.take()
+            return -self.take('number')
+        return self.take('number')
+
+    # Arithmetic: sum -> product -> unary -> atom
+
+    def parse_sum(self):
+        node = self.parse_product()
+        while self.peek('op', '+') or self.peek('op', '-'):
+            node = ('arith', ARITH_OPS[self.take()], node, self.parse_product())
+        return node
+
+    def parse_product(self):
+        node = self.parse_unary()
+        while self.peek('op', '*') or self.peek('op', '/'):
+            node = ('arith', ARITH_OPS[self.take()], node, self.parse_unary())
+        return node
+
+    def parse_unary(self):
+        if self.peek('op', '-'):
+            self.take()
+            return ('arith', operator.mul, ('const', -1.0), self.parse_unary())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        if self.peek('op', '('):
+            self.take()
+            node = self.parse_sum()
+            self.take('op', ')')
+            return node
+        if self.peek('number'):
+            return ('const', self.take())
+        return ('field', self.take('name'))
+
+    # Conditions: or -> and -> not -> comparison
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.peek('keyword', 'or'):
+            self.take()
+            node = ('or', node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.peek('keyword', 'and'):
+            self.take()
+            node = ('and', node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.peek('keyword', 'not'):
+            self.take()
+            return ('not', self.parse_not())
+        if self.peek('op', '('):
+            # Either a grouped condition or arithmetic on the left of a comparison
+            saved = self.position
+            self.take()
+            try:
+                node = self.parse_or()
+                self.take('op', ')')
+                return node
+            except RuleError:
+                self.position = saved
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_sum()
+        op = self.take('op')
+        if op in ('~', '!~'):
+            pattern = self.take('string')
+            try:
+                compiled = re.compile(pattern, re.IGNORECASE)
+            except re.error as e:
+                raise RuleError(f"Bad regular expression {pattern!r}: {e}")
+            node = ('regex', left, compiled)
+            return ('not', node) if op == '!~' else node
+        if op not in COMPARE_OPS:
+            raise RuleError(f"Expected a comparison but found {op!r} in {self.text!r}")
+        if self.peek('string'):
+            return ('compare', COMPARE_OPS[op], left, ('text', self.take()))
+        return ('compare', COMPARE_OPS[op], left, self.parse_sum())
+
+
+class Rule:
+    def __init__(self, op, field, argument):
+        self.op = op
+        self.field = field
+        self.argument = argument
+        self.condition = None
+        self.text = ''
+
+    def __repr__(self):
+        return f"Rule({self.text!r})"
+
+
+def parse_rules(text):
+    rules = []
+    for line in text.splitlines():
+        line = line.split('#', 1)[0]
+        for statement in line.split(';'):
+            statement = statement.strip()
+            if statement:
+                rule = Parser(statement).parse_statement()
+                rule.text = statement
+                rules.append(rule)
+    return rules
+
+
+# Column helpers, NumPy when available and list comprehensions otherwise
+
+def to_column(values):
+    values = [float(value) if value is not None else float('nan') for value in values]
+    return np.array(values, dtype=float) if np is not None else values
+
+
+def _broadcast(value, size):
+    return value if isinstance(value, (list, tuple)) else [value] * size
+
+
+def arith(func, left, right, size):
+    if np is not None:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = func(left, right)
+        if func is operator.truediv:
+            result = np.where(np.isinf(result), np.nan, result)  # x / 0 is no value, as without NumPy
+        return result
+    left, right = _broadcast(left, size), _broadcast(right, size)
+    if func is operator.truediv:
+        return [a / b if b else float('nan') for a, b in zip(left, right)]
+    return [func(a, b) for a, b in zip(left, right)]
+
+
+def select(mask, new, old, size):
+    if np is not None:
+        if mask is None:
+            return np.broadcast_to(np.asarray(new, dtype=float), old.shape).copy()
+        return np.where(mask, new, old)
+    if mask is None:
+        return list(_broadcast(new, size))
+    return [n if m else o for m, n, o in zip(mask, _broadcast(new, size), old)]
+
+
+def round_column(values, step):
+    if np is not None:
+        return np.round(values / step) * step
+    return [round(value / step) * step if value == value else value for value in values]
+
+
+def clamp_column(values, low, high):
+    if np is not None:
+        return np.clip(values, low, high)
+    return [min(max(value, low), high) if value == value else value for value in values]
+
+
+def changed_positions(old, new):
+    # Positions where a numeric column changed (NaN == NaN counts as unchanged)
+    if np is not None:
+        return np.flatnonzero(~((old == new) | (np.isnan(old) & np.isnan(new)))).tolist()
+    return [i for i, (a, b) in enumerate(zip(old, new)) if a != b and not (a != a and b != b)]
+
+
+def count_true(mask, size):
+    if mask is None:
+        return size
+    return int(np.count_nonzero(mask)) if np is not None else sum(mask)
+
+
+class ColumnTable:
+    # Base for tables the rules run against. Subclasses fill self.numeric
+    # (name -> column) and self.text (name -> list of str or tuples), and map
+    # the short names used in rules through self.aliases. Fields in
+    # non_negative are clamped at 0 after every rule, so later rules never
+    # see a negative intermediate.
+    aliases = {}
+    non_negative = frozenset()
+
+    def __init__(self):
+        self.size = 0
+        self.numeric = {}
+        self.text = {}
+        self.rounded = set()  # Numeric columns whose values are whole numbers after a round
+
+    def has_field(self, name):
+        try:
+            self.resolve(name)
+            return True
+        except RuleError:
+            return False
+
+    def resolve(self, name):
+        # Aliases and field names are matched without regard to case
+        field = self.aliases.get(name)
+        if field is None:
+            field = next((target for alias, target in self.aliases.items() if alias.lower() == name.lower()), name)
+        if field in self.numeric or field in self.text:
+            return field
+        for known in list(self.numeric) + list(self.text):
+            if known.lower() == name.lower():
+                return known
+        raise RuleError(f"Unknown field {name!r}")
+
+    def evaluate(self, node):
+        kind = node[0]
+        if kind == 'const':
+            return node[1]
+        if kind == 'text':
+            raise RuleError(f"Text {node[1]!r} can only be compared, not used as a number")
+        if kind == 'field':
+            field = self.resolve(node[1])
+            if field not in self.numeric:
+                raise RuleError(f"{node[1]!r} is a text field, it can only be compared")
+            return self.numeric[field]
+        if kind == 'arith':
+            return arith(node[1], self.evaluate(node[2]), self.evaluate(node[3]), self.size)
+        raise RuleError(f"Cannot evaluate {kind!r} here")
+
+    def mask(self, node):
+        # Boolean column for a condition, None means every row
+        if node is None:
+            return None
+        kind = node[0]
+        if kind == 'and':
+            left, right = self.mask(node[1]), self.mask(node[2])
+            return left & right if np is not None else [a and b for a, b in zip(left, right)]
+        if kind == 'or':
+            left, right = self.mask(node[1]), self.mask(node[2])
+            return left | right if np is not None else [a or b for a, b in zip(left, right)]
+        if kind == 'not':
+            inner = self.mask(node[1])
+            return ~inner if np is not None else [not value for value in inner]
+        if kind == 'regex':
+            values = self.text_values(node[1])
+            search = node[2].search
+            result = [any(search(v) for v in value) if isinstance(value, tuple) else bool(search(value or ''))
+                      for value in values]
+            return np.array(result, dtype=bool) if np is not None else result
+        if kind == 'compare':
+            func, left, right = node[1], node[2], node[3]
+            if right[0] == 'text' or (left[0] == 'field' and self.resolve(left[1]) in self.text):
+                values = self.text_values(left)
+                if right[0] == 'const':
+                    wanted = str(int(right[1]) if float(right[1]).is_integer() else right[1])
+                elif right[0] == 'text' or (right[0] == 'field' and not self.has_field(right[1])):
+                    wanted = right[1].lower()  # Bare words are fine: category=weapons
+                else:
+                    raise RuleError("Text fields can only be compared with a string")
+                result = [self.text_compare(func, value, wanted) for value in values]
+            else:
+                left_values, right_values = self.evaluate(left), self.evaluate(right)
+                if np is not None:
+                    result = func(left_values, right_values)
+                else:
+                    result = [func(a, b) for a, b in zip(_broadcast(left_values, self.size),
+                                                         _broadcast(right_values, self.size))]
+            return np.asarray(result, dtype=bool) if np is not None else result
+        raise RuleError(f"Not a condition: {kind!r}")
+
+    def text_values(self, node):
+        if node[0] != 'field' or self.resolve(node[1]) not in self.text:
+            raise RuleError("Text comparisons need a text field on the left")
+        return self.text[self.resolve(node[1])]
+
+    @staticmethod
+    def text_compare(func, value, wanted):
+        # Case-insensitive; tuples (tag lists) match = when any tag does
+        if isinstance(value, tuple):
+            hit = any((v or '').lower() == wanted for v in value)
+            if func is operator.eq:
+                return hit
+            return not hit if func is operator.ne else False
+        return func((value or '').lower(), wanted)
+
+    def apply(self, rules, dry_run=False):
+        # Run the rules in order, returns one (rule, matched, changed) per rule.
+        # All or nothing: when a rule fails the columns are restored, as they
+        # are after a dry_run. Rules replace columns rather than change them in
+        # place, so keeping the column references is enough to restore them.
+        if isinstance(rules, str):
+            rules = parse_rules(rules)
+        saved = dict(self.numeric)
+        saved_rounded = set(self.rounded)
+
+        report = []
+        try:
+            for rule in rules:
+                report.append(self.apply_rule(rule))
+        except BaseException:
+            dry_run = True
+            raise
+        finally:
+            if dry_run:
+                self.numeric = saved
+                self.rounded = saved_rounded
+        return report
+
+    def apply_rule(self, rule):
+        field = self.resolve(rule.field)
+        if field not in self.numeric:
+            raise RuleError(f"{rule.field!r} is not a numeric field")
+        mask = self.mask(rule.condition)
+        old = self.numeric[field]
+
+        if rule.op == 'clamp':
+            new = clamp_column(old, *rule.argument)
+        elif rule.op == 'round':
+            new = round_column(old, rule.argument)
+        else:
+            value = self.evaluate(rule.argument)
+            func = ASSIGN_OPS[rule.op]
+            new = value if func is None else arith(func, old, value, self.size)
+        new = select(mask, new, old, self.size)
+        if field in self.non_negative:
+            new = clamp_column(new, 0, float('inf'))
+
+        self.numeric[field] = new
+        if rule.op == 'round' and float(rule.argument).is_integer() and mask is None:
+            self.rounded.add(field)
+        elif rule.op != 'clamp':
+            self.rounded.discard(field)
+        return rule, count_true(mask, self.size), len(changed_positions(old, new))
@@ -0,0 +1,209 @@
+import bisect
+import fnmatch
+import re
+
+GLOB_CHARS = set('*?[')
+
+
+class SearchQuery:
+    # Parsed search text. Whitespace separates terms, all of which must match:
+    #   ammo_        substring
+    #   -box         must not contain
+    #   ammo_*762*   glob over the whole name
+    #   re:^m4a1     regular expression (also /^m4a1/)
+    # A leading '-' negates globs and regexes as well. Matching is case-insensitive.
+    def __init__(self, text):
+        self.text = text
+        self.terms = []
+        self.excluded = []
+        self.patterns = []
+        self.excluded_patterns = []
+        self.hints = []  # Literal pieces of globs, only used to pick index candidates
+        self.prefixes = []  # Literal starts of globs and ^anchored regexes, same purpose
+
+        for original in text.split():
+            negate = original.startswith('-') and len(original) > 1
+            if negate:
+                original = original[1:]
+            # Regexes keep their case (\D is not \d), they are compiled case-insensitive instead
+            token = original.lower()
+
+            pattern = None
+            if token.startswith('re:') and len(token) > 3:
+                pattern = original[3:]
+            elif len(token) > 2 and token.startswith('/') and token.endswith('/'):
+                pattern = original[1:-1]
+            elif GLOB_CHARS.intersection(token):
+                pattern = fnmatch.translate(token)
+                if not negate:
+                    pieces = re.split(r'[*?]|\[[^\]]*\]?', token)
+                    self.hints.extend(piece for piece in pieces if len(piece) >= 3)
+                    if pieces[0]:
+                        self.prefixes.append(pieces[0])
+
+            if pattern is not None and not negate and pattern.startswith('^') and '|' not in pattern:
+                anchored = re.match(r'\^(\w*)(.?)', pattern)
+                start, following = anchored.groups()
+                if following in ('*', '?', '{'):
+                    start = start[:-1]  # The last literal is optional
+                if start:
+                    self.prefixes.append(start.lower())
+
+            if pattern is not None:
+                try:
+                    compiled = re.compile(pattern, re.IGNORECASE)
+                except re.error:
+                    # Half typed expressions fall back to a literal match
+                    compiled = re.compile(re.escape(pattern), re.IGNORECASE)
+                (self.excluded_patterns if negate else self.patterns).append(compiled)
+            else:
+                (self.excluded if negate else self.terms).append(token)
+
+    def is_empty(self):
+        return not (self.terms or self.excluded or self.patterns or self.excluded_patterns)
+
+    def positive(self):
+        # The same query without its exclusions
+        query = SearchQuery('')
+        query.terms = self.terms
+        query.patterns = self.patterns
+        query.hints = self.hints
+        query.prefixes = self.prefixes
+        return query
+
+    def narrows(self, previous):
+        # True when every name matching this query also matched `previous`,
+        # so this query can be evaluated over the previous result only.
+        if not set(previous.excluded) <= set(self.excluded):
+            return False
+        if not {p.pattern for p in previous.patterns} <= {p.pattern for p in self.patterns}:
+            return False
+        if not {p.pattern for p in previous.excluded_patterns} <= {p.pattern for p in self.excluded_patterns}:
+            return False
+        return all(any(old in new for new in self.terms) for old in previous.terms)
+
+
+class SearchIndex:
+    # Built once per load: lowercase names, a trigram -> ids posting list and
+    # a sorted copy of the names for prefix lookups. Substring terms of 3+
+    # characters only ever look at the ids of their rarest trigram, globs and
+    # anchored regexes only at the names sharing their literal prefix.
+    def __init__(self, names):
+        self.names = names
+        self.lower = [name.lower() for name in names]
+        self.sorted_ids = sorted(range(len(self.lower)), key=self.lower.__getitem__)
+        self.sorted_lower = [self.lower[i] for i in self.sorted_ids]
+        self.trigrams = {}
+
+        trigrams = self.trigrams
+        for i, name in enumerate(self.lower):
+            for gram in {name[j:j + 3] for j in range(len(name) - 2)}:
+                postings = trigrams.get(gram)
+                if postings is None:
+                    trigrams[gram] = [i]
+                else:
+                    postings.append(i)
+
+    def __len__(self):
+        return len(self.lower)
+
+    def candidates(self, term):
+        # Smallest posting list that must contain every match of `term`,
+        # or None when the term is too short to use the index
+        if len(term) < 3:
+            return None
+        best = None
+        for j in range(len(term) - 2):
+            postings = self.trigrams.get(term[j:j + 3])
+            if postings is None:
+                return []
+            if best is None or len(postings) < len(best):
+                best = postings
+        return best
+
+    def prefix_candidates(self, prefix):
+        # Ascending ids of the names starting with `prefix`
+        lo = bisect.bisect_left(self.sorted_lower, prefix)
+        hi = bisect.bisect_left(self.sorted_lower, prefix + '\uffff', lo)
+        return sorted(self.sorted_ids[lo:hi])
+
+    def search(self, query, within=None):
+        # Ids (ascending) of the names matching `query`, optionally limited
+        # to the ids in `within` (which must be ascending as well)
+        if isinstance(query, str):
+            query = SearchQuery(query)
+        if query.is_empty():
+            return list(range(len(self.lower))) if within is None else list(within)
+
+        base = within
+        needs_membership = False
+        for term in query.terms + query.hints:
+            postings = self.candidates(term)
+            if postings is not None and (base is None or len(postings) < len(base)):
+                needs_membership = within is not None
+                base = postings
+        for prefix in query.prefixes:
+            postings = self.prefix_candidates(prefix)
+            if base is None or len(postings) < len(base):
+                needs_membership = within is not None
+                base = postings
+        if base is None:
+            base = range(len(self.lower))
+
+        lower = self.lower
+        terms = query.terms
+        excluded = query.excluded
+        patterns = [p.match if p.pattern.endswith(r'\Z') else p.search for p in query.patterns]
+        excluded_patterns = [p.match if p.pattern.endswith(r'\Z') else p.search for p in query.excluded_patterns]
+
+        # Most selective filters first, each pass only sees the survivors
+        result = base
+        for term in sorted(terms, key=len, reverse=True):
+            result = [i for i in result if term in lower[i]]
+        for term in excluded:
+            result = [i for i in result if term not in lower[i]]
+        for matches in patterns:
+            result = [i for i in result if matches(lower[i])]
+        for matches in excluded_patterns:
+            result = [i for i in result if not matches(lower[i])]
+
+        if needs_membership:
+            allowed = set(within)
+            result = [i for i in result if i in allowed]
+        return result if isinstance(result, list) else list(result)
+
+
+class IncrementalSearch:
+    # Search-as-you-type on top of a SearchIndex. The result of the positive
+    # part of the query is kept, so typing more of a term only rescans the
+    # previous matches and editing an exclusion (-b, -bo, -box) only re-filters
+    # the positive matches.
+    def __init__(self, index):
+        self.index = index
+        self.positive_query = None
+        self.positive_result = None
+
+    def update(self, text):
+        # Returns the matching ids, or None when the query is empty (show all)
+        query = SearchQuery(text)
+        if query.is_empty():
+            self.positive_query = self.positive_result = None
+            return None
+
+        positive = query.positive()
+        if positive.is_empty():
+            self.positive_query = self.positive_result = None
+            return self.index.search(query)
+
+        within = None
+        if self.positive_query is not None and positive.narrows(self.positive_query):
+            within = self.positive_result
+        self.positive_result = self.index.search(positive, within)
+        self.positive_query = positive
+
+        if not (query.excluded or query.excluded_patterns):
+            return self.positive_result
+        excluded = SearchQuery('')
+        excluded.excluded = query.excluded
+        excluded.excluded_patterns = query.excluded_patterns
+        return self.index.search(excluded, self.positive_result)
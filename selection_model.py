@@ -0,0 +1,108 @@
+# Which of the loaded items are in the list, as one byte per item, plus the
+# matchers used to include or exclude many items at once and an undo/redo
+# history. Every operation is a single pass over the items (or over the
+# matched indices), however many items it touches. No tkinter in here.
+import fnmatch
+import json
+import re
+
+
+class SelectionModel:
+    def __init__(self, names=(), categories=None):
+        self.names = list(names)
+        self.categories = list(categories) if categories is not None else [None] * len(self.names)
+        self.lower_names = [name.lower() for name in self.names]
+        self.positions = {}  # Lowercase name -> first index
+        for index, name in enumerate(self.lower_names):
+            self.positions.setdefault(name, index)
+        self.included = bytearray(b'\x01') * len(self.names)
+        self.undo_stack = []  # (label, target state, changed indices)
+        self.redo_stack = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def count(self):
+        return self.included.count(1)
+
+    def included_indices(self):
+        return [index for index, flag in enumerate(self.included) if flag]
+
+    def included_names(self):
+        names = self.names
+        return [names[index] for index, flag in enumerate(self.included) if flag]
+
+    # Changes
+
+    def set_state(self, indices, state, label):
+        # Include (state 1) or exclude (state 0) the given indices, returns how many changed
+        included = self.included
+        changed = [index for index in indices if included[index] != state]
+        for index in changed:
+            included[index] = state
+        if changed:
+            self.undo_stack.append((label, state, changed))
+            self.redo_stack = []
+        return len(changed)
+
+    def include(self, indices, label="Include"):
+        return self.set_state(indices, 1, label)
+
+    def exclude(self, indices, label="Exclude"):
+        return self.set_state(indices, 0, label)
+
+    def undo(self):
+        # Returns the label of the undone step, None if there was nothing to undo
+        if not self.undo_stack:
+            return None
+        label, state, changed = self.undo_stack.pop()
+        for index in changed:
+            self.included[index] = 1 - state
+        self.redo_stack.append((label, state, changed))
+        return label
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        label, state, changed = self.redo_stack.pop()
+        for index in changed:
+            self.included[index] = state
+        self.undo_stack.append((label, state, changed))
+        return label
+
+    # Matchers, each returning item indices
+
+    def match_regex(self, pattern):
+        search = re.compile(pattern, re.IGNORECASE).search
+        return [index for index, name in enumerate(self.names) if search(name)]
+
+    def match_glob(self, pattern):
+        match = re.compile(fnmatch.translate(pattern.lower())).match
+        return [index for index, name in enumerate(self.lower_names) if match(name)]
+
+    def match_category(self, category):
+        wanted = category.lower()
+        return [index for index, value in enumerate(self.categories) if (value or '').lower() == wanted]
+
+    def match_names(self, names):
+        # Indices of the given names (case-insensitive); unknown names are ignored
+        positions = self.positions
+        return [positions[name.lower()] for name in names if name.lower() in positions]
+
+    def match(self, mode, pattern):
+        if mode == 'glob':
+            return self.match_glob(pattern)
+        if mode == 'regex':
+            return self.match_regex(pattern)
+        if mode == 'category':
+            return self.match_category(pattern)
+        raise ValueError(f"Unknown match mode {mode!r}")
+
+
+def read_name_list(file_path):
+    # Class names from a text file (one per line, '#' comments) or a market JSON
+    if file_path.lower().endswith('.json'):
+        with open(file_path, 'r') as json_file:
+            return [str(item.get("ClassName", "")) for item in json.load(json_file).get("Items", [])]
+    with open(file_path, 'r') as list_file:
+        return [line.split('#', 1)[0].strip() for line in list_file if line.split('#', 1)[0].strip()]
@@ -0,0 +1,265 @@
+# Spawn positions for cfgeventspawns.xml: random points inside a map, a
+# rectangle, a polygon or from an imported list, at least a minimum distance
+# from each other and from every position already in the file, plus a check
+# for positions of different events that overlap.
+#
+# Distance checks go through a uniform grid whose cells are as large as the
+# spacing, so each candidate only looks at the points in the 3x3 cells
+# around it and placing n points takes O(n) time instead of O(n^2).
+# Coordinates are the x/z map coordinates cfgeventspawns.xml uses.
+import csv
+import math
+import os
+import random
+import re
+import xml.etree.ElementTree as ET
+
+# Playable area (x0, z0, x1, z1) per map
+MAPS = {
+    'chernarus': (0.0, 0.0, 15360.0, 15360.0),
+    'livonia': (0.0, 0.0, 12800.0, 12800.0),
+}
+DEFAULT_SPACING = 500.0  # distanceradius of a new event
+ATTEMPTS_PER_POINT = 30
+
+
+class SpatialGrid:
+    # Points bucketed by cell; near() only visits the cells a radius can reach
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size) if cell_size > 0 else 1.0
+        self.cells = {}
+        self.size = 0
+
+    def cell(self, x, z):
+        return int(math.floor(x / self.cell_size)), int(math.floor(z / self.cell_size))
+
+    def add(self, x, z, owner=None):
+        self.cells.setdefault(self.cell(x, z), []).append((x, z, owner))
+        self.size += 1
+
+    def near(self, x, z, radius):
+        # (x, z, owner, distance) of every point closer than radius
+        reach = int(math.ceil(radius / self.cell_size))
+        cx, cz = self.cell(x, z)
+        limit = radius * radius
+        cells = self.cells
+        for i in range(cx - reach, cx + reach + 1):
+            for j in range(cz - reach, cz + reach + 1):
+                for px, pz, owner in cells.get((i, j), ()):
+                    d = (px - x) ** 2 + (pz - z) ** 2
+                    if d < limit:
+                        yield px, pz, owner, math.sqrt(d)
+
+    def is_free(self, x, z, radius, ignore=None):
+        for px, pz, owner, distance in self.near(x, z, radius):
+            if ignore is None or owner != ignore:
+                return False
+        return True
+
+
+# Areas
+
+class Area:
+    # Rectangle, optionally cut down to a polygon [(x, z), ...]
+    def __init__(self, bounds, polygon=None):
+        self.bounds = bounds
+        self.polygon = polygon
+
+    @classmethod
+    def from_polygon(cls, polygon):
+        if len(polygon) < 3:
+            raise ValueError("A polygon needs at least 3 points")
+        xs = [x for x, z in polygon]
+        zs = [z for x, z in polygon]
+        return cls((min(xs), min(zs), max(xs), max(zs)), polygon)
+
+    def contains(self, x, z):
+        x0, z0, x1, z1 = self.bounds
+        if not (x0 <= x <= x1 and z0 <= z <= z1):
+            return False
+        if self.polygon is None:
+            return True
+        # Ray casting
+        inside = False
+        polygon = self.polygon
+        px, pz = polygon[-1]
+        for qx, qz in polygon:
+            if (qz > z) != (pz > z) and x < (px - qx) * (z - qz) / (pz - qz) + qx:
+                inside = not inside
+            px, pz = qx, qz
+        return inside
+
+    def random_point(self, rng):
+        x0, z0, x1, z1 = self.bounds
+        return rng.uniform(x0, x1), rng.uniform(z0, z1)
+
+
+def parse_bounds(text):
+    # "chernarus", or "x0,z0,x1,z1"
+    if text.lower() in MAPS:
+        return MAPS[text.lower()]
+    try:
+        x0, z0, x1, z1 = (float(part) for part in text.split(','))
+    except ValueError:
+        raise ValueError(f"Expected a map ({', '.join(MAPS)}) or x0,z0,x1,z1, got {text!r}")
+    return min(x0, x1), min(z0, z1), max(x0, x1), max(z0, z1)
+
+
+def read_points(file_path):
+    # [(x, z)] from a text/CSV file with x and z as the first two numbers of
+    # each line ("x,z", "x z", "x;z", a header line is skipped) or from the
+    # <pos> elements of a cfgeventspawns.xml
+    if file_path.lower().endswith('.xml'):
+        return [(x, z) for positions in read_spawns(file_path).values() for x, z, a in positions]
+    points = []
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as points_file:
+        for row in csv.reader(points_file, delimiter=','):
+            numbers = re.findall(r'-?\d+(?:\.\d+)?', ' '.join(row))
+            if len(numbers) >= 2:
+                points.append((float(numbers[0]), float(numbers[1])))
+    return points
+
+
+# cfgeventspawns.xml and events.xml
+
+def read_spawns(file_path, texts=None):
+    # {event name: [(x, z, a)]}, in file order. A missing file has none.
+    # texts, a dict, also gets the attributes as written: {name: [(x, z, a)]}.
+    spawns = {}
+    if not os.path.exists(file_path):
+        return spawns
+    for event in ET.parse(file_path).getroot().iter('event'):
+        name = event.get('name', '')
+        positions = spawns.setdefault(name, [])
+        for pos in event.iter('pos'):
+            try:
+                positions.append((float(pos.get('x')), float(pos.get('z')), float(pos.get('a') or 0)))
+            except (TypeError, ValueError):
+                continue
+            if texts is not None:
+                texts.setdefault(name, []).append((pos.get('x'), pos.get('z'), pos.get('a') or '0'))
+    return spawns
+
+
+def read_event_radii(file_path):
+    # {event name: distanceradius} from an events.xml, events without one are left out
+    radii = {}
+    if not file_path or not os.path.exists(file_path):
+        return radii
+    for event in ET.parse(file_path).getroot().iter('event'):
+        text = event.findtext('distanceradius')
+        try:
+            radii[event.get('name', '')] = float(text)
+        except (TypeError, ValueError):
+            continue
+    return radii
+
+
+# Placement
+
+class Placement:
+    def __init__(self):
+        self.positions = []  # (x, z, a) as text, ready for events_merge
+        self.requested = 0
+        self.attempts = 0
+        self.rejected = 0  # Candidates too close to another point or outside the area
+
+    def __str__(self):
+        short = f", only {len(self.positions)} of {self.requested} fit" if len(self.positions) < self.requested else ""
+        return f"{len(self.positions)} positions placed from {self.attempts} candidates{short}"
+
+
+def _format(value):
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def place_positions(count, spacing, area=None, candidates=None, existing=None, event_name=None, seed=None,
+                    max_attempts=None):
+    # Up to `count` points at least `spacing` apart and from `existing`
+    # ({event: [(x, z, a)]}; positions of event_name itself are ignored, they
+    # get replaced). Points come from `candidates` (in random order) when
+    # given, otherwise random points of `area`.
+    rng = random.Random(seed)
+    placement = Placement()
+    placement.requested = count
+    grid = SpatialGrid(spacing)
+    for name, positions in (existing or {}).items():
+        if name == event_name:
+            continue
+        for x, z, a in positions:
+            grid.add(x, z, name)
+
+    if candidates is not None:
+        pool = list(candidates)
+        rng.shuffle(pool)
+        source = iter(pool)
+    else:
+        if area is None:
+            raise ValueError("Give an area or candidate points")
+        limit = max_attempts or max(count * ATTEMPTS_PER_POINT, 1000)
+        source = (area.random_point(rng) for _ in range(limit))
+
+    for x, z in source:
+        if len(placement.positions) >= count:
+            break
+        placement.attempts += 1
+        if (area is not None and not area.contains(x, z)) or not grid.is_free(x, z, spacing):
+            placement.rejected += 1
+            continue
+        grid.add(x, z, event_name)
+        placement.positions.append((_format(x), _format(z), '0'))
+    return placement
+
+
+def find_conflicts(spawns, radii=None, default_radius=0.0):
+    # Pairs of positions of different events closer than the larger
+    # distanceradius of the two: [(event, (x, z), other event, (x, z), distance)].
+    # Events missing from radii get default_radius.
+    radii = radii or {}
+    largest = max([default_radius] + [radii.get(name, default_radius) for name in spawns])
+    if largest <= 0:
+        return []
+    grid = SpatialGrid(largest)
+    conflicts = []
+    for name, positions in spawns.items():
+        radius = radii.get(name, default_radius)
+        for x, z, a in positions:
+            for px, pz, other, distance in grid.near(x, z, largest):
+                if other != name and distance < max(radius, radii.get(other, default_radius)):
+                    conflicts.append((other, (px, pz), name, (x, z), distance))
+            grid.add(x, z, name)
+    return conflicts
+
+
+def format_conflicts(conflicts, limit=None):
+    lines = [f"{len(conflicts)} overlapping positions of different events"]
+    for first, (x1, z1), second, (x2, z2), distance in conflicts[:limit]:
+        lines.append(f"{first} ({x1:g}, {z1:g}) - {second} ({x2:g}, {z2:g}): {distance:.0f} m")
+    if limit is not None and len(conflicts) > limit:
+        lines.append(f"... and {len(conflicts) - limit} more")
+    return "\n".join(lines)
+
+
+def place_event(spawns_path, event_name, count, spacing=None, area=None, candidates=None, events_path=None,
+                seed=None, append=False, allow_fewer=False):
+    # Positions for one event of a cfgeventspawns.xml, with the placement and
+    # the conflicts the file would have with them. spacing defaults to the
+    # event's distanceradius in events_path. append keeps the event's current
+    # positions (new ones keep their distance from them), otherwise they are
+    # replaced. Raises ValueError when fewer than count fit (unless
+    # allow_fewer) or none at all, so the event's positions are never
+    # replaced by a short or empty list.
+    # Returns (positions for EventSpec.positions, Placement, conflicts).
+    texts = {}
+    spawns = read_spawns(spawns_path, texts)
+    radii = read_event_radii(events_path)
+    if spacing is None:
+        spacing = radii.get(event_name, DEFAULT_SPACING)
+    placement = place_positions(count, spacing, area, candidates, spawns, None if append else event_name, seed)
+    if not placement.positions or (len(placement.positions) < count and not allow_fewer):
+        raise ValueError(f"{placement} at {spacing:g} m spacing, {event_name} was left unchanged; "
+                         f"lower the spacing or the count")
+    positions = (texts.get(event_name, []) if append else []) + placement.positions
+    spawns[event_name] = [(float(x), float(z), float(a)) for x, z, a in positions]
+    radii.setdefault(event_name, spacing)
+    return positions, placement, find_conflicts(spawns, radii)
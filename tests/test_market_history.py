@@ -0,0 +1,28 @@
+from market_history import EditHistory
+
+
+def items():
+    return [{"ClassName": "M4A1", "MaxPriceThreshold": 1000}, {"ClassName": "AK74", "MaxPriceThreshold": 800}]
+
+
+def test_undo_restores_exact_values():
+    data = items()
+    history = EditHistory()
+    for factor in (0.5, 2):
+        history.record("scale", data, lambda: [item.update(MaxPriceThreshold=round(item["MaxPriceThreshold"] * factor))
+                                               for item in data])
+    history.goto(data, 0)
+    assert data == items()
+    assert history.base_label() == "Loaded file"
+
+
+def test_trimmed_history_no_longer_claims_the_loaded_file():
+    data = items()
+    history = EditHistory(max_steps=2)
+    for price in (1, 2, 3):
+        history.record(f"set {price}", data, lambda: data[0].update(MaxPriceThreshold=price))
+    history.goto(data, 0)
+    assert data[0]["MaxPriceThreshold"] == 1  # The first edit can no longer be undone
+    assert history.base_label() == "Oldest kept state (1 earlier edits dropped)"
+    history.clear()
+    assert history.base_label() == "Loaded file"
@@ -0,0 +1,154 @@
+import pytest
+
+import rules
+from market_batch import MarketDraft
+from market_pricing import MarketTable, apply_price_rules
+from rules import RuleError, parse_rules
+from types_loader import TypeRecord
+from types_model import TypesTable
+
+
+def types_table():
+    return TypesTable([
+        TypeRecord('AKM', 10, 5, category='weapons', usage=('Military',), value=('Tier3', 'Tier4')),
+        TypeRecord('Apple', 50, 20, category='food', usage=('Town', 'Village')),
+        TypeRecord('Hammer', None, None, category='tools'),
+    ])
+
+
+def market():
+    return {"Items": [
+        {"ClassName": "M4A1", "MaxPriceThreshold": 1000, "MinPriceThreshold": 500},
+        {"ClassName": "AK74", "MaxPriceThreshold": 800, "MinPriceThreshold": 400},
+        {"ClassName": "Ammo_556x45", "MaxPriceThreshold": 10, "MinPriceThreshold": 5},
+    ]}
+
+
+def test_parse_statements():
+    parsed = parse_rules('Max *= 1.2 where ClassName ~ "^M4"; # comment\nround Max 5\nclamp Min 1 10')
+    assert [rule.op for rule in parsed] == ['*=', 'round', 'clamp']
+    assert parsed[2].argument == (1, 10)
+
+
+@pytest.mark.parametrize('text', [
+    'Max',
+    'Max = ',
+    'Max == 3',
+    'Max = 1 where',
+    'Max = (1',
+    'Max = 1 2',
+    'round Max 0',
+    'round Max -5',
+    'clamp Max 10 1',
+    'Max = 1 where ClassName ~ "("',
+])
+def test_invalid_rules_raise_rule_error(text):
+    with pytest.raises(RuleError):
+        apply_price_rules(market(), text)
+
+
+@pytest.mark.parametrize('text', [
+    'Max = ClassName',
+    'Max += ClassName * 2',
+    'Max = 1 where 3 < ClassName',
+    'Max = "text"',
+    'Bogus = 1',
+    'Max = Bogus',
+])
+def test_text_and_unknown_fields_raise_rule_error(text):
+    with pytest.raises(RuleError):
+        apply_price_rules(market(), text)
+
+
+def test_assignment_with_condition():
+    data = market()
+    report = apply_price_rules(data, 'Max *= 2 where ClassName ~ "^(M4|AK)"; Min = Max * 0.5')
+    assert [(matched, changed) for rule, matched, changed in report] == [(2, 2), (3, 2)]
+    assert [item["MaxPriceThreshold"] for item in data["Items"]] == [2000, 1600, 10]
+    assert [item["MinPriceThreshold"] for item in data["Items"]] == [1000, 800, 5]
+
+
+def test_field_names_ignore_case():
+    data = market()
+    apply_price_rules(data, 'min = max * 0.6; MAXPRICETHRESHOLD = 1')
+    assert [item["MinPriceThreshold"] for item in data["Items"]] == [600, 480, 6]
+    assert [item["MaxPriceThreshold"] for item in data["Items"]] == [1, 1, 1]
+
+
+def test_failed_market_rules_change_nothing():
+    data = market()
+    table = MarketTable([("", data)])
+    with pytest.raises(RuleError):
+        table.apply('Max += 1; Min = bogus')
+    assert table.write_back() == set()
+    assert data == market()
+
+
+@pytest.mark.parametrize('text', ['min = Max * 0.5', 'Max = MIN', 'Max = 1 where Min > 2'])
+def test_min_is_ambiguous_in_market_drafts(text):
+    with pytest.raises(RuleError, match='ambiguous'):
+        MarketDraft(types_table().records).apply(text)
+
+
+def test_market_drafts_name_both_mins_explicitly():
+    draft = MarketDraft(types_table().records)
+    draft.apply('MinPriceThreshold = types_min * 10; Max = nominal * 100')
+    assert list(draft.numeric['MinPriceThreshold'][:2]) == [50, 200]
+    assert list(draft.numeric['MaxPriceThreshold'][:2]) == [1000, 5000]
+    assert draft.value('min', 1) == 20
+
+
+def test_round_clamp_and_dry_run():
+    data = market()
+    apply_price_rules(data, 'Max *= 1.13; round Max 5; clamp Max 20 1000')
+    assert [item["MaxPriceThreshold"] for item in data["Items"]] == [1000, 905, 20]
+    before = market()
+    report = apply_price_rules(before, 'Max = 1', dry_run=True)
+    assert report[0][2] == 3
+    assert before == market()
+
+
+def test_text_conditions_are_case_insensitive_and_match_any_tag():
+    table = types_table()
+    report = table.apply('nominal = 1 where usage = military or value = tier4; min = 0 where category = FOOD')
+    assert [matched for rule, matched, changed in report] == [1, 1]
+    assert table.changes() == {0: {'nominal': 1}, 1: {'min': 0}}
+
+
+def test_missing_values_stay_missing():
+    table = types_table()
+    table.apply('nominal += 5')
+    assert table.value('nominal', 2) is None
+    assert 2 not in table.changes()
+
+
+def test_division_by_zero_leaves_the_value():
+    table = types_table()
+    table.apply('nominal /= 0')
+    assert table.changes() == {}
+
+
+def test_non_negative_fields_are_clamped_after_every_rule():
+    table = types_table()
+    table.apply('nominal += -20')
+    table.apply('nominal += 3; min = nominal * 0.5')
+    assert table.changes()[0] == {'nominal': 3, 'min': 2}
+
+
+@pytest.mark.parametrize('dry_run', [False, True])
+def test_failed_rules_change_nothing(dry_run):
+    table = types_table()
+    table.apply('round nominal 5')
+    with pytest.raises(RuleError):
+        table.apply('nominal *= 2; min = category * 2', dry_run=dry_run)
+    assert table.changes() == {}
+    assert table.rounded == {'nominal'}
+
+
+def test_without_numpy(monkeypatch):
+    monkeypatch.setattr(rules, 'np', None)
+    table = types_table()
+    table.apply('nominal *= 2 where category = weapons; round nominal 5')
+    assert table.changes() == {0: {'nominal': 20}}
+    with pytest.raises(RuleError):
+        table.apply('nominal = name')
@@ -0,0 +1,123 @@
+import pytest
+
+from types_loader import load_types
+from types_model import load_types_table, write_types_changes
+from types_patch import TypesMismatch, patch_types_file
+
+TYPES = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>
+<types>
+    <!-- Weapons -->
+    <type name="AKM">
+        <nominal>10</nominal>
+        <lifetime>28800</lifetime>
+        <restock>0</restock>
+        <min>5</min>
+        <quantmin>-1</quantmin>
+        <quantmax>-1</quantmax>
+        <cost>100</cost>
+        <flags count_in_cargo="0" count_in_hoarder="0" count_in_map="1" count_in_player="0" crafted="0" deloot="0"/>
+        <category name="weapons"/>
+        <usage name="Military"/>
+    </type>
+    <!--
+    <type name="Disabled">
+        <nominal>99</nominal>
+    </type>
+    -->
+    <type name="Apple" >
+        <nominal> 50 </nominal>
+        <min/>
+        <category name="food"/>
+    </type>
+    <type name="NoValues">
+        <category name="tools"/>
+    </type>
+</types>
+'''
+
+
+@pytest.fixture
+def types_path(tmp_path):
+    path = tmp_path / 'types.xml'
+    path.write_bytes(TYPES)
+    return path
+
+
+def save(types_path, tmp_path, rules):
+    table = load_types_table(str(types_path))
+    table.apply(rules)
+    out = tmp_path / 'out.xml'
+    write_types_changes(str(types_path), str(out), table.changes(), table.text['name'])
+    return out
+
+
+def test_no_changes_is_byte_identical(types_path, tmp_path):
+    out = tmp_path / 'out.xml'
+    assert patch_types_file(str(types_path), str(out), {}) == 0
+    assert out.read_bytes() == TYPES
+
+
+def test_only_changed_values_differ(types_path, tmp_path):
+    out = save(types_path, tmp_path, 'nominal += 1 where name = AKM')
+    assert out.read_bytes() == TYPES.replace(b'<nominal>10</nominal>', b'<nominal>11</nominal>')
+
+
+def test_comments_and_attribute_order_are_kept(types_path, tmp_path):
+    out = save(types_path, tmp_path, 'nominal *= 2; lifetime = 3600 where name = AKM').read_bytes()
+    assert b'<!-- Weapons -->' in out
+    assert b'<nominal>99</nominal>' in out  # Commented out types are not rows
+    assert b'<flags count_in_cargo="0" count_in_hoarder="0" count_in_map="1"' in out
+    assert b'<type name="Apple" >' in out
+    assert b'<nominal> 100 </nominal>' in out  # Whitespace around a value stays
+    assert [record.nominal for record in load_types(str(tmp_path / 'out.xml'))] == [20, 100, None]
+
+
+def test_empty_and_missing_fields_are_filled(types_path, tmp_path):
+    out = save(types_path, tmp_path, 'min = 7; restock = 60 where name = NoValues').read_bytes()
+    assert b'<min>7</min>' in out and b'<min/>' not in out
+    assert b'        <restock>60</restock>\n    </type>' in out
+    records = load_types(str(tmp_path / 'out.xml'))
+    assert [(record.min, record.restock) for record in records] == [(7, 0), (7, None), (7, 60)]
+
+
+def test_crlf_line_endings_are_kept(tmp_path):
+    path = tmp_path / 'types.xml'
+    path.write_bytes(TYPES.replace(b'\n', b'\r\n'))
+    out = save(path, tmp_path, 'restock = 60 where name = NoValues').read_bytes()
+    assert b'\n' not in out.replace(b'\r\n', b'')
+    assert b'<restock>60</restock>\r\n' in out
+
+
+def test_self_closing_type_falls_back_to_the_tree_writer(tmp_path):
+    path = tmp_path / 'types.xml'
+    path.write_bytes(b'<types>\n    <type name="A"/>\n    <type name="B">\n        <nominal>1</nominal>\n    </type>\n</types>\n')
+    with pytest.raises(ValueError):
+        patch_types_file(str(path), str(tmp_path / 'patched.xml'), {0: {'nominal': 4}})
+    out = save(path, tmp_path, 'nominal = 4')
+    assert [record.nominal for record in load_types(str(out))] == [4, 4]
+
+
+def test_saving_over_the_source(types_path):
+    table = load_types_table(str(types_path))
+    table.apply('nominal = 3 where name = Apple')
+    write_types_changes(str(types_path), str(types_path), table.changes())
+    assert [record.nominal for record in load_types(str(types_path))] == [10, 3, None]
+    assert not (types_path.parent / 'types.xml.tmp').exists()
+
+
+def test_types_changed_on_disk_are_not_patched(types_path, tmp_path):
+    table = load_types_table(str(types_path))
+    table.apply('nominal = 1 where name = Apple')
+    types_path.write_bytes(TYPES.replace(b'name="Apple"', b'name="Pear"'))
+    out = tmp_path / 'out.xml'
+    with pytest.raises(TypesMismatch):
+        write_types_changes(str(types_path), str(out), table.changes(), table.text['name'])
+    assert not out.exists()
+
+
+def test_failed_write_removes_the_temporary_file(types_path, tmp_path):
+    out = tmp_path / 'out.xml'
+    out.mkdir()  # os.replace cannot put a file over a directory
+    with pytest.raises(OSError):
+        patch_types_file(str(types_path), str(out), {0: {'nominal': 1}})
+    assert not (tmp_path / 'out.xml.tmp').exists()
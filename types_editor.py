@@ -1,13 +1,28 @@
+import os
 import tkinter as tk
-from tkinter import filedialog, messagebox, Listbox, Scrollbar
-import xml.etree.ElementTree as ET
-import json
+from tkinter import ttk, filedialog, messagebox, simpledialog
+from parse_cache import load_types_cached, cache_info, format_cache_info, clear_cache
+from virtual_list import VirtualListbox
+from search_index import SearchIndex, IncrementalSearch
+from types_merge import POLICIES, merge_types_files, parse_priorities
+from workers import shared
+import dayz_core
+import perf
 
+# The rule, table and budget modules pull in NumPy, so they are imported on
+# first use (the table is built on a worker thread) to keep startup fast.
 class TypesEditor:
     def __init__(self, master):
         self.frame = tk.Frame(master)
-        self.xml_data = None
+        self.xml_path = None
+        self.records = []  # Compact per-type records from the streaming loader
+        self.table = None  # Columnar values, edits accumulate here until saved
+        self.budget = None  # Load totals of self.table, checked before every save
         self.type_names = []  # To store type names for selection
+        self.search = IncrementalSearch(SearchIndex([]))  # Rebuilt on every load
+        self.search_job = None  # Pending debounced search
+        self.load_task = None  # Background load in progress
+        self.workers = shared(self.frame)  # File I/O runs off the Tk thread
 
         self.create_ui()
 
@@ -16,20 +31,29 @@ class TypesEditor:
         self.load_button = tk.Button(self.frame, text="Load XML File", command=self.load_xml)
         self.load_button.pack(pady=10)
 
+        self.cache_button = tk.Button(self.frame, text="Parse Cache...", command=self.show_cache)
+        self.cache_button.pack(pady=5)
+
+        # Merge the types files of several mods into one, deduplicated by name
+        self.merge_policy = ttk.Combobox(self.frame, values=list(POLICIES), state='readonly', width=15)
+        self.merge_policy.set('last')
+        self.merge_policy.pack(pady=5)
+        self.merge_button = tk.Button(self.frame, text="Merge Types Files...", command=self.merge_types)
+        self.merge_button.pack(pady=5)
+
+        self.progress_bar = ttk.Progressbar(self.frame, length=300, maximum=100)
+        self.progress_bar.pack(pady=5)
+
         self.search_entry = tk.Entry(self.frame)
         self.search_entry.pack(pady=5)
+        self.search_entry.bind('<KeyRelease>', self.schedule_search)  # Search as you type
         self.search_button = tk.Button(self.frame, text="Search Types", command=self.search_types)
         self.search_button.pack(pady=5)
 
-        self.type_listbox = Listbox(self.frame, height=10, width=50, selectmode=tk.MULTIPLE)  # Enable multiple selection
+        # Only the visible rows are rendered, the names stay in memory
+        self.type_listbox = VirtualListbox(self.frame, height=10, width=50, selectmode=tk.MULTIPLE)
         self.type_listbox.pack(pady=10)
 
-        # Scrollbar for the listbox
-        self.scrollbar = Scrollbar(self.frame, command=self.type_listbox.yview)
-        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        self.type_listbox.config(yscrollcommand=self.scrollbar.set)
-
         self.create_market_button = tk.Button(self.frame, text="Create Market JSON", command=self.create_market_json)
         self.create_market_button.pack(pady=10)
 
@@ -49,80 +73,161 @@ class TypesEditor:
         self.adjust_both_button = tk.Button(self.frame, text="Adjust Both Nominal and Min", command=self.adjust_both)
         self.adjust_both_button.pack(pady=10)
 
+        # Filtered bulk operations, e.g. nominal *= 0.8 where category=weapons and usage=Military
+        self.rules_label = tk.Label(self.frame, text="Rules (separated by ';'):")
+        self.rules_label.pack()
+
+        self.rules_entry = tk.Entry(self.frame, width=70)
+        self.rules_entry.pack(pady=5)
+
+        self.preview_rules_button = tk.Button(self.frame, text="Preview Rules", command=self.preview_rules)
+        self.preview_rules_button.pack(pady=5)
+
+        self.apply_rules_button = tk.Button(self.frame, text="Apply Rules and Save", command=self.apply_rules)
+        self.apply_rules_button.pack(pady=5)
+
+        # Saves that push the estimated world entities over this ask first (blank: loaded file + 25%)
+        self.budget_label = tk.Label(self.frame, text="Entity Budget:")
+        self.budget_label.pack()
+
+        self.budget_entry = tk.Entry(self.frame)  # DAYZTOOL_ENTITY_BUDGET is filled in on the first load
+        self.budget_entry.pack(pady=5)
+
+        self.budget_button = tk.Button(self.frame, text="Show Load Budget", command=self.show_budget)
+        self.budget_button.pack(pady=5)
+
     def load_xml(self):
         file_path = filedialog.askopenfilename(filetypes=[("XML files", "*.xml")])
         if not file_path:
             return
 
-        try:
-            self.xml_data = ET.parse(file_path)
-            self.type_names = [elem.get('name') for elem in self.xml_data.findall('.//type')]
-            self.type_listbox.delete(0, tk.END)  # Clear previous entries
-            for name in self.type_names:
-                self.type_listbox.insert(tk.END, name)  # Populate the listbox
-            messagebox.showinfo("Success", "XML File Loaded Successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error loading XML file: {e}")
+        if self.load_task is not None:
+            self.load_task.cancel()  # A newer pick replaces a load still running
+        operation = perf.start("load_xml", os.path.basename(file_path))
+        self.load_task = self.workers.submit(
+            f"Loading {os.path.basename(file_path)}", lambda task: self.read_types(file_path, task, operation),
+            on_done=lambda result: self.show_types(file_path, result, operation),
+            on_error=lambda e: messagebox.showerror("Error", f"Error loading XML file: {e}"),
+            on_progress=self.show_progress, operation=operation)
+
+    @staticmethod
+    def read_types(file_path, task, operation):
+        # Worker thread: parse (or fetch from the parse cache) and build the table and search index
+        from economy_budget import EconomyBudget, find_events_file, read_event_loads
+        from types_model import TypesTable
+        with operation.phase("parse") as phase:
+            records = load_types_cached(file_path, progress=task.progress)
+            phase.items = len(records)
+        with operation.phase("transform", len(records)):
+            type_names = [record.name for record in records]
+            table = TypesTable(records)
+            budget = EconomyBudget(table, read_event_loads(find_events_file(file_path)))
+            return records, table, budget, type_names, IncrementalSearch(SearchIndex(type_names))
+
+    def show_types(self, file_path, result, operation):
+        from economy_budget import default_budget
+        self.load_task = None
+        if self.budget is None and not self.budget_entry.get().strip() and default_budget() is not None:
+            self.budget_entry.insert(0, f"{default_budget():.0f}")
+        with operation.phase("widget update"):
+            self.records, self.table, self.budget, self.type_names, self.search = result
+            self.xml_path = file_path
+            self.type_listbox.set_items(self.type_names)  # Replaces previous entries and selection
+            self.search_types()  # Keep any search that was already typed
+        operation.finish()
+        messagebox.showinfo("Success", f"XML File Loaded Successfully! ({len(self.records)} types)")
+
+    def show_cache(self):
+        # Show what is cached and offer to clear it
+        info = format_cache_info(cache_info())
+        if messagebox.askyesno("Parse Cache", f"{info}\n\nClear the cache?"):
+            messagebox.showinfo("Parse Cache", f"Removed {clear_cache()} cached files.")
+
+    def merge_types(self):
+        # Files are merged in the order they were picked, the conflict report is written next to the output
+        file_paths = filedialog.askopenfilenames(filetypes=[("XML files", "*.xml")])
+        if not file_paths:
+            return
+        policy = self.merge_policy.get()
+        priorities = None
+        if policy == 'priority':
+            text = simpledialog.askstring("Merge Priorities", "Priority per file or mod folder, others get 0\n"
+                                                              "e.g. MyMod=10, OtherMod=5")
+            if text is None:
+                return
+            try:
+                priorities = parse_priorities(text)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+        save_path = filedialog.asksaveasfilename(defaultextension=".xml", filetypes=[("XML files", "*.xml")])
+        if not save_path:
+            return
+        report_path = os.path.splitext(save_path)[0] + "_conflicts.txt"
+
+        def show_merge(merge):
+            errors = "".join(f"\n{file_path}: {error}" for file_path, error in merge.errors)
+            messagebox.showinfo("Merge Types Files",
+                                f"Merged {merge.total} types from {len(file_paths)} files into {len(merge.winners)} "
+                                f"in {merge.elapsed:.2f}s.\n{len(merge.conflicts)} names in conflict, "
+                                f"see {report_path}{errors}")
+
+        self.workers.submit("Merging types files",
+                            lambda task: merge_types_files(file_paths, save_path, policy, priorities,
+                                                           report_path=report_path),
+                            on_done=show_merge,
+                            on_error=lambda e: messagebox.showerror("Error", f"Error merging types files: {e}"))
+
+    def show_progress(self, read_bytes, total_bytes):
+        self.progress_bar['value'] = 100.0 * read_bytes / total_bytes if total_bytes else 100
+
+    def schedule_search(self, event=None):
+        # Debounce keystrokes so fast typing only runs the last search
+        if self.search_job is not None:
+            self.frame.after_cancel(self.search_job)
+        self.search_job = self.frame.after(150, self.search_types)
 
     def search_types(self):
-        search_term = self.search_entry.get().strip().lower()
-        self.type_listbox.delete(0, tk.END)  # Clear previous entries
-        for name in self.type_names:
-            if search_term in name.lower():
-                self.type_listbox.insert(tk.END, name)  # Insert matching names
+        self.search_job = None
+        with perf.operation("search_types") as operation:
+            # Terms are ANDed: "ammo_ 762 -box", globs "m4*red*" and regexes "re:^akm"
+            with operation.phase("search") as phase:
+                matches = self.search.update(self.search_entry.get())
+                phase.items = len(self.type_names) if matches is None else len(matches)
+            # Filtering only swaps the view (None shows everything), selections are kept
+            with operation.phase("widget update"):
+                self.type_listbox.set_view(matches)
 
     def create_market_json(self):
-        selected_indices = self.type_listbox.curselection()
-        if not selected_indices:
+        # Gather selected type names, including ones hidden by the current search
+        selected_types = self.type_listbox.selected_names()
+        if not selected_types:
             messagebox.showwarning("Warning", "Please select at least one type name.")
             return
 
-        # Gather selected type names
-        selected_types = [self.type_listbox.get(i) for i in selected_indices]
-
-        # Base market data structure
-        market_data = {
-            "m_Version": 12,
-            "DisplayName": "Market Data",
-            "Icon": "Deliver",
-            "Color": "FBFCFEFF",
-            "IsExchange": 0,
-            "InitStockPercent": 75.0,
-            "Items": []
-        }
-
-        # For simplicity, using default price thresholds
-        max_price_threshold = 930
-        min_price_threshold = 930
-
-        # Create items for the market JSON
-        for item in selected_types:
-            market_data["Items"].append({
-                "ClassName": item,
-                "MaxPriceThreshold": max_price_threshold,
-                "MinPriceThreshold": min_price_threshold,
-                "SellPricePercent": -1,
-                "MaxStockThreshold": 100,
-                "MinStockThreshold": 100,
-                "QuantityPercent": -1,
-                "SpawnAttachments": [],
-                "Variants": []
-            })
-
         # Save to JSON file
         file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
         if not file_path:
             return
 
-        try:
-            with open(file_path, 'w') as json_file:
-                json.dump(market_data, json_file, indent=4)
+        operation = perf.start("create_market_json", os.path.basename(file_path))
+        with operation.phase("transform", len(selected_types)):
+            market_data = dayz_core.build_market_data(selected_types)
+
+        def save(task):
+            with operation.phase("serialize", len(selected_types)):
+                dayz_core.save_json(market_data, file_path)
+
+        def saved(result):
+            operation.finish()
             messagebox.showinfo("Success", "Market JSON Created Successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error saving JSON file: {e}")
+
+        self.workers.submit("Saving market JSON", save, on_done=saved,
+                            on_error=lambda e: messagebox.showerror("Error", f"Error saving JSON file: {e}"),
+                            operation=operation)
 
     def adjust_both(self):
-        if self.xml_data is None:
+        if self.table is None:
             messagebox.showwarning("Warning", "Please load an XML file first.")
             return
 
@@ -133,29 +238,96 @@ class TypesEditor:
             messagebox.showerror("Error", "Please enter valid numbers for both nominal and min.")
             return
 
-        for elem in self.xml_data.findall('.//type'):
-            nominal_node = elem.find('nominal')
-            min_node = elem.find('min')
-            if nominal_node is not None:
-                original_nominal = int(nominal_node.text)
-                new_nominal = max(0, original_nominal + nominal_adjustment)  # Ensure non-negative
-                nominal_node.text = str(new_nominal)  # Update the nominal value
+        operation = perf.start("adjust_both", os.path.basename(self.xml_path or ''))
+        with operation.phase("transform", self.table.size):
+            self.table.apply(f"nominal += {nominal_adjustment}; min += {min_adjustment}")
+        self.save_changes(operation)
+
+    def read_rules(self):
+        if self.table is None:
+            messagebox.showwarning("Warning", "Please load an XML file first.")
+            return None
+        rules = self.rules_entry.get().strip()
+        if not rules:
+            messagebox.showwarning("Warning", "Please enter at least one rule.")
+            return None
+        return rules
+
+    def preview_rules(self):
+        from rules import RuleError
+        from types_model import format_preview
+        rules = self.read_rules()
+        if rules is None:
+            return
+        try:
+            report = self.table.preview(rules)
+        except RuleError as e:
+            messagebox.showerror("Error", f"Invalid rule: {e}")
+            return
+        messagebox.showinfo("Preview", format_preview(report))
+
+    def apply_rules(self):
+        from rules import RuleError
+        rules = self.read_rules()
+        if rules is None:
+            return
+        try:
+            self.table.apply(rules)
+        except RuleError as e:
+            messagebox.showerror("Error", f"Invalid rule: {e}")
+            return
+        self.save_changes()
+
+    def show_budget(self):
+        if self.budget is None:
+            messagebox.showwarning("Warning", "Please load an XML file first.")
+            return
+        text = self.budget.report(('category', 'usage', 'value'), limit=5)
+        messagebox.showinfo("Load Budget", f"{text}\n\nUnsaved edits:\n{self.budget.check(self.read_budget())}")
+
+    def read_budget(self):
+        try:
+            return float(self.budget_entry.get()) if self.budget_entry.get().strip() else None
+        except ValueError:
+            return None
 
-            if min_node is not None:
-                original_min = int(min_node.text)
-                new_min = max(0, original_min + min_adjustment)  # Ensure non-negative
-                min_node.text = str(new_min)  # Update the min value
+    def within_budget(self):
+        # True when the pending edits fit the entity budget or the user saves anyway
+        check = self.budget.check(self.read_budget())
+        if not check.over:
+            return True
+        return messagebox.askyesno("Entity Budget", f"{check}\n\nSave anyway?")
+
+    def save_changes(self, operation=None):
+        if self.budget is not None and not self.within_budget():
+            if operation is not None:
+                operation.finish('cancelled')
+            return
 
         # Ask user for the file path to save the modified XML
         save_path = filedialog.asksaveasfilename(defaultextension=".xml", filetypes=[("XML files", "*.xml")])
         if not save_path:
+            if operation is not None:
+                operation.finish('cancelled')
             return
 
-        try:
-            self.xml_data.write(save_path)
-            messagebox.showinfo("Success", "XML File Saved Successfully!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Error saving XML file: {e}")
+        operation = operation or perf.start("save_changes", os.path.basename(save_path))
+        xml_path = self.xml_path
+        changes = self.table.changes()  # Taken now, later edits do not leak into this save
+        names = self.table.text['name']
+
+        def save(task):
+            from types_model import write_types_changes
+            with operation.phase("serialize", len(changes)):
+                return write_types_changes(xml_path, save_path, changes, names)
+
+        def saved(edit_count):
+            operation.finish()
+            messagebox.showinfo("Success", f"XML File Saved Successfully! ({edit_count} values changed)")
+
+        self.workers.submit(
+            f"Saving {os.path.basename(save_path)}", save, on_done=saved,
+            on_error=lambda e: messagebox.showerror("Error", f"Error saving XML file: {e}"), operation=operation)
 
 # Example usage
 if __name__ == "__main__":
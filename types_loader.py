@@ -0,0 +1,134 @@
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+
+# Integer child elements of a <type>, stored as attributes of the same name
+INT_FIELDS = ('nominal', 'min', 'lifetime', 'restock', 'quantmin', 'quantmax')
+
+
+class TypeRecord:
+    # Compact per-type record, one per <type> node in a types.xml
+    __slots__ = ('name', 'nominal', 'min', 'lifetime', 'category', 'usage', 'value',
+                 'restock', 'quantmin', 'quantmax', 'tag')
+
+    def __init__(self, name, nominal=None, min=None, lifetime=None, category=None, usage=(), value=(),
+                 restock=None, quantmin=None, quantmax=None, tag=()):
+        self.name = name
+        self.nominal = nominal
+        self.min = min
+        self.lifetime = lifetime
+        self.category = category
+        self.usage = usage
+        self.value = value
+        self.restock = restock
+        self.quantmin = quantmin
+        self.quantmax = quantmax
+        self.tag = tag
+
+    def __repr__(self):
+        return f"TypeRecord({self.name!r}, nominal={self.nominal}, min={self.min})"
+
+
+class _CountingReader:
+    # Wraps a binary file so the parser's reads can be turned into progress
+    def __init__(self, file, total, progress, step):
+        self.file = file
+        self.total = total
+        self.progress = progress
+        self.step = step
+        self.read_bytes = 0
+        self.next_report = step
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.read_bytes += len(data)
+        if self.progress and (self.read_bytes >= self.next_report or not data):
+            self.progress(self.read_bytes, self.total)
+            self.next_report = self.read_bytes + self.step
+        return data
+
+
+def _to_int(text):
+    if text is None:
+        return None
+    try:
+        return int(text.strip())
+    except ValueError:
+        return None
+
+
+def _intern(text):
+    # Category/usage/value names repeat across thousands of types, share them
+    return sys.intern(text) if text else text
+
+
+def iter_type_records(file_path, progress=None):
+    # Stream <type> records out of a types.xml without building the whole tree.
+    # progress(read_bytes, total_bytes) is called roughly every 1% of the file.
+    total = os.path.getsize(file_path)
+    step = max(total // 100, 64 * 1024)
+
+    with open(file_path, 'rb') as raw:
+        source = _CountingReader(raw, total, progress, step)
+        context = ET.iterparse(source, events=('start', 'end'))
+        root = None
+        depth = 0
+        in_type = False
+
+        for event, elem in context:
+            if event == 'start':
+                if root is None:
+                    root = elem
+                if elem.tag == 'type' and not in_type:
+                    in_type = True
+                    depth = 0
+                elif in_type:
+                    depth += 1
+                continue
+
+            if not in_type:
+                # Keep the root's child list from growing with skipped nodes
+                if elem is not root and root is not None:
+                    root.clear()
+                continue
+
+            if elem.tag == 'type' and depth == 0:
+                in_type = False
+                yield _record_from_element(elem)
+                # Drop the finished <type> and anything the root still references
+                elem.clear()
+                root.clear()
+            else:
+                depth -= 1
+
+        if progress:
+            progress(total, total)
+
+
+def _record_from_element(elem):
+    record = TypeRecord(elem.get('name'))
+    usage = []
+    value = []
+    tags = []
+    for child in elem:
+        tag = child.tag
+        if tag in INT_FIELDS:
+            setattr(record, tag, _to_int(child.text))
+        elif tag == 'category':
+            record.category = _intern(child.get('name'))
+        elif tag == 'usage':
+            usage.append(_intern(child.get('name')))
+        elif tag == 'value':
+            value.append(_intern(child.get('name')))
+        elif tag == 'tag':
+            tags.append(_intern(child.get('name')))
+    record.usage = tuple(usage)
+    record.value = tuple(value)
+    record.tag = tuple(tags)
+    return record
+
+
+def load_types(file_path, progress=None):
+    # Convenience wrapper returning the records of every named <type>
+    return [record for record in iter_type_records(file_path, progress) if record.name]
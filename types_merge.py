@@ -0,0 +1,168 @@
+# Merge any number of types.xml files (one per mod) into one, deduplicating
+# by class name (case-insensitive, like the game).
+#
+# Files are read one at a time, each one whole while it is scanned. For
+# every unique name only the winning <type> element is kept, as the raw
+# bytes from its source file, and a duplicate only as (name, file, nominal)
+# for the conflict report. Memory is therefore the largest input file plus
+# the unique elements plus a few small objects per duplicate, not the total
+# input, and the merged file keeps each element's original formatting.
+# Duplicates are resolved by a policy:
+#
+#   first        the first file that defines a name wins
+#   last         the last file wins (later mods override earlier ones)
+#   max-nominal  the definition with the highest nominal wins
+#   priority     the file with the highest priority wins, ties go to the first
+import os
+import re
+import time
+
+# One match per <type> element (or comment, so commented out types are skipped)
+_ELEMENT = re.compile(rb'<!--.*?-->|<type\b(?P<attrs>[^>]*?)(?:/>|>(?P<body>.*?)</type\s*>)', re.S)
+_NAME = re.compile(rb'\bname\s*=\s*(["\'])(.*?)\1', re.S)
+_NOMINAL = re.compile(rb'<nominal\b[^>]*>\s*(-?\d+)\s*</nominal')
+
+POLICIES = ('first', 'last', 'max-nominal', 'priority')
+HEADER = b'<?xml version="1.0" encoding="UTF-8" standalone="yes" ?>\n<types>\n'
+FOOTER = b'</types>\n'
+
+
+class Definition:
+    # One <type> as found in one source file
+    __slots__ = ('name', 'source', 'nominal', 'blob')
+
+    def __init__(self, name, source, nominal, blob):
+        self.name = name
+        self.source = source  # Position in the input file list
+        self.nominal = nominal
+        self.blob = blob
+
+
+def scan_types(data):
+    # (name, nominal, raw element bytes) per named <type>, in document order
+    for match in _ELEMENT.finditer(data):
+        attrs = match.group('attrs')
+        if attrs is None:
+            continue  # Comment
+        name = _NAME.search(attrs)
+        if name is None or not name.group(2):
+            continue
+        body = match.group('body')
+        nominal = _NOMINAL.search(body) if body else None
+        yield (name.group(2).decode('utf-8', 'replace'), int(nominal.group(1)) if nominal else None, match.group(0))
+
+
+def wins(policy, new, old, priorities):
+    if policy == 'first':
+        return False
+    if policy == 'last':
+        return True
+    if policy == 'max-nominal':
+        return (new.nominal or 0) > (old.nominal or 0)
+    return priorities[new.source] > priorities[old.source]
+
+
+def parse_priorities(text):
+    # "MyMod=10, OtherMod=5" -> {'MyMod': 10, 'OtherMod': 5}
+    priorities = {}
+    for part in re.split(r'[,;\n]', text):
+        if not part.strip():
+            continue
+        name, separator, priority = part.strip().rpartition('=')
+        try:
+            priorities[name.strip()] = int(priority)
+        except ValueError:
+            raise ValueError(f"Expected NAME=N, got {part.strip()!r}")
+        if not separator or not name.strip():
+            raise ValueError(f"Expected NAME=N, got {part.strip()!r}")
+    return priorities
+
+
+def source_priority(file_path, priorities):
+    # priorities: {file path, file name or folder (mod) name: priority}
+    path = os.path.normpath(os.path.abspath(file_path))
+    for key, priority in priorities.items():
+        if os.path.normpath(os.path.abspath(key)) == path or key in path.split(os.sep):
+            return priority
+    return 0
+
+
+class TypesMerge:
+    def __init__(self, file_paths, policy='last', priorities=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown merge policy {policy!r}, expected one of {', '.join(POLICIES)}")
+        self.file_paths = list(file_paths)
+        self.policy = policy
+        self.priorities = [source_priority(path, priorities or {}) for path in self.file_paths]
+        self.winners = {}  # Lowercase name -> Definition, in first-seen order
+        self.conflicts = {}  # Lowercase name -> every Definition of a name defined more than once
+        self.total = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def run(self, progress=None):
+        start = time.perf_counter()
+        for source, file_path in enumerate(self.file_paths):
+            if progress:
+                progress(source, len(self.file_paths))
+            try:
+                with open(file_path, 'rb') as types_file:
+                    data = types_file.read()
+            except OSError as e:
+                self.errors.append((file_path, str(e)))
+                continue
+            self.add(source, data)
+        if progress:
+            progress(len(self.file_paths), len(self.file_paths))
+        self.elapsed = time.perf_counter() - start
+        return self
+
+    def add(self, source, data):
+        winners = self.winners
+        for name, nominal, blob in scan_types(data):
+            self.total += 1
+            key = name.lower()
+            definition = Definition(name, source, nominal, blob)
+            current = winners.get(key)
+            if current is None:
+                winners[key] = definition
+                continue
+            occurrences = self.conflicts.get(key)
+            if occurrences is None:
+                occurrences = self.conflicts[key] = [Definition(current.name, current.source, current.nominal, None)]
+            occurrences.append(Definition(definition.name, source, definition.nominal, None))
+            if wins(self.policy, definition, current, self.priorities):
+                winners[key] = definition
+
+    def write(self, save_path):
+        # Stream the winners out in first-seen order, returns the number written
+        temp_path = save_path + '.tmp'
+        with open(temp_path, 'wb') as merged_file:
+            merged_file.write(HEADER)
+            for definition in self.winners.values():
+                merged_file.write(b'    ')
+                merged_file.write(definition.blob)
+                merged_file.write(b'\n')
+            merged_file.write(FOOTER)
+        os.replace(temp_path, save_path)
+        return len(self.winners)
+
+    def report(self):
+        # One line per duplicated name: every definition and the winner
+        lines = [f"{len(self.conflicts)} names defined more than once ({self.policy} wins)"]
+        for key, occurrences in self.conflicts.items():
+            winner = self.winners[key]
+            found = ", ".join(f"{self.file_paths[definition.source]} nominal {definition.nominal}"
+                              for definition in occurrences)
+            lines.append(f"{winner.name}: {found} -> {self.file_paths[winner.source]}")
+        return "\n".join(lines)
+
+
+def merge_types_files(file_paths, save_path, policy='last', priorities=None, report_path=None):
+    # Returns the finished TypesMerge; check .errors for unreadable inputs
+    merge = TypesMerge(file_paths, policy, priorities).run()
+    merge.write(save_path)
+    if report_path:
+        with open(report_path, 'w') as report_file:
+            report_file.write(merge.report() + "\n")
+    return merge
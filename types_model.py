@@ -0,0 +1,109 @@
+# Columnar model of one or more types.xml files for the rule language in
+# rules.py, e.g.
+#
+#   nominal *= 0.8 where category=weapons and usage=Military
+#   min = nominal * 0.3
+#
+# Integer columns: nominal, min, lifetime, restock, quantmin, quantmax.
+# Text columns: name, category, usage, value, tag (the last three hold a
+# tuple of names per type) and file.
+import xml.etree.ElementTree as ET
+
+from rules import ColumnTable, to_column, changed_positions
+from types_loader import INT_FIELDS, load_types
+from types_patch import TypesMismatch, check_names, patch_types_file
+
+# Never written below zero, like the original nominal/min adjustment
+NON_NEGATIVE_FIELDS = {'nominal', 'min', 'lifetime', 'restock'}
+
+
+class TypesTable(ColumnTable):
+    aliases = {'classname': 'name', 'type': 'name'}
+    non_negative = NON_NEGATIVE_FIELDS
+
+    def __init__(self, records, sources=None):
+        # sources: file name per record, for tables built from several files
+        super().__init__()
+        self.records = records
+        self.size = len(records)
+        self.numeric = {field: to_column([getattr(record, field) for record in records]) for field in INT_FIELDS}
+        self.baseline = {field: self.copy_column(column) for field, column in self.numeric.items()}
+        self.text = {
+            'name': [record.name for record in records],
+            'category': [record.category for record in records],
+            'usage': [record.usage for record in records],
+            'value': [record.value for record in records],
+            'tag': [record.tag for record in records],
+            'file': list(sources) if sources is not None else [''] * len(records),
+        }
+
+    @staticmethod
+    def copy_column(column):
+        return column.copy() if hasattr(column, 'copy') else list(column)
+
+    def preview(self, rules):
+        # Dry run: (rule, matched, changed) per rule without touching the columns
+        return self.apply(rules, dry_run=True)
+
+    def changes(self):
+        # {row: {field: new int value}} for every value that differs from the loaded file
+        result = {}
+        for field, column in self.numeric.items():
+            for row in changed_positions(self.baseline[field], column):
+                value = float(column[row])
+                if value != value:
+                    continue  # Field missing in the file and still without a value
+                value = int(round(value))
+                if field in NON_NEGATIVE_FIELDS:
+                    value = max(0, value)
+                result.setdefault(row, {})[field] = value
+        return result
+
+    def value(self, field, row):
+        value = self.numeric[field][row]
+        return None if value != value else int(round(float(value)))
+
+
+def load_types_table(file_path, progress=None):
+    return TypesTable(load_types(file_path, progress))
+
+
+def write_types_changes(file_path, save_path, changes, names=None):
+    # Write file_path to save_path with the changed values. Rows are the
+    # positions of the named <type> elements in document order, the same
+    # order load_types returns them in; names (e.g. table.text['name']) makes
+    # sure they still are, raising TypesMismatch rather than writing values
+    # into the wrong types. Only the changed values are patched into the
+    # original bytes; the tree writer is the fallback for the odd edit
+    # patching cannot express.
+    try:
+        return patch_types_file(file_path, save_path, changes, names)
+    except TypesMismatch:
+        raise
+    except ValueError:
+        return write_types_tree(file_path, save_path, changes, names)
+
+
+def write_types_tree(file_path, save_path, changes, names=None):
+    # Full re-serialization, drops comments and formatting
+    tree = ET.parse(file_path)
+    named_types = [elem for elem in tree.iter('type') if elem.get('name')]
+    for row in changes:
+        if row >= len(named_types):
+            raise TypesMismatch(f"Row {row} is past the {len(named_types)} named types in the file")
+        check_names(row, named_types[row].get('name'), names)
+    for row, elem in enumerate(named_types):
+        fields = changes.get(row)
+        if not fields:
+            continue
+        for field, value in fields.items():
+            node = elem.find(field)
+            if node is None:
+                node = ET.SubElement(elem, field)
+            node.text = str(value)
+    tree.write(save_path)
+    return sum(len(fields) for fields in changes.values())
+
+
+def format_preview(report):
+    return "\n".join(f"{rule.text}: {matched} types matched, {changed} values change" for rule, matched, changed in report)
@@ -0,0 +1,176 @@
+# Patch-mode writer for types.xml: instead of re-serializing the whole tree,
+# the byte spans of the integer values are located with one regex pass and
+# only the changed values are spliced into the original bytes. Comments,
+# whitespace, attribute order and line endings stay exactly as they were, so
+# a save produces a diff of just the edited lines.
+import html
+import os
+import re
+
+from types_loader import INT_FIELDS
+
+_FIELDS = b'|'.join(field.encode('ascii') for field in INT_FIELDS)
+_TOKENS = re.compile(
+    rb'<!--.*?-->'                                         # comments (commented out types are skipped)
+    rb'|<!\[CDATA\[.*?\]\]>'
+    rb'|<\?.*?\?>'
+    rb'|(?P<type><type\b[^>]*?(?P<empty>/?)>)'
+    rb'|(?P<close></type\s*>)'
+    rb'|<(?P<field>' + _FIELDS + rb')\b[^>]*>(?P<text>[^<]*)</(?P=field)\s*>'
+    rb'|<(?P<empty_field>' + _FIELDS + rb')\b[^>]*/>',
+    re.S)
+_NAME = re.compile(rb'\bname\s*=\s*(["\'])(.*?)\1', re.S)
+
+
+class TypesMismatch(ValueError):
+    # The file no longer has the types the changes were made for
+    pass
+
+
+class TypeSpans:
+    # Where the values of one named <type> live in the file
+    __slots__ = ('name', 'values', 'empty', 'close', 'indent')
+
+    def __init__(self, name):
+        self.name = name
+        self.values = {}  # field -> (start, end) of the value text, whitespace excluded
+        self.empty = {}  # field -> (start, end) of a self-closing <field/>
+        self.close = None  # Offset where missing fields are inserted, None for <type/>
+        self.indent = b'        '
+
+
+def scan_spans(data):
+    # TypeSpans per named <type> in document order, the same rows load_types returns
+    spans = []
+    current = None
+    for match in _TOKENS.finditer(data):
+        if match.group('type'):
+            name = _NAME.search(match.group('type'))
+            named = name is not None and name.group(2)
+            current = TypeSpans(html.unescape(name.group(2).decode('utf-8'))) if named else None
+            if named:
+                spans.append(current)
+            if match.group('empty'):
+                current = None
+        elif current is None:
+            continue
+        elif match.group('close'):
+            line_start = data.rfind(b'\n', 0, match.start()) + 1
+            # Insert before the indentation of </type> so new fields get their own line
+            current.close = line_start if not data[line_start:match.start()].strip() else match.start()
+            current = None
+        elif match.group('field'):
+            field = match.group('field').decode('ascii')
+            text = match.group('text')
+            start = match.start('text') + len(text) - len(text.lstrip())
+            current.values[field] = (start, start + len(text.strip()))
+            current.empty.pop(field, None)
+            line_start = data.rfind(b'\n', 0, match.start()) + 1
+            indent = data[line_start:match.start()]
+            if not indent.strip():
+                current.indent = indent
+        elif match.group('empty_field'):
+            field = match.group('empty_field').decode('ascii')
+            current.empty[field] = match.span()
+            current.values.pop(field, None)
+    return spans
+
+
+def check_names(row, found, names):
+    # Raises TypesMismatch when row is not the type names says it should be
+    if names is None:
+        return
+    expected = names[row] if row < len(names) else None
+    if found != expected:
+        raise TypesMismatch(f"Type {row + 1} is {found!r} in the file but {expected!r} was edited; "
+                            f"the file changed since it was loaded, reload it")
+
+
+def patch_bytes(data, spans, changes, names=None):
+    # Splice {row: {field: int}} into data. names, the type name per row the
+    # changes were made for, are checked against the file first. Raises
+    # TypesMismatch when they differ, ValueError if a change needs a new
+    # element inside a self-closing <type/>.
+    edits = []  # (start, end, replacement)
+    for row, fields in changes.items():
+        if row >= len(spans):
+            raise TypesMismatch(f"Row {row} is past the {len(spans)} named types in the file")
+        type_spans = spans[row]
+        check_names(row, type_spans.name, names)
+        missing = []
+        for field, value in fields.items():
+            text = str(int(value)).encode('ascii')
+            if field in type_spans.values:
+                edits.append(type_spans.values[field] + (text,))
+            elif field in type_spans.empty:
+                edits.append(type_spans.empty[field] + (b'<%s>%s</%s>' % (field.encode(), text, field.encode()),))
+            else:
+                missing.append((field, text))
+        if missing:
+            if type_spans.close is None:
+                raise ValueError(f"Cannot add fields to the self-closing type {type_spans.name}")
+            newline = b'\r\n' if b'\r\n' in data[:4096] else b'\n'
+            inserted = b''.join(b'%s<%s>%s</%s>%s' % (type_spans.indent, field.encode(), text, field.encode(), newline)
+                                for field, text in missing)
+            edits.append((type_spans.close, type_spans.close, inserted))
+
+    pieces = []
+    position = 0
+    for start, end, replacement in sorted(edits):
+        pieces.append(data[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(data[position:])
+    return b''.join(pieces), len(edits)
+
+
+class TypesPatch:
+    # The bytes and value spans of one types file, kept so repeated saves of
+    # the same source only pay for the edits
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.stat = self.file_stat()
+        with open(file_path, 'rb') as source:
+            self.data = source.read()
+        self.spans = scan_spans(self.data)
+
+    def file_stat(self):
+        stat = os.stat(self.file_path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def is_current(self):
+        try:
+            return self.file_stat() == self.stat
+        except OSError:
+            return False
+
+    def write(self, save_path, changes, names=None):
+        # Returns the number of edits. Saving over the source goes through a temporary file.
+        patched, edit_count = patch_bytes(self.data, self.spans, changes, names)
+        temp_path = save_path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as target:
+                target.write(patched)
+            os.replace(temp_path, save_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return edit_count
+
+
+_last_patch = None
+
+
+def open_patch(file_path):
+    # TypesPatch for file_path, reused while the file is unchanged on disk
+    global _last_patch
+    path = os.path.abspath(file_path)
+    if _last_patch is None or _last_patch.file_path != path or not _last_patch.is_current():
+        _last_patch = TypesPatch(path)
+    return _last_patch
+
+
+def patch_types_file(file_path, save_path, changes, names=None):
+    # Write file_path to save_path with the changed values, returns the number of edits
+    return open_patch(file_path).write(save_path, changes, names)
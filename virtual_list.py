@@ -0,0 +1,133 @@
+import tkinter as tk
+from tkinter import Listbox, Scrollbar
+
+
+class VirtualListbox:
+    # Listbox that only ever holds the visible window of rows. The full list
+    # lives in self.items, the current filter in self.view (indices into
+    # self.items) and the selection in self.selected (also item indices), so
+    # loading or filtering 100k names never touches more than `height` rows
+    # of the Tk widget, and selections survive a filter change.
+    def __init__(self, master, height=10, width=50, selectmode=tk.MULTIPLE):
+        self.frame = tk.Frame(master)
+        self.height = height
+        self.selectmode = selectmode
+        self.items = []
+        self.view = range(0)
+        self.selected = set()
+        self.first = 0
+
+        self.listbox = Listbox(self.frame, height=height, width=width, selectmode=tk.MULTIPLE,
+                               exportselection=False, activestyle='none')
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH)
+
+        self.scrollbar = Scrollbar(self.frame, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        # All interaction goes through the model, never through Tk's own selection
+        self.listbox.bind('<Button-1>', self.on_click)
+        self.listbox.bind('<B1-Motion>', lambda event: 'break')
+        self.listbox.bind('<Double-Button-1>', lambda event: 'break')
+        self.listbox.bind('<MouseWheel>', self.on_mousewheel)
+        self.listbox.bind('<Button-4>', lambda event: self.scroll(-3))
+        self.listbox.bind('<Button-5>', lambda event: self.scroll(3))
+        self.listbox.bind('<Up>', lambda event: self.scroll(-1))
+        self.listbox.bind('<Down>', lambda event: self.scroll(1))
+        self.listbox.bind('<Prior>', lambda event: self.scroll(-self.height))
+        self.listbox.bind('<Next>', lambda event: self.scroll(self.height))
+
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+
+    def bind(self, sequence, func):
+        self.listbox.bind(sequence, func, add='+')
+
+    # Model
+
+    def set_items(self, names):
+        self.items = list(names)
+        self.view = range(len(self.items))
+        self.selected = set()
+        self.first = 0
+        self.render()
+
+    def set_view(self, indices=None):
+        # Show only the given item indices (None shows everything)
+        self.view = range(len(self.items)) if indices is None else indices
+        self.first = 0
+        self.render()
+
+    def size(self):
+        return len(self.view)
+
+    def visible_names(self):
+        return [self.items[i] for i in self.view]
+
+    def selected_names(self):
+        return [self.items[i] for i in sorted(self.selected)]
+
+    def select(self, indices):
+        if self.selectmode == tk.MULTIPLE:
+            self.selected.update(indices)
+        else:
+            self.selected = set(list(indices)[-1:])
+        self.render()
+
+    def clear_selection(self):
+        self.selected = set()
+        self.render()
+
+    # Rendering
+
+    def render(self):
+        total = len(self.view)
+        self.first = max(0, min(self.first, total - self.height))
+        rows = self.view[self.first:self.first + self.height]
+
+        self.listbox.delete(0, tk.END)
+        if rows:
+            self.listbox.insert(tk.END, *[self.items[i] for i in rows])
+        for row, index in enumerate(rows):
+            if index in self.selected:
+                self.listbox.selection_set(row)
+
+        if total:
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + self.height) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def yview(self, *args):
+        if args[0] == 'moveto':
+            self.first = int(float(args[1]) * len(self.view))
+            self.render()
+        elif args[0] == 'scroll':
+            amount = int(args[1])
+            self.scroll(amount * self.height if args[2] == 'pages' else amount)
+
+    def scroll(self, rows):
+        self.first += rows
+        self.render()
+        return 'break'
+
+    def on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_click(self, event):
+        self.listbox.focus_set()
+        row = self.listbox.nearest(event.y)
+        position = self.first + row
+        if row < 0 or position >= len(self.view):
+            return 'break'
+
+        index = self.view[position]
+        if self.selectmode == tk.MULTIPLE:
+            if index in self.selected:
+                self.selected.discard(index)
+            else:
+                self.selected.add(index)
+        else:
+            self.selected = {index}
+
+        self.render()
+        self.listbox.event_generate('<<ListboxSelect>>')
+        return 'break'
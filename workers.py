@@ -0,0 +1,191 @@
+# Shared background executor for the tabs, so file I/O and heavy transforms
+# never run inside a Tk callback.
+#
+#   workers = shared(self.frame)
+#   workers.submit("Loading types.xml", lambda task: load_types_cached(path, task.progress),
+#                  on_done=self.show_types, on_progress=self.show_progress)
+#
+# The function runs on a thread pool and gets its Task, whose progress() may
+# be passed wherever a progress(done, total) callback is accepted; it also
+# raises Cancelled once the task was cancelled, which stops loaders at their
+# next progress report. Progress, results and errors travel back through a
+# queue that the Tk thread drains with after(), so on_done, on_error and
+# on_progress always run on the Tk thread and may touch widgets. Without
+# on_error, errors are shown in a message box. A perf.Operation passed as
+# operation is finished when the task fails or is cancelled, and after
+# on_done unless on_done finished it itself (before showing a message box,
+# which would otherwise count as part of the operation).
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk, messagebox
+
+POLL_MS = 50
+MAX_WORKERS = 4
+
+
+class Cancelled(Exception):
+    pass
+
+
+class Task:
+    def __init__(self, workers, label, on_done, on_error, on_progress, operation=None):
+        self.workers = workers
+        self.label = label
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.operation = operation
+        self.cancel_event = threading.Event()
+        self.future = None
+        self.done = 0
+        self.total = 0
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        # Tasks that have not started are dropped, running ones stop at their next progress() or check()
+        self.cancel_event.set()
+        if self.future is not None and self.future.cancel():
+            self.workers.events.put(('cancelled', self, None))
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise Cancelled()
+
+    def progress(self, done, total):
+        # Safe to call from the worker thread
+        self.check()
+        self.workers.events.put(('progress', self, (done, total)))
+
+
+class Workers:
+    def __init__(self, widget, max_workers=MAX_WORKERS):
+        self.widget = widget
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dayztool')
+        self.events = queue.Queue()
+        self.active = []  # Running or queued tasks, oldest first
+        self.listeners = []  # Called with self whenever the set of tasks or their progress changes
+        self.poll_job = None
+
+    def submit(self, label, func, on_done=None, on_error=None, on_progress=None, operation=None):
+        task = Task(self, label, on_done, on_error, on_progress, operation)
+        self.active.append(task)
+        task.future = self.executor.submit(self.run, task, func)
+        self.notify()
+        if self.poll_job is None:
+            self.poll_job = self.widget.after(POLL_MS, self.poll)
+        return task
+
+    def run(self, task, func):
+        # Worker thread: never touches Tk, only the queue
+        try:
+            task.check()
+            result = func(task)
+            task.check()
+        except Cancelled:
+            self.events.put(('cancelled', task, None))
+        except Exception as e:
+            self.events.put(('error', task, e))
+        else:
+            self.events.put(('done', task, result))
+
+    def poll(self):
+        # Tk thread: hand finished work back to the widgets
+        self.poll_job = None
+        progressed = {}
+        finished = []
+        try:
+            while True:
+                kind, task, value = self.events.get_nowait()
+                if kind == 'progress':
+                    progressed[task] = value  # Only the latest report per task matters
+                else:
+                    finished.append((kind, task, value))
+        except queue.Empty:
+            pass
+
+        for task, (done, total) in progressed.items():
+            task.done, task.total = done, total
+            if task.on_progress and not task.cancelled:
+                task.on_progress(done, total)
+        for kind, task, value in finished:
+            if task not in self.active:
+                continue  # Cancelled before it started and already reported
+            self.active.remove(task)
+            if task.operation is not None and kind != 'done':
+                task.operation.finish(f"error: {value}" if kind == 'error' else 'cancelled')
+            if kind == 'done' and task.on_done:
+                try:
+                    task.on_done(value)
+                finally:
+                    if task.operation is not None:
+                        task.operation.finish()  # No-op when on_done finished it before a message box
+            elif kind == 'done' and task.operation is not None:
+                task.operation.finish()
+            elif kind == 'error':
+                if task.on_error:
+                    task.on_error(value)
+                else:
+                    messagebox.showerror("Error", f"{task.label} failed: {value}")
+        if progressed or finished:
+            self.notify()
+        if self.active:
+            self.poll_job = self.widget.after(POLL_MS, self.poll)
+
+    def cancel_all(self):
+        for task in list(self.active):
+            task.cancel()
+
+    def notify(self):
+        for listener in self.listeners:
+            listener(self)
+
+
+_shared = None
+
+
+def shared(widget):
+    # The application's Workers, created on first use with the widget's toplevel
+    global _shared
+    if _shared is None:
+        _shared = Workers(widget.winfo_toplevel())
+    return _shared
+
+
+class StatusBar:
+    # One line at the bottom of the window: what runs in the background, its
+    # progress, and a button that cancels it. When idle it shows how long
+    # the last operation took (see show_operation).
+    def __init__(self, master, workers):
+        self.frame = tk.Frame(master, relief=tk.SUNKEN, borderwidth=1)
+        self.workers = workers
+        self.idle_text = "Ready"
+        self.label = tk.Label(self.frame, text="Ready", anchor='w')
+        self.label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.cancel_button = tk.Button(self.frame, text="Cancel", command=workers.cancel_all, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.progress_bar = ttk.Progressbar(self.frame, length=150, maximum=100)
+        self.progress_bar.pack(side=tk.RIGHT, padx=5)
+        workers.listeners.append(self.update)
+
+    def update(self, workers):
+        if not workers.active:
+            self.label.config(text=self.idle_text)
+            self.progress_bar['value'] = 0
+            self.cancel_button.config(state=tk.DISABLED)
+            return
+        task = workers.active[0]
+        more = f" (+{len(workers.active) - 1} queued)" if len(workers.active) > 1 else ""
+        self.label.config(text=f"{task.label}...{more}")
+        self.progress_bar['value'] = 100.0 * task.done / task.total if task.total else 0
+        self.cancel_button.config(state=tk.NORMAL)
+
+    def show_operation(self, operation):
+        # perf.Recorder listener
+        self.idle_text = f"Ready - last: {operation.summary()}"
+        if not self.workers.active:
+            self.label.config(text=self.idle_text)